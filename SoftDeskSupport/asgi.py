@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SoftDeskSupport.settings')
+# no persistent database connections under ASGI, see the settings
+os.environ.setdefault('SOFTDESK_ASGI', '1')
 
 application = get_asgi_application()
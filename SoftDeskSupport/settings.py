@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, to measure the whole request
+    'projectManagement.instrumentation.instrumentation_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,9 +84,112 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # persistent connections, checked before being reused. Under ASGI
+        # (SoftDeskSupport.asgi sets SOFTDESK_ASGI), every request runs its
+        # queries in a new thread and a persistent connection would only
+        # stay open: connections are closed after each request instead
+        'CONN_MAX_AGE': 0 if os.environ.get('SOFTDESK_ASGI') else 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # take the write lock when a transaction starts, so that a
+            # transaction reading then writing waits for the other writers
+            # instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# PRAGMA statements run on every new SQLite connection, see
+# projectManagement.database. An empty dict keeps the SQLite defaults.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    # 256 MB
+    'mmap_size': 268435456,
+    # in KiB when negative: 64 MB
+    'cache_size': -64000,
+    # in milliseconds
+    'busy_timeout': 5000,
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# The local-memory caches below belong to one process: a change invalidates
+# them in the process serving it only. With several workers (gunicorn,
+# uvicorn --workers), use a shared backend such as Redis or Memcached for
+# every alias, or the other workers serve stale data until the timeouts.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'membership': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'membership',
+    },
+    'project_detail': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'project_detail',
+    },
+    'token_state': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'token_state',
+    },
+}
+
+# Cache alias and timeout (in seconds) of the user -> project ids cache
+MEMBERSHIP_CACHE_ALIAS = 'membership'
+MEMBERSHIP_CACHE_TIMEOUT = 300
+
+# Cache alias and timeout (in seconds) of the serialized project details
+PROJECT_DETAIL_CACHE_ALIAS = 'project_detail'
+PROJECT_DETAIL_CACHE_TIMEOUT = 3600
+
+# Cache alias and timeout (in seconds) of the user states checked against
+# the claims of the JWT tokens
+TOKEN_STATE_CACHE_ALIAS = 'token_state'
+TOKEN_STATE_CACHE_TIMEOUT = 300
+
+# Serve the project and issue lists from .values() rows instead of model
+# instances (same output, see projectManagement.values_serializers)
+FAST_LIST_SERIALIZATION = True
+
+# Events queued for a slow event stream before it is closed, and seconds
+# between keep-alive comments on an idle stream
+EVENT_STREAM_QUEUE_SIZE = 100
+EVENT_STREAM_KEEPALIVE = 15
+
+# Add a Server-Timing header (queries, database, serialization, permissions
+# and total times) to every response
+SERVER_TIMING = True
+
+# Maximal number of SQL queries per request of an endpoint, named
+# "<view class>.<action>" (or the URL name of the views that are not
+# instrumented). Requests going over are logged and counted in
+# /api/v1/request-stats/, and fail the query budget assertions of the tests.
+# Counted with cold caches, JWT authentication included.
+QUERY_BUDGETS = {
+    'ProjectViewSet.list': 6,
+    'ProjectViewSet.retrieve': 6,
+    'ProjectViewSet.create': 16,
+    'IssueViewSet.list': 5,
+    'IssueViewSet.retrieve': 5,
+    'IssueViewSet.create': 10,
+    'IssueViewSet.partial_update': 9,
+    'CommentViewSet.list': 5,
+    'CommentViewSet.retrieve': 3,
+    'CommentViewSet.create': 10,
+    'SearchView.get': 6,
+    'ChangesView.get': 7,
+    'AsyncProjectView.list': 4,
+    'AsyncProjectView.retrieve': 6,
+    'AsyncIssueView.list': 3,
+    'AsyncIssueView.retrieve': 5,
+    'AsyncCommentView.list': 3,
+    'AsyncCommentView.retrieve': 3,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -129,10 +235,26 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'authenticated.User'
 
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'projectManagement.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
     'DEFAULT_AUTHENTICATION_CLASSES':
-        ('rest_framework_simplejwt.authentication.JWTAuthentication',)
+        ('authenticated.authentication.StatelessJWTAuthentication',),
+    # orjson when installed, DRF's JSONRenderer otherwise
+    'DEFAULT_RENDERER_CLASSES': (
+        'projectManagement.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+}
+
+# Tokens carry the claims of the user, who is built from them without a
+# query (see authenticated.authentication)
+SIMPLE_JWT = {
+    'AUTH_TOKEN_CLASSES': ('authenticated.tokens.AccessToken',),
+    'TOKEN_USER_CLASS': 'authenticated.tokens.TokenUser',
+    'TOKEN_OBTAIN_SERIALIZER':
+        'authenticated.serializers.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER':
+        'authenticated.serializers.TokenRefreshSerializer',
 }
 
 LOGIN_URL = 'login'
@@ -31,4 +31,5 @@ urlpatterns = [
     path('/', include('rest_framework.urls')),
     path('api/v1/', include('authenticated.urls')),
     path('api/v1/', include(router.urls)),
+    path('api/v1/', include('projectManagement.urls')),
 ]
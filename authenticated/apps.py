@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AuthenticatedConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authenticated'
+
+    def ready(self):
+        from authenticated import signals  # noqa: F401
@@ -0,0 +1,109 @@
+"""
+Stateless JWT authentication.
+
+The user of a request is built from the claims of its access token, with
+no user query. Revocation is checked against the current state of the
+user (token version, `is_active` and `is_staff` flags), read from a cache
+which the user signals invalidate: a token is rejected once its user is
+deleted, deactivated, loses or gains the staff status, or changes their
+password.
+
+Tokens issued before the state claims were added are still accepted, as
+tokens of version 0: they stay valid until they expire or their user
+changes password, and take the flags of the user from its current state.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import (
+    JWTStatelessUserAuthentication
+)
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from authenticated.tokens import TOKEN_VERSION_CLAIM
+
+CACHE_KEY = 'token_state:{user_id}'
+
+STATE_FIELDS = (TOKEN_VERSION_CLAIM, 'is_active', 'is_staff')
+
+
+def get_token_state_cache():
+    return caches[settings.TOKEN_STATE_CACHE_ALIAS]
+
+
+def get_token_state(user_id):
+    """
+    Returns the (token version, is_active, is_staff) of the user, from the
+    cache or from the database on a cache miss, or None if the user does
+    not exist.
+    """
+    cache = get_token_state_cache()
+    key = CACHE_KEY.format(user_id=user_id)
+    state = cache.get(key)
+    if state is None:
+        state = get_user_model().objects.filter(
+            pk=user_id).values_list(*STATE_FIELDS).first()
+        if state is not None:
+            cache.set(key, state, settings.TOKEN_STATE_CACHE_TIMEOUT)
+    return state
+
+
+async def aget_token_state(user_id):
+    """
+    Async version of `get_token_state`.
+    """
+    cache = get_token_state_cache()
+    key = CACHE_KEY.format(user_id=user_id)
+    state = await cache.aget(key)
+    if state is None:
+        state = await get_user_model().objects.filter(
+            pk=user_id).values_list(*STATE_FIELDS).afirst()
+        if state is not None:
+            await cache.aset(key, state, settings.TOKEN_STATE_CACHE_TIMEOUT)
+    return state
+
+
+def invalidate_token_state(user_id):
+    """
+    Drops the cached state of a user who was saved or deleted.
+    """
+    get_token_state_cache().delete(CACHE_KEY.format(user_id=user_id))
+
+
+def check_token_state(token, state):
+    """
+    Raises AuthenticationFailed if the token does not match the current
+    state of its user.
+    """
+    if state is None:
+        raise AuthenticationFailed(_('User not found'), code='user_not_found')
+    if TOKEN_VERSION_CLAIM not in token:
+        # token issued before the state claims: version 0
+        token[TOKEN_VERSION_CLAIM] = 0
+        token['is_active'], token['is_staff'] = state[1:]
+    if tuple(token.get(claim) for claim in STATE_FIELDS) != tuple(state):
+        raise AuthenticationFailed(
+            _('Token has been revoked'), code='token_revoked')
+    if not state[1]:
+        raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication returning a `TokenUser` built from the claims of the
+    access token, after checking the cached state of the user.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        check_token_state(validated_token, get_token_state(user.id))
+        return user
+
+    async def aget_user(self, validated_token):
+        """
+        Async version of `get_user`.
+        """
+        user = super().get_user(validated_token)
+        check_token_state(validated_token, await aget_token_state(user.id))
+        return user
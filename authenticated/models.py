@@ -12,7 +12,29 @@ class User(AbstractUser):
         e contacted.
         can_data_be_shared (BooleanField): Indicates whether the user allows
         their data to be shared.
+        token_version (PositiveIntegerField): Version of the JWT tokens of
+        the user; tokens carrying another version are rejected.
     """
     birth_date = models.DateField()
     can_be_contacted = models.BooleanField(default=True)
     can_data_be_shared = models.BooleanField(default=True)
+    token_version = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the username the user was loaded with, so that renaming
+        the user can refresh the rows showing the username.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_username = instance.__dict__.get('username')
+        return instance
+
+    def revoke_tokens(self):
+        """
+        Revokes the tokens issued so far, once the user is saved. Called on
+        an explicit password change only: `set_password` also runs when
+        Django upgrades the hash of the password at login, which must not
+        revoke the tokens being issued.
+        """
+        self.token_version += 1
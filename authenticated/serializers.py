@@ -1,9 +1,14 @@
 from datetime import date
 
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings
 
 from django.contrib.auth import get_user_model
 
+from authenticated.authentication import check_token_state, get_token_state
+from authenticated.tokens import RefreshToken
+
 User = get_user_model()
 
 
@@ -47,6 +52,17 @@ class UserSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
+    def update(self, instance, validated_data):
+        """
+        Updates the user, hashing the new password if one is given. A new
+        password revokes the tokens of the user.
+        """
+        password = validated_data.pop('password', None)
+        if password is not None:
+            instance.set_password(password)
+            instance.revoke_tokens()
+        return super().update(instance, validated_data)
+
 
 class UserListSerializer(serializers.ModelSerializer):
     """
@@ -56,3 +72,23 @@ class UserListSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username')
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """
+    Issues tokens carrying the claims of the user.
+    """
+    token_class = RefreshToken
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    Refreshes the access token, unless the refresh token was revoked.
+    """
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        check_token_state(
+            refresh, get_token_state(refresh[api_settings.USER_ID_CLAIM]))
+        return super().validate(attrs)
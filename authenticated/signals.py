@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authenticated.authentication import invalidate_token_state
+from authenticated.models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_token_state_on_change(sender, instance, **kwargs):
+    """
+    Drops the cached token state of a user who was saved or deleted, so
+    that the next request checks its token against the new state.
+    """
+    invalidate_token_state(instance.pk)
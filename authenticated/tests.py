@@ -1,3 +1,112 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authenticated.models import User
+
+
+class StatelessJWTAuthenticationTest(APITestCase):
+    """
+    Requests are authenticated from the claims of the access token, and
+    tokens are revoked when their user changes password, is deactivated
+    or is deleted.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user(
+            username='user', password='motdepasse-1',
+            birth_date=date(1990, 1, 1),
+        )
+        self.tokens = self.login('motdepasse-1')
+
+    def login(self, password):
+        response = self.client.post('/api/v1/token/', {
+            'username': 'user', 'password': password})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get(self, url, access=None):
+        return self.client.get(url, headers={
+            'Authorization': f"Bearer {access or self.tokens['access']}"})
+
+    def refresh(self):
+        return self.client.post('/api/v1/token/refresh/', {
+            'refresh': self.tokens['refresh']})
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get(url).status_code, 200)
+        return [query['sql'] for query in queries
+                if 'FROM "authenticated_user"' in query['sql']]
+
+    def test_no_user_query_once_cached(self):
+        self.assertEqual(len(self.user_queries('/api/v1/projects/')), 1)
+        self.assertEqual(self.user_queries('/api/v1/projects/'), [])
+
+    def test_password_change_revokes_the_tokens(self):
+        url = f'/api/v1/users/{self.user.id}/'
+        self.get(url)
+        response = self.client.patch(
+            url, {'password': 'motdepasse-2'},
+            headers={'Authorization': f"Bearer {self.tokens['access']}"})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('motdepasse-2'))
+
+        response = self.get(url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'token_revoked')
+        self.assertEqual(self.refresh().status_code, 401)
+        self.tokens = self.login('motdepasse-2')
+        self.assertEqual(self.get(url).status_code, 200)
+        self.assertEqual(self.refresh().status_code, 200)
+
+    def test_password_hash_upgrade_keeps_the_tokens(self):
+        hasher = PBKDF2PasswordHasher()
+        self.user.password = hasher.encode(
+            'motdepasse-1', hasher.salt(), iterations=1000)
+        self.user.save()
+        self.tokens = self.login('motdepasse-1')
+        self.user.refresh_from_db()
+        # the login upgraded the hash to the current iteration count
+        self.assertFalse(hasher.must_update(self.user.password))
+
+        self.assertEqual(self.get('/api/v1/projects/').status_code, 200)
+        self.assertEqual(self.refresh().status_code, 200)
+
+    def test_token_without_state_claims_is_accepted_as_version_0(self):
+        # token issued before the state claims were added
+        access = str(AccessToken.for_user(self.user))
+        response = self.get('/api/v1/projects/', access)
+        self.assertEqual(response.status_code, 200)
+
+        self.user.revoke_tokens()
+        self.user.save()
+        response = self.get('/api/v1/projects/', access)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'token_revoked')
+
+    def test_deactivation_revokes_the_tokens(self):
+        self.get('/api/v1/projects/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get('/api/v1/projects/').status_code, 401)
+
+    def test_account_deletion_revokes_the_tokens(self):
+        self.get('/api/v1/projects/')
+        response = self.client.delete(
+            f'/api/v1/users/{self.user.id}/delete/',
+            headers={'Authorization': f"Bearer {self.tokens['access']}"})
+        self.assertEqual(response.status_code, 204)
+
+        response = self.get('/api/v1/projects/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'user_not_found')
+        self.assertEqual(self.refresh().status_code, 401)
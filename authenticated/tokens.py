@@ -0,0 +1,58 @@
+"""
+JWT tokens carrying the claims of their user, and the user built from
+them.
+
+Besides the user id, the tokens carry the username, the `is_active` and
+`is_staff` flags and the token version of the user, so that authenticated
+requests need no user query. Tokens are revoked by changing the token
+version of the user (see `authenticated.authentication`).
+"""
+from django.utils.functional import cached_property
+from rest_framework_simplejwt import models, tokens
+from rest_framework_simplejwt.settings import api_settings
+
+TOKEN_VERSION_CLAIM = 'token_version'
+
+
+class UserClaimsMixin:
+    """
+    Adds the claims of the user to the tokens created for them.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['username'] = user.username
+        token['is_active'] = user.is_active
+        token['is_staff'] = user.is_staff
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+class AccessToken(UserClaimsMixin, tokens.AccessToken):
+    pass
+
+
+class RefreshToken(UserClaimsMixin, tokens.RefreshToken):
+    # the claims of the refresh token are copied to its access tokens
+    access_token_class = AccessToken
+
+
+class TokenUser(models.TokenUser):
+    """
+    User of a request, read from the claims of its access token. The ids
+    are integers, as those of `User`, so that they can be compared with
+    the foreign keys of the models.
+    """
+
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def is_active(self):
+        return self.token.get('is_active', False)
@@ -44,7 +44,7 @@ class UserDetailView(RetrieveUpdateAPIView):
         Raises a PermissionDenied exception if not.
         """
         obj = super().get_object()
-        if obj != self.request.user:
+        if obj.pk != self.request.user.id:
             raise PermissionDenied(
                 "Vous ne pouvez accéder qu'à vos propres informations.")
         return obj
@@ -63,7 +63,7 @@ class UserDeleteView(DestroyAPIView):
         Check that the user can only delete their own account.
         """
         obj = super().get_object()
-        if obj != self.request.user:
+        if obj.pk != self.request.user.id:
             raise PermissionDenied(
                 "Vous ne pouvez supprimer que votre propre compte.")
         return obj
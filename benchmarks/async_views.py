@@ -0,0 +1,196 @@
+"""
+Load test of the read endpoints: sync views behind a threaded WSGI server
+against the async views behind uvicorn (ASGI), on the same machine.
+
+Both servers run in this process on the same seeded test database, one
+after the other; the load is generated by a separate process that keeps
+`concurrency` requests in flight. `--db-latency-ms` adds a wait to every
+SQL query, to mimic a database reached over the network.
+
+Usage::
+
+    python -m benchmarks.async_views [--concurrency 1 10 50]
+                                     [--db-latency-ms 2] [--duration 5]
+
+uvicorn is required for the ASGI server (``pip install uvicorn``).
+"""
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import threading
+import time
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from benchmarks.utils import seed, setup_django, test_database
+
+HOST = "127.0.0.1"
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+async def fetch(host, port, path, token):
+    """
+    Sends one GET request and returns its status code.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Authorization: Bearer {token}\r\nConnection: close\r\n\r\n"
+        .encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b" ", 2)[1])
+
+
+async def load(port, paths, token, concurrency, duration):
+    """
+    Keeps `concurrency` requests in flight for `duration` seconds and
+    returns the latencies in milliseconds and the number of errors.
+    """
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset):
+        nonlocal errors
+        index = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = await fetch(
+                    HOST, port, paths[index % len(paths)], token)
+            except OSError:
+                status = None
+            if status != 200:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+            index += 1
+
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    return latencies, errors
+
+
+def run_load(port, paths, token, concurrency, duration, results):
+    results.put(asyncio.run(load(port, paths, token, concurrency, duration)))
+
+
+def measure_server(port, paths, token, concurrencies, duration):
+    """
+    Runs the load process for each concurrency and prints the throughput
+    and the latencies.
+    """
+    for concurrency in concurrencies:
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=run_load,
+            args=(port, paths, token, concurrency, duration, results))
+        process.start()
+        latencies, errors = results.get()
+        process.join()
+        latencies.sort()
+        print(f"  concurrency {concurrency:3}: "
+              f"{len(latencies) / duration:7.1f} req/s   "
+              f"p50 {statistics.median(latencies):7.1f} ms   "
+              f"p95 {latencies[int(len(latencies) * 0.95)]:7.1f} ms   "
+              f"errors {errors}")
+
+
+def add_db_latency(latency_ms):
+    """
+    Makes every SQL query of every connection wait `latency_ms`.
+    """
+    from django.db.backends.signals import connection_created
+
+    def wait(execute, sql, params, many, context):
+        time.sleep(latency_ms / 1000)
+        return execute(sql, params, many, context)
+
+    def on_connection_created(sender, connection, **kwargs):
+        if wait not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wait)
+
+    connection_created.connect(on_connection_created, weak=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, nargs="+",
+                        default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--db-latency-ms", type=float, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    setup_django()
+    import uvicorn
+    from django.conf import settings
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connections
+
+    from authenticated.tokens import AccessToken
+    from projectManagement.models import Contributor, Issue
+
+    settings.ALLOWED_HOSTS = [HOST]
+    with test_database():
+        seed(issues=5000, comments=20000)
+        contributor = Contributor.objects.select_related("user").filter(
+            project_id=Issue.objects.values("project_id")[:1]).first()
+        token = str(AccessToken.for_user(contributor.user))
+        project_id = contributor.project_id
+        issue_id = Issue.objects.filter(
+            project_id=project_id).values_list("id", flat=True).first()
+        paths = [
+            "/api/v1/projects/",
+            f"/api/v1/projects/{project_id}/",
+            "/api/v1/issues/?page_size=20",
+            f"/api/v1/issues/{issue_id}/",
+            f"/api/v1/comments/?issue={issue_id}",
+        ]
+        async_paths = [
+            path.replace("/api/v1/", "/api/v1/async/") for path in paths]
+        if args.db_latency_ms:
+            add_db_latency(args.db_latency_ms)
+            connections.close_all()
+        print(f"{args.db_latency_ms} ms per query, "
+              f"{args.duration} s per measure")
+
+        print("sync views, threaded WSGI server")
+        server = make_server(
+            HOST, args.port, get_wsgi_application(),
+            server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        measure_server(
+            args.port, paths, token, args.concurrency, args.duration)
+        server.shutdown()
+        server.server_close()
+
+        for name, urls in [("async views", async_paths),
+                           ("sync views", paths)]:
+            print(f"{name}, uvicorn ASGI server")
+            server = uvicorn.Server(uvicorn.Config(
+                get_asgi_application(), host=HOST, port=args.port + 1,
+                log_level="warning", lifespan="off"))
+            thread = threading.Thread(target=server.run, daemon=True)
+            thread.start()
+            while not server.started:
+                time.sleep(0.05)
+            measure_server(
+                args.port + 1, urls, token, args.concurrency, args.duration)
+            server.should_exit = True
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+"""
+Benchmark of every endpoint of the API, through the Django test client.
+
+Seeds a test database with the `seed_data` dataset, then sends
+`--requests` requests to each endpoint of ``projectManagement/urls.py``
+and ``authenticated/urls.py``, one at a time, as the author of the
+largest project authenticated with a JWT access token. Reports per
+endpoint the p50, p95 and p99 latencies, the throughput and the number of
+SQL queries per request (read from the request instrumentation), as JSON:
+keep the output of a commit and pass it to `--compare` on another to see
+the differences.
+
+Usage::
+
+    python -m benchmarks.endpoints [--requests 100] [--output results.json]
+                                   [--compare previous.json]
+                                   [--only issues] [--issues 5000]
+
+The endpoints hashing a password (registration, login) are limited to
+`--hashing-requests` requests. The event stream needs an ASGI server and
+is not measured here (see ``benchmarks.async_views``).
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from itertools import count
+
+from benchmarks.utils import BASE_DIR, seed, setup_django, test_database
+
+ANONYMOUS = ""
+# rows sent per request to the bulk endpoints
+BATCH = 10
+# users taken per request from the outsiders of the project, by the
+# endpoints adding them and, in the same order, by those removing them
+OUTSIDERS_PER_REQUEST = {
+    "POST /projects/{id}/add_contributor/": 1,
+    "POST /projects/{id}/add_contributors/": BATCH,
+    "DELETE /projects/{id}/del_contributor/": 1,
+    "DELETE /projects/{id}/del_contributors/": BATCH,
+}
+
+
+class Context:
+    """
+    Ids of the seeded rows the requests work on, and helpers creating the
+    rows that the delete endpoints remove.
+    """
+
+    def __init__(self):
+        from django.db.models import Count
+
+        from authenticated.models import User
+        from authenticated.tokens import AccessToken, RefreshToken
+        from projectManagement.changes import get_latest_token
+        from projectManagement.models import Comment, Issue, Project
+
+        project = Project.objects.annotate(
+            issue_count=Count("issues")).order_by("-issue_count").first()
+        self.project_id = project.id
+        self.user = User.objects.get(pk=project.author_id)
+        # staff, to also measure the stats endpoints
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.user.refresh_from_db()
+        self.token = str(AccessToken.for_user(self.user))
+        self.refresh_token = str(RefreshToken.for_user(self.user))
+        self.issue_id = Issue.objects.filter(
+            project_id=self.project_id).annotate(
+            comment_count=Count("issue_comments")).order_by(
+            "-comment_count").values_list("id", flat=True).first()
+        self.comment_id = Comment.objects.filter(
+            issue_id=self.issue_id).values_list("pk", flat=True).first()
+        self.outsiders = list(User.objects.exclude(
+            contributed_projects__project_id=self.project_id
+        ).values_list("id", flat=True))
+        self.since = get_latest_token()
+        self.sequence = count()
+        # rows the benchmark user may edit
+        self.own_issue_id = self.create_issue()
+        self.own_comment_id = self.create_comment()
+
+    def unique(self):
+        return next(self.sequence)
+
+    def create_project(self):
+        from projectManagement.models import Contributor, Project
+
+        project = Project.objects.create(
+            title=f"Benchmark {self.unique()}", description="Description",
+            type="back-end", author=self.user)
+        Contributor.objects.create(project=project, user=self.user)
+        return project.id
+
+    def create_issue(self):
+        from projectManagement.models import Issue
+
+        return Issue.objects.create(
+            title=f"Benchmark {self.unique()}", description="Description",
+            nature="Bug", author=self.user, project_id=self.project_id).id
+
+    def create_comment(self):
+        from projectManagement.models import Comment
+
+        return Comment.objects.create(
+            description="Benchmark", author=self.user,
+            issue_id=self.issue_id).pk
+
+    def create_user(self):
+        """
+        Returns the id and the access token of a new user.
+        """
+        from authenticated.models import User
+        from authenticated.tokens import AccessToken
+
+        user = User.objects.create(
+            username=f"benchmark{self.unique()}", password="!",
+            birth_date="1990-01-01")
+        return user.id, str(AccessToken.for_user(user))
+
+
+def get_endpoints(ctx, hashing_requests):
+    """
+    Returns the endpoints to measure: (name, method, request builder,
+    maximal number of requests). A builder returns the path, the body and
+    the access token of a request (None for the benchmark user, ANONYMOUS
+    for none), and creates beforehand the rows the request needs.
+    """
+    project = f"/api/v1/projects/{ctx.project_id}"
+    issue = f"/api/v1/issues/{ctx.issue_id}/"
+    comment = f"/api/v1/comments/{ctx.comment_id}/"
+    added = iter(ctx.outsiders)
+    removed = iter(ctx.outsiders)
+
+    def issue_item():
+        return {"title": f"Benchmark {ctx.unique()}",
+                "description": "Description", "nature": "Bug",
+                "project": ctx.project_id, "assigned": None}
+
+    def recent_issue_ids():
+        from projectManagement.models import Issue
+
+        return list(Issue.objects.filter(project_id=ctx.project_id)
+                    .order_by("-id").values_list("id", flat=True)[:BATCH])
+
+    def delete_user():
+        user_id, token = ctx.create_user()
+        return f"/api/v1/users/{user_id}/delete/", None, token
+
+    def add_batch():
+        return (f"{project}/add_contributors/",
+                {"user_ids": [next(added) for _ in range(BATCH)]}, None)
+
+    def remove_batch():
+        return (f"{project}/del_contributors/",
+                {"user_ids": [next(removed) for _ in range(BATCH)]}, None)
+
+    def register():
+        return "/api/v1/users/register/", {
+            "username": f"register{ctx.unique()}",
+            "password": "motdepasse-benchmark",
+            "birth_date": "1990-01-01",
+        }, ANONYMOUS
+
+    def login():
+        from authenticated.models import User
+
+        user = User(username=f"login{ctx.unique()}", birth_date="1990-01-01")
+        user.set_password("motdepasse-benchmark")
+        user.save()
+        return "/api/v1/token/", {
+            "username": user.username, "password": "motdepasse-benchmark",
+        }, ANONYMOUS
+
+    return [
+        # projectManagement/urls.py
+        ("GET /projects/", "get",
+         lambda: ("/api/v1/projects/", None, None), None),
+        ("GET /projects/?counts=true", "get",
+         lambda: ("/api/v1/projects/?counts=true", None, None), None),
+        ("POST /projects/", "post",
+         lambda: ("/api/v1/projects/", {
+             "title": f"Benchmark {ctx.unique()}",
+             "description": "Description", "type": "back-end"}, None),
+         None),
+        ("GET /projects/{id}/", "get",
+         lambda: (f"{project}/", None, None), None),
+        ("PATCH /projects/{id}/", "patch",
+         lambda: (f"{project}/", {"description": "Description"}, None),
+         None),
+        ("DELETE /projects/{id}/", "delete",
+         lambda: (f"/api/v1/projects/{ctx.create_project()}/", None, None),
+         None),
+        ("GET /projects/{id}/export/", "get",
+         lambda: (f"{project}/export/", None, None), None),
+        ("POST /projects/{id}/add_contributor/", "post",
+         lambda: (f"{project}/add_contributor/",
+                  {"user_id": next(added)}, None), None),
+        ("DELETE /projects/{id}/del_contributor/", "delete",
+         lambda: (f"{project}/del_contributor/",
+                  {"user_id": next(removed)}, None), None),
+        ("POST /projects/{id}/add_contributors/", "post", add_batch, None),
+        ("DELETE /projects/{id}/del_contributors/", "delete",
+         remove_batch, None),
+        ("GET /issues/", "get",
+         lambda: ("/api/v1/issues/", None, None), None),
+        ("GET /issues/?project=&status=", "get",
+         lambda: (f"/api/v1/issues/?project={ctx.project_id}"
+                  f"&status=To+Do", None, None), None),
+        ("POST /issues/", "post",
+         lambda: ("/api/v1/issues/", issue_item(), None), None),
+        ("GET /issues/{id}/", "get", lambda: (issue, None, None), None),
+        ("PATCH /issues/{id}/", "patch",
+         lambda: (f"/api/v1/issues/{ctx.own_issue_id}/",
+                  {"priority": "High"}, None), None),
+        ("DELETE /issues/{id}/", "delete",
+         lambda: (f"/api/v1/issues/{ctx.create_issue()}/", None, None),
+         None),
+        ("POST /issues/bulk/", "post",
+         lambda: ("/api/v1/issues/bulk/",
+                  [issue_item() for _ in range(BATCH)], None),
+         None),
+        ("PATCH /issues/bulk/", "patch",
+         lambda: ("/api/v1/issues/bulk/",
+                  [{"id": issue_id, "status": "In Progress"}
+                   for issue_id in recent_issue_ids()], None), None),
+        ("GET /comments/", "get",
+         lambda: ("/api/v1/comments/", None, None), None),
+        ("GET /comments/?issue=", "get",
+         lambda: (f"/api/v1/comments/?issue={ctx.issue_id}", None, None),
+         None),
+        ("POST /comments/", "post",
+         lambda: ("/api/v1/comments/", {
+             "description": "Benchmark", "issue": ctx.issue_id}, None),
+         None),
+        ("GET /comments/{uuid}/", "get",
+         lambda: (comment, None, None), None),
+        ("PATCH /comments/{uuid}/", "patch",
+         lambda: (f"/api/v1/comments/{ctx.own_comment_id}/",
+                  {"description": "Benchmark"}, None), None),
+        ("DELETE /comments/{uuid}/", "delete",
+         lambda: (f"/api/v1/comments/{ctx.create_comment()}/", None, None),
+         None),
+        ("GET /search/", "get",
+         lambda: ("/api/v1/search/?q=erreur+connexion", None, None), None),
+        ("GET /changes/", "get",
+         lambda: ("/api/v1/changes/", None, None), None),
+        ("GET /changes/?since=", "get",
+         lambda: (f"/api/v1/changes/?since={ctx.since}", None, None), None),
+        ("GET /async/projects/", "get",
+         lambda: ("/api/v1/async/projects/", None, None), None),
+        ("GET /async/projects/{id}/", "get",
+         lambda: (f"/api/v1/async/projects/{ctx.project_id}/", None, None),
+         None),
+        ("GET /async/issues/", "get",
+         lambda: ("/api/v1/async/issues/", None, None), None),
+        ("GET /async/issues/{id}/", "get",
+         lambda: (f"/api/v1/async/issues/{ctx.issue_id}/", None, None),
+         None),
+        ("GET /async/comments/", "get",
+         lambda: ("/api/v1/async/comments/", None, None), None),
+        ("GET /async/comments/{uuid}/", "get",
+         lambda: (f"/api/v1/async/comments/{ctx.comment_id}/", None, None),
+         None),
+        ("GET /cache-stats/", "get",
+         lambda: ("/api/v1/cache-stats/", None, None), None),
+        ("GET /request-stats/", "get",
+         lambda: ("/api/v1/request-stats/", None, None), None),
+        # authenticated/urls.py
+        ("POST /users/register/", "post", register, hashing_requests),
+        ("GET /users/", "get", lambda: ("/api/v1/users/", None, None), None),
+        ("GET /users/{id}/", "get",
+         lambda: (f"/api/v1/users/{ctx.user.id}/", None, None), None),
+        ("PATCH /users/{id}/", "patch",
+         lambda: (f"/api/v1/users/{ctx.user.id}/",
+                  {"can_be_contacted": True}, None), None),
+        ("DELETE /users/{id}/delete/", "delete", delete_user, None),
+        ("POST /token/", "post", login, hashing_requests),
+        ("POST /token/refresh/", "post",
+         lambda: ("/api/v1/token/refresh/",
+                  {"refresh": ctx.refresh_token}, ANONYMOUS), None),
+    ]
+
+
+def send(client, ctx, method, build):
+    """
+    Sends one request and returns its duration in milliseconds, its status
+    code and its number of SQL queries. Streamed responses are read to the
+    end.
+    """
+    from projectManagement.instrumentation import capture_request_metrics
+
+    path, data, token = build()
+    kwargs = {} if method == "get" else {"format": "json"}
+    if token != ANONYMOUS:
+        kwargs["headers"] = {
+            "Authorization": f"Bearer {token or ctx.token}"}
+    with capture_request_metrics() as metrics:
+        start = time.perf_counter()
+        response = getattr(client, method)(path, data, **kwargs)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, response.status_code, metrics[-1].queries
+
+
+def summarize(latencies, queries, errors):
+    """
+    Returns the statistics of the requests of an endpoint.
+    """
+    p50, p95, p99 = (
+        statistics.quantiles(latencies, n=100, method="inclusive")[index]
+        for index in (49, 94, 98))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "throughput_rps": round(len(latencies) / sum(latencies) * 1000, 1),
+        "queries_per_request": round(statistics.fmean(queries), 2),
+        "queries_max": max(queries),
+    }
+
+
+def git_revision():
+    """
+    Returns the current commit, suffixed with "-dirty" when the tree has
+    uncommitted changes, or None outside a git checkout.
+    """
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "diff", "--quiet", "HEAD"], cwd=BASE_DIR).returncode
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + ("-dirty" if dirty else "")
+
+
+def print_table(results, previous=None):
+    """
+    Prints the results on stderr, with the relative change of the p50
+    latency and of the queries against `previous` results.
+    """
+    previous = (previous or {}).get("endpoints", {})
+    for name, stats in results["endpoints"].items():
+        line = (f"{name:42} p50 {stats['p50_ms']:8.2f} ms  "
+                f"p95 {stats['p95_ms']:8.2f}  p99 {stats['p99_ms']:8.2f}  "
+                f"{stats['throughput_rps']:8.1f} req/s  "
+                f"{stats['queries_per_request']:6.2f} queries")
+        if stats["errors"]:
+            line += f"  {stats['errors']} errors"
+        before = previous.get(name)
+        if before:
+            line += (f"  | p50 {stats['p50_ms'] / before['p50_ms'] - 1:+.0%}"
+                     f" queries {stats['queries_per_request'] - before['queries_per_request']:+.2f}")  # noqa: E501
+        print(line, file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--hashing-requests", type=int, default=10)
+    parser.add_argument("--only", default=None,
+                        help="Only measure the endpoints containing this "
+                             "text, for example issues.")
+    parser.add_argument("--output", default=None,
+                        help="JSON file of the results (stdout by "
+                             "default).")
+    parser.add_argument("--compare", default=None,
+                        help="JSON results of a previous run.")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--contributors-per-project", type=int, default=10)
+    parser.add_argument("--issues", type=int, default=5000)
+    parser.add_argument("--comments", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    requests = min(args.warmup, args.requests) + args.requests
+    needed = requests * max(
+        sum(per_request for name, per_request in OUTSIDERS_PER_REQUEST.items()
+            if name.startswith(method)
+            and (not args.only or args.only in name))
+        for method in ("POST", "DELETE"))
+    # the largest project has at most contributors_per_project + 1 members
+    if args.users - args.contributors_per_project - 1 < needed:
+        parser.error(
+            f"the contributor endpoints need {needed} users outside of the "
+            f"project: pass at least --users "
+            f"{needed + args.contributors_per_project + 1}, fewer "
+            f"--requests or --only with other endpoints")
+
+    setup_django()
+    import django
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from rest_framework.test import APIClient
+
+    setup_test_environment()
+    # the errors are counted in the results
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+    dataset = {
+        "users": args.users,
+        "projects": args.projects,
+        "contributors_per_project": args.contributors_per_project,
+        "issues": args.issues,
+        "comments": args.comments,
+        "seed": args.seed,
+    }
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": f"{connection.vendor} {connection.Database.sqlite_version}",  # noqa: E501
+            "dataset": dataset,
+            "requests": args.requests,
+            "warmup": args.warmup,
+        },
+        "endpoints": {},
+    }
+    with test_database():
+        seed(users=args.users, projects=args.projects,
+             contributors_per_project=args.contributors_per_project,
+             issues=args.issues, comments=args.comments,
+             seed_value=args.seed)
+        ctx = Context()
+        client = APIClient()
+        endpoints = get_endpoints(ctx, args.hashing_requests)
+        for name, method, build, limit in endpoints:
+            if args.only and args.only not in name:
+                continue
+            requests = min(args.requests, limit or args.requests)
+            for _ in range(min(args.warmup, requests)):
+                send(client, ctx, method, build)
+            latencies, queries, errors = [], [], 0
+            for _ in range(max(requests, 2)):
+                elapsed, status_code, query_count = send(
+                    client, ctx, method, build)
+                latencies.append(elapsed)
+                queries.append(query_count)
+                errors += status_code >= 400
+            results["endpoints"][name] = summarize(latencies, queries, errors)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+    print_table(results, previous)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
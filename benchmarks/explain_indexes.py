@@ -0,0 +1,91 @@
+"""
+Shows the query plans and timings of the hot queries of the API with and
+without the composite indexes declared on Contributor, Issue and Comment.
+
+Usage::
+
+    python -m benchmarks.explain_indexes [--issues 50000] [--comments 200000]
+"""
+import argparse
+
+from benchmarks.utils import measure, seed, setup_django, test_database
+
+
+def hot_queries():
+    """
+    Returns the queries run by the viewsets, keyed by a short description.
+    """
+    from projectManagement.models import Comment, Contributor, Issue
+
+    project_id = Issue.objects.values_list("project", flat=True).first()
+    issue_id = Comment.objects.values_list("issue", flat=True).first()
+    user_id, = Contributor.objects.filter(project_id=project_id).values_list(
+        "user", flat=True)[:1]
+    ordering = ("date_created", "id")
+    return {
+        "issues of a project by date":
+            Issue.objects.filter(project_id=project_id).order_by(
+                *ordering)[:5],
+        "issues of a project by status":
+            Issue.objects.filter(
+                project_id=project_id, status="In Progress").order_by(
+                *ordering)[:5],
+        "issues of a project by priority":
+            Issue.objects.filter(
+                project_id=project_id, priority="High").order_by(
+                *ordering)[:5],
+        "issues of a project by assignee":
+            Issue.objects.filter(
+                project_id=project_id, assigned_id=user_id).order_by(
+                *ordering)[:5],
+        "issues of a project by nature":
+            Issue.objects.filter(
+                project_id=project_id, nature="Bug").order_by(
+                *ordering)[:5],
+        "comments of an issue by date":
+            Comment.objects.filter(issue_id=issue_id).order_by(*ordering)[:5],
+        "projects of a user":
+            Contributor.objects.filter(user_id=user_id).values_list(
+                "project_id", flat=True),
+    }
+
+
+def report(title, connection):
+    print(f"===== {title} =====")
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    for name, queryset in hot_queries().items():
+        duration = measure(lambda: list(queryset.all()))
+        print(f"--- {name}: {duration:.3f} ms")
+        print(queryset.explain())
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--issues", type=int, default=50000)
+    parser.add_argument("--comments", type=int, default=200000)
+    args = parser.parse_args()
+
+    setup_django()
+    from projectManagement.models import Comment, Contributor, Issue
+
+    with test_database() as connection:
+        seed(issues=args.issues, comments=args.comments)
+        indexes = [(model, index)
+                   for model in (Contributor, Issue, Comment)
+                   for index in model._meta.indexes]
+
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.remove_index(model, index)
+        report("before: without composite indexes", connection)
+
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+        report("after: with composite indexes", connection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Restores a large dumpdata fixture with loaddata and with bulk_loaddata.
+
+A seeded test database is dumped with dumpdata (users, projects,
+contributors, issues and comments), then each command loads the fixture
+into the flushed database, in a child process whose peak memory growth is
+reported along with the duration.
+
+Usage::
+
+    python -m benchmarks.fixture_loading [--issues 10000] [--comments 50000]
+                                         [--batch-size 1000]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks.utils import seed, setup_django, test_database
+
+
+def load(command, path, options, results):
+    """
+    Loads the fixture into the flushed database, in a child process, and
+    puts the duration and the peak memory growth in `results`.
+    """
+    from django.core.management import call_command
+
+    call_command("flush", interactive=False, verbosity=0)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    call_command(command, path, verbosity=0, **options)
+    duration = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((duration, (peak - baseline) / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--issues", type=int, default=10000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connection, connections
+
+    directory = tempfile.mkdtemp()
+    # a database file, shared with the child processes
+    connection.settings_dict["TEST"]["NAME"] = os.path.join(
+        directory, "benchmark.sqlite3")
+    path = os.path.join(directory, "dump.json")
+    with test_database():
+        seed(users=args.users, projects=args.projects, issues=args.issues,
+             comments=args.comments)
+        call_command("dumpdata", "authenticated", "projectManagement",
+                     output=path, verbosity=0)
+        objects = sum(
+            model.objects.count() for model in _dumped_models())
+        print(f"{objects} objects, "
+              f"{os.path.getsize(path) / 1024 / 1024:.1f} MB fixture")
+        connections.close_all()
+
+        context = multiprocessing.get_context("fork")
+        durations = {}
+        for command, options in [
+            ("loaddata", {}),
+            ("bulk_loaddata", {"batch_size": args.batch_size}),
+        ]:
+            results = context.Queue()
+            process = context.Process(
+                target=load, args=(command, path, options, results))
+            process.start()
+            duration, memory = results.get()
+            process.join()
+            durations[command] = duration
+            print(f"  {command:14} {duration:8.2f} s   "
+                  f"peak memory +{memory:7.1f} MB")
+        print(f"  x{durations['loaddata'] / durations['bulk_loaddata']:.1f}")
+    os.remove(path)
+
+
+def _dumped_models():
+    from django.apps import apps
+
+    return [
+        *apps.get_app_config("authenticated").get_models(),
+        *apps.get_app_config("projectManagement").get_models(),
+    ]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Compares DRF's JSONRenderer with the orjson renderer on payloads of 1,000
+issues and 1,000 comments, as the serializers return them.
+
+Usage::
+
+    python -m benchmarks.json_renderer [--issues 1000]
+"""
+import argparse
+
+from benchmarks.utils import measure, seed, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--issues", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+
+    from projectManagement.models import Comment, Issue
+    from projectManagement.renderers import FastJSONRenderer, orjson
+    from projectManagement.serializers import (
+        CommentSerializer, IssueListSerializer
+    )
+
+    if orjson is None:
+        print("orjson is not installed: FastJSONRenderer is JSONRenderer")
+
+    with test_database():
+        seed(issues=args.issues, comments=args.issues)
+        issues = Issue.objects.order_by("id")
+        payloads = {
+            f"{args.issues} issues (list)":
+                {"results": IssueListSerializer(issues, many=True).data},
+            f"{args.issues} comments (UUID ids)":
+                CommentSerializer(
+                    Comment.objects.select_related("author"), many=True,
+                ).data,
+        }
+        for name, data in payloads.items():
+            drf_ms = measure(lambda: JSONRenderer().render(data))
+            fast_ms = measure(lambda: FastJSONRenderer().render(data))
+            same = JSONRenderer().render(data) == FastJSONRenderer().render(
+                data)
+            print(f"{name:28} JSONRenderer {drf_ms:7.2f} ms   "
+                  f"FastJSONRenderer {fast_ms:7.2f} ms   "
+                  f"x{drf_ms / fast_ms:.1f}   identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
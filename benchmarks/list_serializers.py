@@ -0,0 +1,71 @@
+"""
+Compares the list serializers with their `.values()` fast path, alone and
+through the list endpoints, on pages of 100 items.
+
+Usage::
+
+    python -m benchmarks.list_serializers [--page-size 100]
+"""
+import argparse
+
+from benchmarks.utils import measure, seed, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    from authenticated.models import User
+    from projectManagement.models import Contributor, Issue, Project
+    from projectManagement.serializers import (
+        IssueListSerializer, ProjectListSerializer
+    )
+    from projectManagement.values_serializers import ValuesSerializer
+
+    size = args.page_size
+    with test_database(), override_settings(
+            ALLOWED_HOSTS=["testserver"],
+            REST_FRAMEWORK={"PAGE_SIZE": size}):
+        seed(projects=size * 2, contributors_per_project=size,
+             issues=20000, comments=0)
+        # one user contributing to every project
+        user = User.objects.first()
+        Contributor.objects.bulk_create(
+            [Contributor(project=project, user=user)
+             for project in Project.objects.all()],
+            ignore_conflicts=True,
+        )
+
+        print(f"serializers alone, {size} items")
+        for serializer_class, queryset in [
+            (IssueListSerializer, Issue.objects.order_by("id")),
+            (ProjectListSerializer, Project.objects.order_by("id")),
+        ]:
+            fast = ValuesSerializer(serializer_class)
+            slow_ms = measure(lambda: serializer_class(
+                list(queryset[:size]), many=True).data)
+            fast_ms = measure(lambda: fast.to_representation(
+                list(fast.values(queryset)[:size])))
+            print(f"  {serializer_class.__name__:24} "
+                  f"serializer {slow_ms:7.2f} ms   "
+                  f"values {fast_ms:7.2f} ms   x{slow_ms / fast_ms:.1f}")
+
+        print(f"list endpoints, pages of {size}")
+        client = APIClient()
+        client.force_authenticate(user)
+        for url in ["/api/v1/issues/", "/api/v1/projects/"]:
+            url = f"{url}?page_size={size}"
+            fast_ms = measure(lambda: client.get(url))
+            with override_settings(FAST_LIST_SERIALIZATION=False):
+                slow_ms = measure(lambda: client.get(url))
+            print(f"  {url:36} serializer {slow_ms:7.2f} ms   "
+                  f"values {fast_ms:7.2f} ms   x{slow_ms / fast_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Measures the full-text search of issues and comments on a large dataset.
+
+Usage::
+
+    python -m benchmarks.search [--comments 1000000]
+"""
+import argparse
+import time
+
+from benchmarks.utils import measure, seed, setup_django, test_database
+
+QUERIES = ["bouton", "formulaire", "bouton erreur", "mot42",
+           "déploiement mobile", "mot1234 mot42"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--issues", type=int, default=100000)
+    parser.add_argument("--comments", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from projectManagement.models import Contributor
+    from projectManagement.search import search_comments, search_issues
+
+    with test_database():
+        start = time.perf_counter()
+        seed(issues=args.issues, comments=args.comments)
+        print(f"seeded {args.issues} issues and {args.comments} comments "
+              f"in {time.perf_counter() - start:.1f} s")
+
+        user_id = Contributor.objects.values_list("user", flat=True).first()
+        project_ids = sorted(Contributor.objects.filter(
+            user_id=user_id).values_list("project", flat=True))
+        print(f"searching as a contributor of {len(project_ids)} projects")
+        for query in QUERIES:
+            issues = measure(
+                lambda: search_issues(query, project_ids, args.limit))
+            comments = measure(
+                lambda: search_comments(query, project_ids, args.limit))
+            print(f"{query!r:24} issues {issues:8.2f} ms   "
+                  f"comments {comments:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Mixed read/write load on SQLite, with the default connection settings and
+with the tuned profile of the settings (SQLITE_PRAGMAS, CONN_MAX_AGE and
+the IMMEDIATE transaction mode).
+
+Reader and writer processes run against the same seeded database file for
+`duration` seconds. Each operation is handled like a request: connections
+older than CONN_MAX_AGE are closed before and after it. Readers list the
+latest issues of a project with their comment counts; writers add a
+comment to an issue (counters, change log and cache invalidation
+included). Throughput, latencies and "database is locked" errors are
+reported for each profile.
+
+Usage::
+
+    python -m benchmarks.sqlite_concurrency [--readers 8] [--writers 2]
+                                            [--duration 5]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.utils import seed, setup_django, test_database
+
+
+def get_profiles():
+    """
+    Returns the connection settings of each profile: SQLite's defaults and
+    a connection per request, then the tuned profile of the settings.
+    """
+    from django.conf import settings
+
+    default = settings.DATABASES["default"]
+    return {
+        "default": {"CONN_MAX_AGE": 0, "OPTIONS": {}, "PRAGMAS": {}},
+        "tuned": {"CONN_MAX_AGE": default.get("CONN_MAX_AGE", 0),
+                  "OPTIONS": default.get("OPTIONS", {}),
+                  "PRAGMAS": settings.SQLITE_PRAGMAS},
+    }
+
+
+def work(role, profile, duration, project_ids, issue_ids, user_ids, seed_value,
+         results):
+    """
+    Runs read or write operations for `duration` seconds, in a child
+    process, and puts the latencies in milliseconds and the number of
+    errors in `results`.
+    """
+    from django.conf import settings
+    from django.db import OperationalError, close_old_connections, connection
+
+    from projectManagement.models import Comment, Issue
+
+    connection.settings_dict["CONN_MAX_AGE"] = profile["CONN_MAX_AGE"]
+    connection.settings_dict["OPTIONS"] = dict(profile["OPTIONS"])
+    settings.SQLITE_PRAGMAS = profile["PRAGMAS"]
+    rng = random.Random(seed_value)
+
+    def read():
+        list(Issue.objects.filter(
+            project_id=rng.choice(project_ids)
+        ).order_by("-date_created").values(
+            "id", "title", "status", "comments_count")[:50])
+
+    def write():
+        Comment.objects.create(
+            description="Commentaire de charge",
+            author_id=rng.choice(user_ids), issue_id=rng.choice(issue_ids))
+
+    operation = read if role == "reader" else write
+    latencies, errors = [], 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        close_old_connections()
+        start = time.perf_counter()
+        try:
+            operation()
+        except OperationalError:
+            errors += 1
+        else:
+            latencies.append((time.perf_counter() - start) * 1000)
+        close_old_connections()
+    connection.close()
+    results.put((role, latencies, errors))
+
+
+def summarize(latencies, duration):
+    if len(latencies) < 2:
+        return "      -"
+    p50, p95, p99 = (statistics.quantiles(
+        latencies, n=100, method="inclusive")[index] for index in (49, 94, 98))
+    return (f"{len(latencies) / duration:8.0f} op/s  p50 {p50:6.1f} ms  "
+            f"p95 {p95:6.1f} ms  p99 {p99:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection, connections
+
+    from authenticated.models import User
+    from projectManagement.models import Issue, Project
+
+    directory = tempfile.mkdtemp()
+    # a database file, shared with the child processes
+    connection.settings_dict["TEST"]["NAME"] = os.path.join(
+        directory, "benchmark.sqlite3")
+    with test_database():
+        seed(users=500, projects=20, issues=5000, comments=20000)
+        project_ids = list(Project.objects.values_list("id", flat=True))
+        issue_ids = list(Issue.objects.values_list("id", flat=True))
+        user_ids = list(User.objects.values_list("id", flat=True))
+        print(f"{args.readers} readers, {args.writers} writers, "
+              f"{args.duration:g} s per profile")
+
+        context = multiprocessing.get_context("fork")
+        for name, profile in get_profiles().items():
+            # the journal mode is stored in the database file
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "PRAGMA journal_mode = "
+                    f"{profile['PRAGMAS'].get('journal_mode', 'delete')}")
+            connections.close_all()
+            results = context.Queue()
+            processes = [
+                context.Process(target=work, args=(
+                    role, profile, args.duration, project_ids, issue_ids,
+                    user_ids, index, results))
+                for index, role in enumerate(
+                    ["reader"] * args.readers + ["writer"] * args.writers)
+            ]
+            for process in processes:
+                process.start()
+            latencies = {"reader": [], "writer": []}
+            errors = {"reader": 0, "writer": 0}
+            for _ in processes:
+                role, role_latencies, role_errors = results.get()
+                latencies[role].extend(role_latencies)
+                errors[role] += role_errors
+            for process in processes:
+                process.join()
+            print(name)
+            for role in ("reader", "writer"):
+                print(f"  {role}s {summarize(latencies[role], args.duration)}"
+                      f"  {errors[role]} locked")
+
+
+if __name__ == "__main__":
+    main()
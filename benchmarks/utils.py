@@ -0,0 +1,69 @@
+"""
+Helpers shared by the benchmark scripts.
+
+The scripts run against a throw-away test database seeded with synthetic
+data, so they never touch db.sqlite3. Run them from the repository root,
+for example::
+
+    python -m benchmarks.explain_indexes
+"""
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """
+    Configures Django with the project settings.
+    """
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "SoftDeskSupport.settings")
+
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """
+    Creates the test database for the duration of the block and destroys it
+    afterwards.
+    """
+    from django.db import connection
+
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed(**kwargs):
+    """
+    Fills the database with the synthetic dataset of
+    `projectManagement.seeding.seed_data`, also run by the `seed_data`
+    management command.
+    """
+    from projectManagement.seeding import seed_data
+
+    return seed_data(**kwargs)
+
+
+def measure(func, repeat=20):
+    """
+    Calls `func` `repeat` times and returns the median duration in
+    milliseconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
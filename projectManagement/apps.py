@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProjectConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "projectManagement"
+
+    def ready(self):
+        from projectManagement import signals  # noqa: F401
@@ -0,0 +1,304 @@
+"""
+Async read views for ASGI deployments.
+
+The list and retrieve actions of the project, issue and comment ViewSets
+have async twins under ``/api/v1/async/``: the user, the membership set
+and the objects are read with Django's async ORM, pages with DRF's
+pagination run in a worker thread, and object permissions with the async
+checks of the permission classes. Querysets, filters, pagination,
+serializers and permissions are those of the ViewSets, so the responses
+are the same.
+
+Conditional GET (ETag) is only handled by the sync views.
+
+`EventStreamView` pushes the changes of the issues and comments of the
+user's projects over Server-Sent Events, from the in-process event hub.
+"""
+import asyncio
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+
+from authenticated.authentication import StatelessJWTAuthentication
+from projectManagement.changes import aget_latest_token
+from projectManagement.detail_cache import aget_project_detail
+from projectManagement.events import OVERFLOW, hub
+from projectManagement.instrumentation import set_endpoint, timed
+from projectManagement.membership import (
+    aget_member_project_ids, aget_user_project_ids
+)
+from projectManagement.renderers import FastJSONRenderer
+from projectManagement.serializers import EventsQuerySerializer
+from projectManagement.values_serializers import is_fast_list_enabled
+from projectManagement.views import (
+    CommentViewSet, IssueViewSet, ProjectViewSet
+)
+
+
+async def aauthenticate(request):
+    """
+    Returns the user of the JWT access token of the request, as the
+    authentication class of the API does, checking the state of the user
+    with the async ORM on a cache miss.
+    """
+    authentication = StatelessJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = header and authentication.get_raw_token(header)
+    if raw_token is None:
+        raise exceptions.NotAuthenticated()
+    return await authentication.aget_user(
+        authentication.get_validated_token(raw_token))
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    """
+    Returns the JSON response of the data.
+    """
+    return HttpResponse(
+        FastJSONRenderer().render(data),
+        status=status_code,
+        content_type=FastJSONRenderer.media_type,
+    )
+
+
+def render_exception(exc):
+    """
+    Returns the response of an API exception, shaped as DRF's exception
+    handler does.
+    """
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {"detail": exc.detail}
+    response = render(data, exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated,
+                        exceptions.AuthenticationFailed)):
+        response.status_code = status.HTTP_401_UNAUTHORIZED
+        response["WWW-Authenticate"] = (
+            StatelessJWTAuthentication().authenticate_header(None))
+    return response
+
+
+class AsyncReadView(View):
+    """
+    Async list or retrieve of the ViewSet `viewset_class`.
+    """
+
+    http_method_names = ["get"]
+    viewset_class = None
+
+    async def get(self, request, pk=None):
+        try:
+            user = await aauthenticate(request)
+            request = Request(request)
+            request.user = user
+            await aget_member_project_ids(request)
+
+            action = "list" if pk is None else "retrieve"
+            set_endpoint(f"{type(self).__name__}.{action}")
+            viewset = self.viewset_class(
+                request=request, args=(), kwargs={"pk": pk},
+                format_kwarg=None, action=action,
+            )
+            # the membership set is resolved: these checks are in memory
+            with timed("permissions_ms"):
+                viewset.check_permissions(request)
+            queryset = viewset.filter_queryset(viewset.get_queryset())
+            if pk is None:
+                data = await self.alist(viewset, queryset)
+            else:
+                data = await self.aretrieve(viewset, queryset, pk)
+        except Http404 as exc:
+            return render_exception(exceptions.NotFound(*exc.args))
+        except exceptions.APIException as exc:
+            return render_exception(exc)
+        with timed("serialize_ms"):
+            return render(data)
+
+    async def alist(self, viewset, queryset):
+        """
+        Returns the page of the list, represented from `.values()` rows
+        when the ViewSet has a values serializer, from the serializer of
+        the ViewSet otherwise.
+        """
+        get_values_serializer = getattr(
+            viewset, "get_values_serializer", None)
+        values_serializer = get_values_serializer and get_values_serializer()
+        if values_serializer is not None and is_fast_list_enabled():
+            queryset = values_serializer.values(queryset)
+            represent = values_serializer.to_representation
+        else:
+            def represent(page):
+                return viewset.get_serializer(page, many=True).data
+
+        page = await viewset.paginator.apaginate_queryset(
+            queryset, viewset.request, view=viewset)
+        if page is None:
+            page = [row async for row in queryset]
+            with timed("serialize_ms"):
+                return represent(page)
+        with timed("serialize_ms"):
+            data = represent(page)
+        return viewset.paginator.get_paginated_response(data).data
+
+    async def aretrieve(self, viewset, queryset, pk):
+        """
+        Returns the representation of the object, after checking the object
+        permissions.
+        """
+        instance = await aget_object_or_404(
+            queryset.prefetch_related(None), pk=pk)
+        await self.acheck_object_permissions(viewset, instance)
+        return await self.aget_retrieve_data(viewset, queryset, instance)
+
+    async def acheck_object_permissions(self, viewset, instance):
+        """
+        Runs the object checks of the permission classes of the ViewSet,
+        their async version when they have one.
+        """
+        for permission in viewset.get_permissions():
+            check = getattr(permission, "ahas_object_permission", None)
+            if check is not None:
+                allowed = await check(viewset.request, viewset, instance)
+            else:
+                allowed = permission.has_object_permission(
+                    viewset.request, viewset, instance)
+            if not allowed:
+                viewset.permission_denied(
+                    viewset.request,
+                    message=getattr(permission, "message", None),
+                    code=getattr(permission, "code", None),
+                )
+
+    async def aget_retrieve_data(self, viewset, queryset, instance):
+        """
+        Returns the representation of the object, loaded again with the
+        relations prefetched by the queryset.
+        """
+        if queryset._prefetch_related_lookups:
+            instance = await queryset.aget(pk=instance.pk)
+        with timed("serialize_ms"):
+            return viewset.get_serializer(instance).data
+
+
+class AsyncProjectView(AsyncReadView):
+    """
+    Async list and detail of the projects of the user. The detail is read
+    from the project detail cache.
+    """
+
+    viewset_class = ProjectViewSet
+
+    async def aget_retrieve_data(self, viewset, queryset, instance):
+        async def abuild():
+            return await super(AsyncProjectView, self).aget_retrieve_data(
+                viewset, queryset, instance)
+
+        return await aget_project_detail(instance.pk, abuild)
+
+
+class AsyncIssueView(AsyncReadView):
+    """
+    Async list and detail of the issues of the projects of the user.
+    """
+
+    viewset_class = IssueViewSet
+
+
+class AsyncCommentView(AsyncReadView):
+    """
+    Async list and detail of the comments of the projects of the user.
+    """
+
+    viewset_class = CommentViewSet
+
+
+def format_event(name, data, event_id=None):
+    """
+    Returns a Server-Sent Events message.
+    """
+    message = b"event: " + name.encode() + b"\ndata: "
+    message += FastJSONRenderer().render(data) + b"\n\n"
+    if event_id is not None:
+        message = f"id: {event_id}\n".encode() + message
+    return message
+
+
+async def stream_events(subscription, token):
+    """
+    Yields the messages of the stream: a `ready` event with the current
+    delta sync token, then the events of the subscription, with a comment
+    every `EVENT_STREAM_KEEPALIVE` seconds while idle. Ends with an
+    `overflow` event carrying the last token sent if the subscriber fell
+    behind.
+    """
+    try:
+        yield format_event("ready", {"token": token})
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), settings.EVENT_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is OVERFLOW:
+                yield format_event("overflow", {"token": token})
+                return
+            token = max(token, event["token"])
+            yield format_event(event["type"], event, event["token"])
+    finally:
+        hub.unsubscribe(subscription)
+
+
+class EventStreamView(View):
+    """
+    Server-Sent Events stream of the issues and comments created, updated
+    or deleted in the projects of the user, and of the user's
+    contributions. `?project=<id>` restricts it to one project.
+    """
+
+    http_method_names = ["get"]
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            # a WSGI server would buffer the endless stream
+            return render(
+                {
+                    "error": "Le flux d'événements nécessite un serveur ASGI.",  # noqa: E501
+                    "code": "asgi_required",
+                },
+                status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        try:
+            user = await aauthenticate(request)
+            serializer = EventsQuerySerializer(data=request.GET)
+            serializer.is_valid(raise_exception=True)
+        except exceptions.APIException as exc:
+            return render_exception(exc)
+
+        project = serializer.validated_data.get("project")
+        project_ids = await aget_user_project_ids(user.id)
+        if project is not None and project not in project_ids:
+            return render(
+                {
+                    "error": "Vous devez être contributeur du projet.",
+                    "code": "not_a_contributor",
+                },
+                status.HTTP_403_FORBIDDEN,
+            )
+        # subscribe before reading the token, so that no change falls
+        # between the token and the first event
+        subscription = hub.subscribe(user.id, project_ids, project)
+        token = await aget_latest_token()
+        response = StreamingHttpResponse(
+            stream_events(subscription, token),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -0,0 +1,245 @@
+"""
+Batched creation and update of issues.
+
+Every item of a batch is validated on its own, then the rules involving
+other rows (membership of the projects, contributor assignees, unique
+titles, authorship) are checked for the whole batch with one query each,
+and the valid items are written with a single bulk INSERT or UPDATE inside
+a transaction.
+"""
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from projectManagement.changes import issue_changes, record_changes
+from projectManagement.counters import Deltas
+from projectManagement.detail_cache import invalidate_project_detail
+from projectManagement.membership import get_member_project_ids
+from projectManagement.models import Contributor, Issue
+from projectManagement.serializers import IssueBulkItemSerializer
+
+MAX_BATCH_SIZE = 500
+
+UPDATABLE_FIELDS = [
+    "title", "description", "status", "priority", "nature", "assigned",
+    "project",
+]
+
+
+class BulkResult:
+    """
+    Collects the outcome of each item of a batch, in the order of the
+    input.
+    """
+
+    def __init__(self, size):
+        self.items = [None] * size
+
+    def error(self, index, errors):
+        self.items[index] = {"index": index, "errors": errors}
+
+    def success(self, index, status, issue_id):
+        self.items[index] = {"index": index, "status": status, "id": issue_id}
+
+    def skip_pending(self):
+        for index, item in enumerate(self.items):
+            if item is None:
+                self.items[index] = {"index": index, "status": "skipped"}
+
+    @property
+    def has_errors(self):
+        return any("errors" in item for item in self.items if item)
+
+
+def save_batch(write):
+    """
+    Runs the bulk write in a transaction. A conflict detected by the
+    database rolls back the whole batch.
+    """
+    try:
+        with transaction.atomic():
+            write()
+    except IntegrityError:
+        raise ValidationError({"error": (
+            "Le lot est en conflit avec des issues existantes, "
+            "aucune modification n'a été enregistrée.")})
+
+
+def validate_items(items, partial):
+    """
+    Validates the shape of every item without touching the database.
+    Returns the validated data by index and the result holding the errors.
+    """
+    result = BulkResult(len(items))
+    validated = {}
+    for index, item in enumerate(items):
+        serializer = IssueBulkItemSerializer(data=item, partial=partial)
+        if not serializer.is_valid():
+            result.error(index, serializer.errors)
+        elif partial and "id" not in serializer.validated_data:
+            result.error(index, {"id": ["Ce champ est obligatoire."]})
+        else:
+            validated[index] = serializer.validated_data
+    return validated, result
+
+
+def check_relations(request, targets, result, issue_ids=None):
+    """
+    Checks, for the whole batch, that the user contributes to the projects,
+    that assignees contribute to their project and that titles are unique
+    within a project. `targets` maps item indexes to the resulting
+    (project, assigned, title) of each issue, `issue_ids` the indexes of
+    updates to the id of their issue.
+
+    A title is taken while an issue holds it in the database, even one
+    renamed by the same batch, or once an earlier item of the batch claims
+    it: the rows are written by a single statement, which the database
+    checks row by row, so swapping titles within a batch is refused.
+    """
+    issue_ids = issue_ids or {}
+    member_project_ids = get_member_project_ids(request)
+    project_ids = {project for project, _, _ in targets.values()}
+    assignee_ids = {assigned for _, assigned, _ in targets.values()
+                    if assigned}
+    titles = {title for _, _, title in targets.values()}
+
+    contributors = set(
+        Contributor.objects.filter(
+            project_id__in=project_ids, user_id__in=assignee_ids
+        ).values_list("project_id", "user_id")
+    ) if assignee_ids else set()
+    holders = {
+        (project_id, title): issue_id
+        for project_id, title, issue_id in Issue.objects.filter(
+            project_id__in=project_ids, title__in=titles
+        ).values_list("project_id", "title", "id")
+    }
+
+    for index, (project, assigned, title) in targets.items():
+        issue_id = issue_ids.get(index)
+        if project not in member_project_ids:
+            result.error(index, {"project": [
+                "Vous devez être contributeur du projet."]})
+        elif assigned and (project, assigned) not in contributors:
+            result.error(index, {"assigned": [
+                "L'utilisateur assigné doit être contributeur du projet."]})
+        elif holders.get((project, title), issue_id) != issue_id:
+            result.error(index, {"title": [
+                "Ce titre est déjà utilisé dans ce projet."]})
+        else:
+            # an issue created by the batch is held by its item
+            holders[(project, title)] = (
+                issue_id if issue_id is not None else ("item", index))
+
+
+def bulk_create_issues(request, items, atomic):
+    """
+    Creates the valid issues of the batch, authored by the current user.
+    In atomic mode, nothing is written if any item is invalid.
+    """
+    validated, result = validate_items(items, partial=False)
+    check_relations(request, {
+        index: (data["project"], data.get("assigned"), data["title"])
+        for index, data in validated.items()
+    }, result)
+
+    indexes = [index for index in validated if result.items[index] is None]
+    if atomic and result.has_errors:
+        result.skip_pending()
+        return result
+    issues = [
+        Issue(
+            author_id=request.user.id,
+            **{key: value for key, value in validated[index].items()
+               if key not in ("id", "project", "assigned")},
+            project_id=validated[index]["project"],
+            assigned_id=validated[index].get("assigned"),
+        )
+        for index in indexes
+    ]
+
+    def write():
+        Issue.objects.bulk_create(issues)
+        # bulk_create does not send post_save
+        record_changes(issue_changes(issues))
+        deltas = Deltas()
+        for issue in issues:
+            deltas.add_issue(issue.project_id, issue.status)
+        deltas.apply()
+
+    save_batch(write)
+    invalidate_project_detail(*{issue.project_id for issue in issues})
+    for index, issue in zip(indexes, issues):
+        result.success(index, "created", issue.id)
+    return result
+
+
+def bulk_update_issues(request, items, atomic):
+    """
+    Applies the partial updates of the batch to issues authored by the
+    current user. In atomic mode, nothing is written if any item is
+    invalid.
+    """
+    validated, result = validate_items(items, partial=True)
+    issue_ids = {data["id"] for data in validated.values()}
+    issues = Issue.objects.filter(
+        id__in=issue_ids,
+        project_id__in=get_member_project_ids(request),
+    ).in_bulk()
+
+    targets = {}
+    target_ids = {}
+    for index, data in validated.items():
+        issue = issues.get(data["id"])
+        if issue is None:
+            result.error(index, {"id": ["Issue introuvable."]})
+        elif issue.author_id != request.user.id:
+            result.error(index, {"id": [
+                "Seul l'auteur peut modifier cette issue."]})
+        else:
+            targets[index] = (
+                data.get("project", issue.project_id),
+                data.get("assigned", issue.assigned_id),
+                data.get("title", issue.title),
+            )
+            target_ids[index] = issue.id
+    check_relations(request, targets, result, target_ids)
+
+    indexes = [index for index in targets if result.items[index] is None]
+    if atomic and result.has_errors:
+        result.skip_pending()
+        return result
+    updated = {}
+    fields = set()
+    for index in indexes:
+        data = validated[index]
+        issue = updated.setdefault(data["id"], issues[data["id"]])
+        for key, value in data.items():
+            if key in UPDATABLE_FIELDS:
+                setattr(issue, f"{key}_id" if key in ("project", "assigned")
+                        else key, value)
+                fields.add(key)
+    if fields:
+        # bulk_update does not apply auto_now
+        now = timezone.now()
+        for issue in updated.values():
+            issue.date_updated = now
+
+        def write():
+            Issue.objects.bulk_update(
+                list(updated.values()), [*sorted(fields), "date_updated"])
+            record_changes(issue_changes(updated.values()))
+            deltas = Deltas()
+            for issue in updated.values():
+                deltas.move_issue(
+                    issue, issue._loaded_project_id, issue._loaded_status)
+            deltas.apply()
+
+        save_batch(write)
+        invalidate_project_detail(*{
+            project_id for issue in updated.values()
+            for project_id in (issue.project_id, issue._loaded_project_id)
+        })
+    for index in indexes:
+        result.success(index, "updated", validated[index]["id"])
+    return result
@@ -0,0 +1,193 @@
+"""
+Change log of projects, issues, comments and contributors, read by the
+delta sync feed.
+
+Every write appends a `Change` entry: model signals record single writes,
+and the bulk paths, which bypass signals, record their changes explicitly.
+The entry is written in the transaction of the write it records (see
+`AtomicSaveModel`), so a committed write is never missing from the log.
+The feed returns, for the entries after a token, the current
+representation of each changed row, or a tombstone when the row was
+deleted or is no longer visible to the user (moved to another project,
+contributor removed).
+
+Rows deleted together with their project or issue get no tombstone of
+their own: the tombstone of the parent stands for them.
+"""
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.dispatch import Signal
+
+from projectManagement.models import (
+    Change, Comment, Contributor, Issue, Project
+)
+from projectManagement.serializers import (
+    CommentExportSerializer,
+    ContributorExportSerializer,
+    IssueExportSerializer,
+    ProjectExportSerializer,
+)
+from projectManagement.values_serializers import ValuesSerializer
+
+# model, project lookup and representation of each type of change
+CHANGE_TYPES = {
+    "project": (Project, "id",
+                ValuesSerializer(ProjectExportSerializer)),
+    "issue": (Issue, "project_id",
+              ValuesSerializer(IssueExportSerializer)),
+    "comment": (Comment, "issue__project_id",
+                ValuesSerializer(CommentExportSerializer)),
+    "contributor": (Contributor, "project_id",
+                    ValuesSerializer(ContributorExportSerializer)),
+}
+
+# sent with the saved entries once the transaction that wrote them commits
+changes_recorded = Signal()
+
+
+class SyncTokenExpired(Exception):
+    """
+    The entries following the token were pruned from the change log.
+    """
+
+
+def make_change(instance, deleted=False, project_id=None):
+    """
+    Returns the unsaved change log entry of a project, issue, comment or
+    contributor. `project_id` overrides the project of the instance, for
+    instance with the previous project of a moved issue.
+    """
+    change_type = instance._meta.model_name
+    if project_id is None:
+        if change_type == "project":
+            project_id = instance.pk
+        elif change_type == "comment":
+            project_id = instance.issue.project_id
+        else:
+            project_id = instance.project_id
+    return Change(
+        type=change_type,
+        object_id=str(instance.pk),
+        project_id=project_id,
+        user_id=instance.user_id if change_type == "contributor" else None,
+        deleted=deleted,
+    )
+
+
+def record_changes(changes):
+    """
+    Appends the given entries to the change log with a single INSERT, and
+    sends `changes_recorded` once the transaction commits.
+    """
+    changes = Change.objects.bulk_create(changes)
+    if changes:
+        transaction.on_commit(
+            lambda: changes_recorded.send(sender=Change, changes=changes))
+
+
+def issue_changes(issues):
+    """
+    Returns the entries of created or updated issues, with an entry for
+    the previous project of the moved ones.
+    """
+    changes = []
+    for issue in issues:
+        changes.append(make_change(issue))
+        previous = getattr(issue, "_loaded_project_id", None)
+        if previous is not None and previous != issue.project_id:
+            changes.append(make_change(issue, project_id=previous))
+    return changes
+
+
+def get_latest_token():
+    """
+    Returns the token of the last entry of the change log.
+    """
+    return Change.objects.aggregate(last=Max("id"))["last"] or 0
+
+
+async def aget_latest_token():
+    """
+    Async version of `get_latest_token`.
+    """
+    return (await Change.objects.aaggregate(last=Max("id")))["last"] or 0
+
+
+def check_token(since):
+    """
+    Raises SyncTokenExpired if entries following the token were pruned.
+    Pruning keeps the newest entry (see `prune_changes`): an empty log
+    was never written, unless it was emptied by other means, in which case
+    no token but 0 can be trusted.
+    """
+    first = Change.objects.aggregate(first=Min("id"))["first"]
+    if first is None:
+        expired = since > 0
+    else:
+        expired = since < first - 1
+    if expired:
+        raise SyncTokenExpired(since)
+
+
+def prune_changes(before):
+    """
+    Deletes the entries of the change log created before the given date,
+    except the newest entry: it keeps the head token (the token of the
+    last entry) and the detection of pruned tokens working when every
+    entry is old. Returns the number of entries deleted.
+    """
+    last = get_latest_token()
+    deleted, _ = Change.objects.filter(
+        date_created__lt=before, id__lt=last).delete()
+    return deleted
+
+
+def get_changes(user_id, project_ids, since, limit):
+    """
+    Returns the changes visible to the user after the token, at most
+    `limit` entries of the log, with the token to use next and whether more
+    changes follow. Each changed row appears once, with its current
+    representation or as a tombstone.
+    """
+    check_token(since)
+    entries = list(
+        Change.objects.filter(
+            Q(project_id__in=project_ids) | Q(user_id=user_id), id__gt=since,
+        ).order_by("id").values_list(
+            "id", "type", "object_id", "deleted")[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # last entry of each row
+    latest = {}
+    for token, change_type, object_id, deleted in entries:
+        latest.pop((change_type, object_id), None)
+        latest[(change_type, object_id)] = deleted
+
+    rows = {}
+    for change_type, (model, project_lookup, serializer) in (
+            CHANGE_TYPES.items()):
+        ids = [object_id for (kind, object_id), deleted in latest.items()
+               if kind == change_type and not deleted]
+        if ids:
+            queryset = model.objects.filter(
+                pk__in=ids, **{f"{project_lookup}__in": project_ids})
+            for item in serializer.to_representation(
+                    serializer.values(queryset)):
+                rows[(change_type, str(item["id"]))] = item
+
+    changes = []
+    for change_type, object_id in latest:
+        data = rows.get((change_type, object_id))
+        changes.append({
+            "type": change_type,
+            "id": object_id if change_type == "comment" else int(object_id),
+            "deleted": data is None,
+            "data": data,
+        })
+    return {
+        "changes": changes,
+        "next": entries[-1][0] if entries else since,
+        "has_more": has_more,
+    }
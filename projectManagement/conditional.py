@@ -0,0 +1,127 @@
+import hashlib
+
+from django.db.models import Max, prefetch_related_objects
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from projectManagement.instrumentation import timed
+from projectManagement.membership import get_member_project_ids
+from projectManagement.models import Project
+
+
+def latest(*dates):
+    """
+    Returns the most recent of the given dates, ignoring missing ones.
+    """
+    dates = [date for date in dates if date is not None]
+    return max(dates) if dates else None
+
+
+class ConditionalGetMixin:
+    """
+    Answers conditional GET requests (If-None-Match, If-Modified-Since) on
+    the list and retrieve actions of a ViewSet.
+
+    Validators are computed from aggregates of modification dates, before
+    any serialization: an unchanged resource costs one or two aggregate
+    queries and returns 304 Not Modified, without counting the rows of a
+    list. Deletions and contributor changes move the modification date of
+    the parent project or issue, and renaming a user that of the rows
+    showing the username (see `projectManagement.signals`), so they are
+    reflected in the validators.
+    """
+
+    def get_list_validators(self, queryset):
+        """
+        Returns the last modification date and the ETag components of a
+        list: the latest row of the list and of the projects of the user,
+        and the ids of these projects.
+        """
+        project_ids = sorted(get_member_project_ids(self.request))
+        rows = queryset.order_by().aggregate(last=Max("date_updated"))
+        projects = Project.objects.filter(id__in=project_ids).aggregate(
+            last=Max("date_updated"))
+        last_modified = latest(rows["last"], projects["last"])
+        return last_modified, [project_ids, last_modified]
+
+    def get_object_validators(self, instance):
+        """
+        Returns the last modification date and the ETag components of a
+        single object. Override to add the rows nested in its
+        representation.
+        """
+        return instance.date_updated, [instance.pk, instance.date_updated]
+
+    def get_conditional_object(self, queryset):
+        """
+        Returns the object of a detail request without its prefetched
+        relations, after checking object permissions.
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        instance = get_object_or_404(
+            queryset.prefetch_related(None),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]},
+        )
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+    def compute_etag(self, parts):
+        """
+        Hashes the ETag components with what else the response depends on:
+        the user, the URL and the negotiated media type.
+        """
+        key = repr([
+            self.request.user.id,
+            self.request.get_full_path(),
+            self.request.accepted_media_type,
+            *parts,
+        ])
+        return f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+    def conditional_response(self, last_modified, parts, build_response):
+        """
+        Returns 304 Not Modified when the client's validators match,
+        otherwise the response built by `build_response`, with its ETag and
+        Last-Modified headers.
+        """
+        etag = self.compute_etag(parts)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = build_response()
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        last_modified, parts = self.get_list_validators(queryset)
+        return self.conditional_response(
+            last_modified, parts,
+            lambda: super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        instance = self.get_conditional_object(queryset)
+        last_modified, parts = self.get_object_validators(instance)
+
+        return self.conditional_response(
+            last_modified, parts,
+            lambda: Response(self.get_retrieve_data(instance, queryset)),
+        )
+
+    def get_retrieve_data(self, instance, queryset):
+        """
+        Returns the representation of the object of a detail request, after
+        loading the relations prefetched by the queryset.
+        """
+        prefetch_related_objects(
+            [instance], *queryset._prefetch_related_lookups)
+        with timed("serialize_ms"):
+            return self.get_serializer(instance).data
@@ -0,0 +1,136 @@
+"""
+Denormalized issue and comment counters.
+
+Every project stores the number of its issues in each status and the
+number of their comments, and every issue the number of its comments, so
+that the project list can show them without aggregating issues and
+comments.
+
+The counters are moved with relative ``UPDATE ... SET count = count + n``
+statements, in the transaction of the write: model signals cover the
+single writes and the bulk paths, which bypass signals, apply their
+deltas explicitly. `rebuild_counters` recomputes them from the rows, for
+instance after writes that bypassed both (fixtures, raw SQL).
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from projectManagement.models import Comment, Issue, Project
+
+STATUS_FIELDS = {
+    "To Do": "issues_todo_count",
+    "In Progress": "issues_in_progress_count",
+    "Finished": "issues_finished_count",
+}
+
+COUNTER_FIELDS = [*STATUS_FIELDS.values(), "comments_count"]
+
+
+class Deltas:
+    """
+    Collects the changes of the counters of several projects and issues,
+    then applies them with one UPDATE per project and per issue.
+    """
+
+    def __init__(self):
+        self.projects = defaultdict(Counter)
+        self.issues = Counter()
+
+    def add_issue(self, project_id, status, comments_count=0, sign=1):
+        """
+        Counts an issue, and its comments, in a project (`sign=-1` to
+        remove it).
+        """
+        self.projects[project_id][STATUS_FIELDS[status]] += sign
+        self.projects[project_id]["comments_count"] += sign * comments_count
+
+    def move_issue(self, issue, previous_project_id, previous_status):
+        """
+        Moves the issue and its comments from its previous project and
+        status to the current ones.
+        """
+        if (previous_project_id, previous_status) != (
+                issue.project_id, issue.status):
+            self.add_issue(previous_project_id, previous_status,
+                           issue.comments_count, sign=-1)
+            self.add_issue(issue.project_id, issue.status,
+                           issue.comments_count)
+
+    def add_comment(self, issue_id, project_id, sign=1):
+        self.issues[issue_id] += sign
+        self.projects[project_id]["comments_count"] += sign
+
+    def apply(self):
+        """
+        Writes the non-zero deltas. Projects also get a new modification
+        date, since their list representation shows the counters.
+        Counters that drifted are kept at zero rather than failing the
+        write.
+        """
+        now = timezone.now()
+        for project_id, counts in self.projects.items():
+            changes = {field: shift(field, delta)
+                       for field, delta in counts.items() if delta}
+            if changes:
+                Project.objects.filter(pk=project_id).update(
+                    date_updated=now, **changes)
+        for issue_id, delta in self.issues.items():
+            if delta:
+                Issue.objects.filter(pk=issue_id).update(
+                    comments_count=shift("comments_count", delta))
+
+
+def shift(field, delta):
+    """
+    Returns the expression adding `delta` to a counter, without going
+    below zero.
+    """
+    if delta > 0:
+        return F(field) + delta
+    return Greatest(F(field) + delta, 0)
+
+
+def count_subquery(queryset, outer_field):
+    """
+    Returns the number of rows of `queryset` whose `outer_field` is the
+    primary key of the outer row, as a correlated subquery.
+    """
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{outer_field: OuterRef("pk")})
+            .order_by().values(outer_field)
+            .annotate(count=Count("pk")).values("count"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def rebuild_counters(project_ids, batch_size=500):
+    """
+    Recomputes the counters of the given projects and of their issues, by
+    batches of projects, each in its own transaction. The projects get a
+    new modification date, so that cached lists are refreshed. Returns the
+    number of projects rebuilt.
+    """
+    project_ids = sorted(project_ids)
+    project_counts = {
+        field: count_subquery(Issue.objects.filter(status=status),
+                              "project_id")
+        for status, field in STATUS_FIELDS.items()
+    }
+    project_counts["comments_count"] = count_subquery(
+        Comment.objects.all(), "issue__project_id")
+    for start in range(0, len(project_ids), batch_size):
+        batch = project_ids[start:start + batch_size]
+        with transaction.atomic():
+            Issue.objects.filter(project_id__in=batch).update(
+                comments_count=count_subquery(
+                    Comment.objects.all(), "issue_id"))
+            Project.objects.filter(pk__in=batch).update(
+                date_updated=timezone.now(), **project_counts)
+    return len(project_ids)
@@ -0,0 +1,53 @@
+"""
+Tuning of the SQLite connections.
+
+Every new SQLite connection runs the PRAGMA statements of the
+`SQLITE_PRAGMAS` setting, from the `connection_created` signal (see
+`projectManagement.signals`). The default profile of the settings:
+- ``journal_mode = wal``: readers no longer block the writer, nor the
+  writer the readers,
+- ``synchronous = normal``: the WAL is synced at checkpoints only, not at
+  every commit (a power loss may lose the last transactions, never
+  corrupt the database),
+- ``mmap_size`` and ``cache_size``: pages read through the memory map and
+  a larger page cache per connection,
+- ``busy_timeout``: a writer waits for the lock instead of failing with
+  "database is locked".
+Together with persistent connections (``CONN_MAX_AGE``, under WSGI only),
+the pragmas run once per connection rather than once per request.
+
+The statements run on the DB-API connection, so they are not counted in
+the queries of the request that opened the connection.
+"""
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+PRAGMA_NAME = re.compile(r"^[a-z_]+$")
+PRAGMA_VALUE = re.compile(r"^(-?\d+|[A-Za-z]+)$")
+
+
+def get_sqlite_pragmas():
+    """
+    Returns the PRAGMA statements to run on every new SQLite connection,
+    from the `SQLITE_PRAGMAS` setting.
+    """
+    statements = []
+    for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+        if not PRAGMA_NAME.match(name) or not PRAGMA_VALUE.match(str(value)):
+            raise ImproperlyConfigured(
+                f"Invalid SQLite pragma in SQLITE_PRAGMAS: {name!r}: "
+                f"{value!r}.")
+        statements.append(f"PRAGMA {name} = {value}")
+    return statements
+
+
+def configure_connection(connection):
+    """
+    Runs the `SQLITE_PRAGMAS` statements on a new SQLite connection.
+    """
+    if connection.vendor != "sqlite":
+        return
+    for statement in get_sqlite_pragmas():
+        connection.connection.execute(statement)
@@ -0,0 +1,173 @@
+"""
+Cache of the serialized detail of each project.
+
+The detail of a project (its contributors and issues) is the same for every
+contributor, so it is serialized once and shared. Each project has a
+version token: the cached detail is stored under the current version, and
+invalidating a project only replaces its token, which orphans the previous
+entry. A detail rebuilt while the project changes is stored under the old
+token and never served.
+
+Permission checks are not cached: the views check them before reading the
+cache.
+
+The version tokens are only shared by the processes sharing the cache of
+``PROJECT_DETAIL_CACHE_ALIAS``. With the default local-memory backend,
+every worker has its own tokens and a change invalidates the detail in the
+worker serving it only: the other workers serve their stale detail until
+``PROJECT_DETAIL_CACHE_TIMEOUT``. Several workers need a shared backend.
+"""
+import time
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = "project_detail:{project_id}:version"
+DETAIL_KEY = "project_detail:{project_id}:{version}"
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "invalidations": 0,
+    "rebuild_ms_total": 0.0,
+    "rebuild_ms_max": 0.0,
+}
+_stats_lock = Lock()
+
+
+def get_project_detail_cache():
+    """
+    Returns the cache holding the project details, configured by the
+    `PROJECT_DETAIL_CACHE_ALIAS` setting.
+    """
+    return caches[settings.PROJECT_DETAIL_CACHE_ALIAS]
+
+
+def new_version():
+    """
+    Returns a version token that was never used by any project.
+    """
+    return time.time_ns()
+
+
+def get_project_version(cache, project_id):
+    """
+    Returns the current version token of the project, creating one if the
+    project has none.
+    """
+    key = VERSION_KEY.format(project_id=project_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), settings.PROJECT_DETAIL_CACHE_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+async def aget_project_version(cache, project_id):
+    """
+    Async version of `get_project_version`.
+    """
+    key = VERSION_KEY.format(project_id=project_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(
+            key, new_version(), settings.PROJECT_DETAIL_CACHE_TIMEOUT)
+        version = await cache.aget(key)
+    return version
+
+
+def _record_hit():
+    with _stats_lock:
+        _stats["hits"] += 1
+
+
+def _record_rebuild(start):
+    elapsed = (time.perf_counter() - start) * 1000
+    with _stats_lock:
+        _stats["misses"] += 1
+        _stats["rebuild_ms_total"] += elapsed
+        _stats["rebuild_ms_max"] = max(_stats["rebuild_ms_max"], elapsed)
+
+
+def get_project_detail(project_id, build):
+    """
+    Returns the cached detail of the project, or builds it with `build` on
+    a cache miss and stores it under the current version of the project.
+    """
+    cache = get_project_detail_cache()
+    key = DETAIL_KEY.format(
+        project_id=project_id, version=get_project_version(cache, project_id))
+    data = cache.get(key)
+    if data is not None:
+        _record_hit()
+        return data
+
+    start = time.perf_counter()
+    data = build()
+    cache.set(key, data, settings.PROJECT_DETAIL_CACHE_TIMEOUT)
+    _record_rebuild(start)
+    return data
+
+
+async def aget_project_detail(project_id, abuild):
+    """
+    Async version of `get_project_detail`: `abuild` is a coroutine
+    function.
+    """
+    cache = get_project_detail_cache()
+    key = DETAIL_KEY.format(
+        project_id=project_id,
+        version=await aget_project_version(cache, project_id),
+    )
+    data = await cache.aget(key)
+    if data is not None:
+        _record_hit()
+        return data
+
+    start = time.perf_counter()
+    data = await abuild()
+    await cache.aset(key, data, settings.PROJECT_DETAIL_CACHE_TIMEOUT)
+    _record_rebuild(start)
+    return data
+
+
+def invalidate_project_detail(*project_ids):
+    """
+    Gives the given projects a new version, so that their cached detail is
+    rebuilt on the next read.
+    """
+    project_ids = {
+        project_id for project_id in project_ids if project_id is not None}
+    get_project_detail_cache().set_many(
+        {VERSION_KEY.format(project_id=project_id): new_version()
+         for project_id in project_ids},
+        settings.PROJECT_DETAIL_CACHE_TIMEOUT,
+    )
+    with _stats_lock:
+        _stats["invalidations"] += len(project_ids)
+
+
+def get_project_detail_cache_stats():
+    """
+    Returns the counters of the project detail cache for this process, with
+    the hit ratio and the mean time spent rebuilding a detail.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else None
+    stats["rebuild_ms_mean"] = (
+        stats["rebuild_ms_total"] / stats["misses"]
+        if stats["misses"] else None
+    )
+    return stats
+
+
+def reset_project_detail_cache_stats():
+    """
+    Resets the counters of the project detail cache.
+    """
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,204 @@
+"""
+In-process hub of the real-time event stream.
+
+Every entry appended to the change log is published to the hub once its
+transaction commits. Each open event stream subscribes to the hub with a
+bounded queue: the hub routes to it the project, issue and comment events
+of the projects its user contributes to, and the contributor events of the
+user, which also update the projects it follows. A deleted project is
+streamed as its tombstone, which stands for its issues and comments, then
+the tombstones of its contributors.
+
+The event id is the id of the change log entry, that is a delta sync
+token: a client whose stream is interrupted catches up with
+``/api/v1/changes/?since=<last event id>``. A subscriber that does not
+read fast enough to keep its queue below `EVENT_STREAM_QUEUE_SIZE` is
+closed with an overflow event instead of slowing down the writers.
+
+The hub only sees the writes of its own process: with several server
+processes, each stream only receives the writes served by its process.
+"""
+import asyncio
+from collections import defaultdict
+from threading import Lock
+
+from django.conf import settings
+from django.db.models import F
+
+from projectManagement.changes import CHANGE_TYPES
+
+STREAM_TYPES = ("project", "issue", "comment", "contributor")
+
+# queued in place of the events of a subscriber that fell behind
+OVERFLOW = object()
+
+
+class Subscription:
+    """
+    Bounded queue of the events of one stream. Events are put in the event
+    loop of the stream, the routing fields are owned by the hub.
+    """
+
+    def __init__(self, user_id, project_ids, project=None, maxsize=None):
+        self.user_id = user_id
+        self.project = project
+        self.project_ids = set(project_ids)
+        if project is not None:
+            self.project_ids &= {project}
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(
+            maxsize or settings.EVENT_STREAM_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event):
+        """
+        Queues the event, or replaces the pending events with `OVERFLOW`
+        when the queue is full. Runs in the event loop of the stream.
+        """
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+    def wants(self, change):
+        """
+        Returns True if the change concerns the stream.
+        """
+        if change.type not in STREAM_TYPES:
+            return False
+        if change.type == "contributor" and change.user_id == self.user_id:
+            return self.project is None or change.project_id == self.project
+        return change.project_id in self.project_ids
+
+
+class EventHub:
+    """
+    Routes the published changes to the subscriptions of their projects
+    and of their users.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._by_project = defaultdict(set)
+        self._by_user = defaultdict(set)
+
+    def subscribe(self, user_id, project_ids, project=None, maxsize=None):
+        """
+        Returns a new subscription of the user, to the given projects or
+        to `project` only. Must be called from the event loop of the
+        stream.
+        """
+        subscription = Subscription(user_id, project_ids, project, maxsize)
+        with self._lock:
+            self._by_user[user_id].add(subscription)
+            for project_id in subscription.project_ids:
+                self._by_project[project_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._discard(self._by_user, subscription.user_id, subscription)
+            for project_id in subscription.project_ids:
+                self._discard(self._by_project, project_id, subscription)
+
+    @staticmethod
+    def _discard(index, key, subscription):
+        subscriptions = index.get(key)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del index[key]
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._by_user.values())
+
+    def _follow_membership(self, change):
+        """
+        Adds or removes the project of a contributor change to the
+        subscriptions of its user.
+        """
+        for subscription in self._by_user.get(change.user_id, ()):
+            if change.deleted:
+                subscription.project_ids.discard(change.project_id)
+                self._discard(
+                    self._by_project, change.project_id, subscription)
+            elif subscription.project in (None, change.project_id):
+                subscription.project_ids.add(change.project_id)
+                self._by_project[change.project_id].add(subscription)
+
+    def publish(self, changes):
+        """
+        Sends the events of the change log entries to the subscriptions
+        they concern. The rows are only read when someone listens.
+        """
+        routes = []
+        with self._lock:
+            if not self._by_user:
+                return
+            for change in changes:
+                targets = set(self._by_project.get(change.project_id, ()))
+                if change.type == "contributor":
+                    targets |= self._by_user.get(change.user_id, set())
+                    self._follow_membership(change)
+                targets = [sub for sub in targets if sub.wants(change)]
+                if targets:
+                    routes.append((change, targets))
+        if not routes:
+            return
+
+        events = get_events([change for change, _ in routes])
+        for (change, targets), event in zip(routes, events):
+            for subscription in targets:
+                try:
+                    subscription.loop.call_soon_threadsafe(
+                        subscription.put, event)
+                except RuntimeError:
+                    # the loop of the stream is closed
+                    self.unsubscribe(subscription)
+
+
+def get_events(changes):
+    """
+    Returns the event of each change log entry: its current
+    representation, or a tombstone when the row was deleted or no longer
+    belongs to the project of the entry (moved issue).
+    """
+    rows = {}
+    for change_type, (model, project_lookup, serializer) in (
+            CHANGE_TYPES.items()):
+        ids = {change.object_id for change in changes
+               if change.type == change_type and not change.deleted}
+        if not ids:
+            continue
+        values = list(model.objects.filter(pk__in=ids).values(
+            *serializer.columns, event_project_id=F(project_lookup)))
+        for row, data in zip(values, serializer.to_representation(values)):
+            rows[(change_type, str(data["id"]))] = (
+                row["event_project_id"], data)
+
+    events = []
+    for change in changes:
+        project_id, data = rows.get((change.type, change.object_id),
+                                    (None, None))
+        if project_id != change.project_id:
+            data = None
+        events.append({
+            "token": change.id,
+            "type": change.type,
+            "id": (change.object_id if change.type == "comment"
+                   else int(change.object_id)),
+            "project": change.project_id,
+            "deleted": data is None,
+            "data": data,
+        })
+    return events
+
+
+hub = EventHub()
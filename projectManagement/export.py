@@ -0,0 +1,105 @@
+"""
+Streaming export of a project as newline-delimited JSON.
+
+Every line is a JSON object ``{"type": ..., "data": ...}``: the project
+first, then its issues, then the comments of its issues. Rows are read
+from the database in chunks of `EXPORT_CHUNK_SIZE` with
+`QuerySet.iterator()` and turned into JSON without instantiating models
+(see `projectManagement.values_serializers`), so memory does not grow with
+the size of the project.
+
+`iter_project_export` is a generator for WSGI servers. ASGI servers
+consume a sync generator entirely before sending it, which would hold the
+whole export in memory: they stream `aiter_project_export` instead, which
+reads each chunk with `QuerySet.aiterator()`.
+"""
+from projectManagement.models import Comment, Issue, Project
+from projectManagement.renderers import FastJSONRenderer
+from projectManagement.serializers import (
+    CommentExportSerializer, IssueExportSerializer, ProjectExportSerializer
+)
+from projectManagement.values_serializers import ValuesSerializer
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_CONTENT_TYPE = "application/x-ndjson"
+
+PROJECT_EXPORT = ValuesSerializer(ProjectExportSerializer)
+ISSUE_EXPORT = ValuesSerializer(IssueExportSerializer)
+COMMENT_EXPORT = ValuesSerializer(CommentExportSerializer)
+
+
+def iter_rows(queryset, chunk_size):
+    """
+    Yields the rows of the queryset in lists of at most `chunk_size` rows,
+    fetched with a server-side cursor when the database supports it.
+    """
+    chunk = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def aiter_rows(queryset, chunk_size):
+    """
+    Async variant of `iter_rows`.
+    """
+    chunk = []
+    async for row in queryset.aiterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def get_export_sections(project_id):
+    """
+    Returns the sections of the export of a project: their type, their
+    serializer and their rows.
+    """
+    return [
+        ("project", PROJECT_EXPORT,
+         Project.objects.filter(pk=project_id)),
+        ("issue", ISSUE_EXPORT,
+         Issue.objects.filter(project_id=project_id).order_by("id")),
+        ("comment", COMMENT_EXPORT,
+         Comment.objects.filter(issue__project_id=project_id).order_by(
+             "issue_id", "date_created", "id")),
+    ]
+
+
+def render_lines(renderer, kind, serializer, rows):
+    """
+    Returns the NDJSON lines of a chunk of rows.
+    """
+    return b"".join(
+        renderer.render({"type": kind, "data": item}) + b"\n"
+        for item in serializer.to_representation(rows)
+    )
+
+
+def iter_project_export(project_id, chunk_size=None):
+    """
+    Yields the NDJSON export of the project, one chunk of lines at a time.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    renderer = FastJSONRenderer()
+    for kind, serializer, queryset in get_export_sections(project_id):
+        for rows in iter_rows(serializer.values(queryset), chunk_size):
+            yield render_lines(renderer, kind, serializer, rows)
+
+
+async def aiter_project_export(project_id, chunk_size=None):
+    """
+    Async variant of `iter_project_export`, for ASGI servers.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    renderer = FastJSONRenderer()
+    for kind, serializer, queryset in get_export_sections(project_id):
+        async for rows in aiter_rows(serializer.values(queryset), chunk_size):
+            yield render_lines(renderer, kind, serializer, rows)
@@ -0,0 +1,80 @@
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from projectManagement.models import Issue
+
+
+class IssueFilterSerializer(serializers.Serializer):
+    """
+    Validates the query parameters used to filter the list of issues.
+    """
+
+    status = serializers.ChoiceField(
+        choices=Issue.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(
+        choices=Issue.PRIORITY_CHOICES, required=False)
+    nature = serializers.ChoiceField(
+        choices=Issue.NATURE_CHOICES, required=False)
+    assigned = serializers.IntegerField(min_value=1, required=False)
+    author = serializers.IntegerField(min_value=1, required=False)
+    project = serializers.IntegerField(min_value=1, required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+
+class IssueFilterBackend(BaseFilterBackend):
+    """
+    Filters the list of issues from the query parameters.
+    Each parameter becomes a WHERE clause on an indexed column of the
+    issue table (see the indexes declared on `Issue`).
+    """
+
+    lookups = {
+        "status": "status",
+        "priority": "priority",
+        "nature": "nature",
+        "assigned": "assigned_id",
+        "author": "author_id",
+        "project": "project_id",
+        "created_after": "date_created__gte",
+        "created_before": "date_created__lt",
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        if view.action != "list":
+            return queryset
+        serializer = IssueFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return queryset.filter(**{
+            self.lookups[name]: value
+            for name, value in serializer.validated_data.items()
+        })
+
+
+class IssueOrderingFilter(OrderingFilter):
+    """
+    Orders the list of issues with the `ordering` query parameter.
+    Only the orderings backed by an index are accepted, any other value is
+    rejected instead of being silently ignored.
+    The primary key is added as a tie-breaker for cursor pagination.
+    """
+
+    orderings = {
+        "date_created": ("date_created", "id"),
+        "-date_created": ("-date_created", "-id"),
+        "id": ("id",),
+        "-id": ("-id",),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        param = request.query_params.get(self.ordering_param)
+        if not param:
+            return None
+        if param not in self.orderings:
+            raise ValidationError({
+                self.ordering_param:
+                    f"Tri non supporté : {param}. Valeurs possibles : "
+                    f"{', '.join(self.orderings)}."
+            })
+        return self.orderings[param]
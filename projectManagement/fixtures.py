@@ -0,0 +1,398 @@
+"""
+Streaming loader of Django JSON fixtures, for dumps too large for
+`loaddata`.
+
+`loaddata` parses the whole file in memory and saves the objects one at
+a time, sending the model signals. Here the file is parsed incrementally,
+one object at a time, and spooled to one temporary file per model. The
+models are then inserted in foreign key dependency order (User, Project,
+Contributor, Issue, Comment...) by batches of multi-row inserts, in a
+single transaction: memory stays bounded by the batch size whatever the
+size of the dump.
+
+As with `loaddata`, objects whose primary key already exists are
+updated, and foreign keys are checked once everything is loaded. Bulk
+inserts bypass the model signals: the counters are rebuilt and the
+membership, project detail and token state caches cleared afterwards.
+The search index triggers are suspended during the inserts and the index
+rebuilt once at the end. Loaded rows are not written to the change log
+(neither are those of `loaddata`).
+"""
+import gzip
+import json
+import tempfile
+from contextlib import nullcontext
+from datetime import datetime
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.color import no_style
+from django.core.serializers.python import Deserializer
+from django.db import connection, connections, models, transaction
+
+from projectManagement.counters import rebuild_counters
+from projectManagement.models import Comment, Issue, Project
+from projectManagement.search import search_index_suspended
+
+WHITESPACE = " \t\r\n"
+
+
+class FixtureError(ValueError):
+    """
+    Raised when the fixture is not a JSON array of objects.
+    """
+
+
+def open_fixture(path):
+    """
+    Opens a JSON fixture for reading, gzip-compressed when its name ends
+    with ``.gz``.
+    """
+    if str(path).endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def iter_json_array(file, chunk_size=1 << 16, with_text=False):
+    """
+    Yields the items of the JSON array of a text file, reading it by
+    chunks of `chunk_size` characters: only the current item and the
+    current chunk are held in memory. With `with_text`, yields each item
+    with its JSON text.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position = "", 0
+
+    def read():
+        """
+        Appends the next chunk to the unread part of the buffer. Returns
+        False at the end of the file.
+        """
+        nonlocal buffer, position
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return False
+        buffer, position = buffer[position:] + chunk, 0
+        return True
+
+    def next_char():
+        """
+        Skips whitespace and returns the next character, or None at the
+        end of the file.
+        """
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in WHITESPACE:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not read():
+                return None
+
+    if next_char() != "[":
+        raise FixtureError("A JSON array is expected.")
+    position += 1
+    if next_char() == "]":
+        return
+    while True:
+        if next_char() is None:
+            raise FixtureError("Unterminated JSON array.")
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as exc:
+                # the item may continue in the next chunk
+                if read():
+                    continue
+                raise FixtureError(f"Invalid JSON: {exc}") from exc
+            # an item ending with the buffer may be a truncated number
+            if end < len(buffer) or not read():
+                break
+        if with_text:
+            yield item, buffer[position:end]
+        else:
+            yield item
+        position = end
+
+        char = next_char()
+        if char == "]":
+            return
+        if char != ",":
+            raise FixtureError(f"',' or ']' expected, got {char!r}.")
+        position += 1
+
+
+def get_model(item):
+    """
+    Returns the model of a fixture object.
+    """
+    try:
+        return apps.get_model(item["model"])
+    except (KeyError, LookupError, TypeError, ValueError):
+        raise FixtureError(f"Invalid model in {item!r:.200}.")
+
+
+def spool_fixture(file, exclude=()):
+    """
+    Parses the fixture and writes each object as a line of the temporary
+    file of its model, unless the model or its application is excluded.
+    Returns the temporary file of each model.
+    """
+    exclude = {label.lower() for label in exclude}
+    spools = {}
+    for item, text in iter_json_array(file, with_text=True):
+        model = get_model(item)
+        if exclude & {model._meta.app_label.lower(),
+                      model._meta.label.lower()}:
+            continue
+        if model not in spools:
+            spools[model] = tempfile.TemporaryFile("w+", encoding="utf-8")
+        # JSON strings cannot hold raw newlines, but pretty-printed
+        # objects can span several lines
+        if "\n" in text or "\r" in text:
+            text = json.dumps(item, separators=(",", ":"))
+        spools[model].write(text + "\n")
+    return spools
+
+
+def sort_models(models):
+    """
+    Returns the models sorted so that the models referenced by a foreign
+    key come before the models referencing them. Models in a cycle keep
+    their order at the end, the foreign keys being checked after the load.
+    """
+    remaining = sorted(models, key=lambda model: model._meta.label)
+    dependencies = {
+        model: {field.related_model for field in model._meta.concrete_fields
+                if field.is_relation and field.related_model is not model}
+        & set(models)
+        for model in remaining
+    }
+    ordered = []
+    while remaining:
+        ready = [model for model in remaining
+                 if not dependencies[model] - set(ordered)]
+        if not ready:
+            ordered.extend(remaining)
+            break
+        ordered.extend(ready)
+        remaining = [model for model in remaining if model not in ready]
+    return ordered
+
+
+# fields whose JSON value is already the database value
+PLAIN_TYPES = {
+    "AutoField", "BigAutoField", "SmallAutoField", "BooleanField",
+    "CharField", "EmailField", "SlugField", "TextField", "URLField",
+    "IntegerField", "BigIntegerField", "SmallIntegerField",
+    "PositiveIntegerField", "PositiveBigIntegerField",
+    "PositiveSmallIntegerField",
+}
+
+
+class ModelLoader:
+    """
+    Inserts the fixture objects of one model with a prepared multi-row
+    INSERT, updating the rows whose primary key exists.
+
+    Rows are built from the fixture values with one converter per field,
+    set up once: plain values (text, numbers, booleans, integer keys) are
+    used as they are, the others go through the field (`to_python`, then
+    `get_db_prep_save`). Objects using natural keys are deserialized by
+    Django. Fixture values are inserted as they are, like raw saves:
+    ``auto_now`` dates are kept.
+    """
+
+    def __init__(self, model, ignorenonexistent=False):
+        self.model = model
+        self.ignorenonexistent = ignorenonexistent
+        self.fields = [field for field in model._meta.concrete_fields
+                       if not field.generated]
+        self.converters = [self.get_converter(field)
+                           for field in self.fields]
+        self.many_to_many = [
+            field for field in model._meta.many_to_many
+            if field.remote_field.through._meta.auto_created]
+        self.names = {field.name for field in self.fields} | {
+            field.name for field in model._meta.many_to_many}
+        self.relations = [field.name for field in self.fields
+                          if field.is_relation]
+        self.sql = self.get_insert_sql()
+
+    @staticmethod
+    def get_converter(field):
+        target = field.target_field if field.is_relation else field
+        if target.get_internal_type() in PLAIN_TYPES:
+            return None
+        # the connection itself, not its proxy, for the hot loop
+        database = connections[connection.alias]
+
+        def convert(value):
+            return field.get_db_prep_save(field.to_python(value), database)
+
+        if isinstance(target, models.DateTimeField) and settings.USE_TZ:
+            def convert_datetime(value):
+                """
+                Shortcut for the aware ISO 8601 dates of dumpdata.
+                """
+                try:
+                    value = datetime.fromisoformat(value)
+                except (TypeError, ValueError):
+                    return convert(value)
+                if value.tzinfo is None:
+                    return convert(value)
+                if database.vendor == "sqlite":
+                    # what adapt_datetimefield_value does, minus its checks
+                    return str(value.astimezone(database.timezone).replace(
+                        tzinfo=None))
+                return database.ops.adapt_datetimefield_value(value)
+
+            return convert_datetime
+        return convert
+
+    def get_insert_sql(self):
+        quote = connection.ops.quote_name
+        columns = [quote(field.column) for field in self.fields]
+        sql = (f"INSERT INTO {quote(self.model._meta.db_table)} "
+               f"({', '.join(columns)}) "
+               f"VALUES ({', '.join(['%s'] * len(columns))})")
+        updates = [f"{column} = EXCLUDED.{column}"
+                   for field, column in zip(self.fields, columns)
+                   if not field.primary_key]
+        if updates:
+            sql += (f" ON CONFLICT ({quote(self.model._meta.pk.column)}) "
+                    f"DO UPDATE SET {', '.join(updates)}")
+        return sql
+
+    def get_row(self, item):
+        """
+        Returns the database row of a fixture object, and its many-to-many
+        values.
+        """
+        values = item.get("fields", {})
+        if not self.ignorenonexistent and not values.keys() <= self.names:
+            raise FixtureError(
+                f"{self.model._meta.label} has no field named "
+                f"{sorted(values.keys() - self.names)[0]!r}.")
+        if any(isinstance(values.get(name), list)
+               for name in self.relations) or any(
+                isinstance(value, list)
+                for field in self.many_to_many
+                for value in values.get(field.name, ())):
+            return self.get_natural_row(item)
+
+        row = []
+        for field, convert in zip(self.fields, self.converters):
+            if field.primary_key and item.get("pk") is not None:
+                value = item["pk"]
+            elif field.name in values:
+                value = values[field.name]
+            else:
+                row.append(field.get_db_prep_save(
+                    field.get_default(), connection))
+                continue
+            if convert is not None and value is not None:
+                value = convert(value)
+            row.append(value)
+        many_to_many = {field.name: values[field.name]
+                        for field in self.many_to_many
+                        if field.name in values}
+        return row, many_to_many
+
+    def get_natural_row(self, item):
+        """
+        `get_row` for the objects referencing others by natural keys,
+        resolved by Django's deserializer.
+        """
+        (deserialized,) = Deserializer(
+            [item], using=connection.alias,
+            ignorenonexistent=self.ignorenonexistent)
+        row = [field.get_db_prep_save(
+                   getattr(deserialized.object, field.attname), connection)
+               for field in self.fields]
+        return row, deserialized.m2m_data or {}
+
+    def insert(self, rows):
+        """
+        Inserts the rows and replaces the many-to-many relations of their
+        objects with those of the fixture.
+        """
+        with connection.cursor() as cursor:
+            cursor.executemany(self.sql, [row for row, _ in rows])
+        pk_index = self.fields.index(self.model._meta.pk)
+        for field in self.many_to_many:
+            relations = {row[pk_index]: many_to_many[field.name]
+                         for row, many_to_many in rows
+                         if field.name in many_to_many}
+            if relations:
+                self.set_many_to_many(field, relations)
+
+    @staticmethod
+    def set_many_to_many(field, relations):
+        through = field.remote_field.through
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        through._base_manager.filter(
+            **{f"{source}__in": list(relations)}).delete()
+        through._base_manager.bulk_create(
+            [through(**{f"{source}_id": pk, f"{target}_id": related_pk})
+             for pk, related_pks in relations.items()
+             for related_pk in related_pks],
+            ignore_conflicts=True,
+        )
+
+    def load(self, spool, batch_size):
+        """
+        Inserts the objects of the temporary file of the model, by
+        batches. Returns the number of objects loaded.
+        """
+        spool.seek(0)
+        loaded = 0
+        rows = []
+        for line in spool:
+            rows.append(self.get_row(json.loads(line)))
+            if len(rows) >= batch_size:
+                self.insert(rows)
+                loaded += len(rows)
+                rows = []
+        if rows:
+            self.insert(rows)
+            loaded += len(rows)
+        return loaded
+
+
+def load_fixture(path, batch_size=1000, exclude=(), ignorenonexistent=False):
+    """
+    Loads a JSON fixture (gzip-compressed or not) in one transaction, and
+    returns the number of objects loaded per model label.
+    """
+    with open_fixture(path) as file:
+        spools = spool_fixture(file, exclude)
+    try:
+        models = sort_models(list(spools))
+        loaded = {}
+        with transaction.atomic(), connection.constraint_checks_disabled():
+            indexed = {Issue, Comment} & set(models)
+            with (search_index_suspended(connection) if indexed
+                  else nullcontext()):
+                for model in models:
+                    loader = ModelLoader(model, ignorenonexistent)
+                    loaded[model._meta.label] = loader.load(
+                        spools[model], batch_size)
+            connection.check_constraints(
+                table_names=[model._meta.db_table for model in models])
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                with connection.cursor() as cursor:
+                    cursor.execute(sql)
+            # the model signals maintaining them were bypassed
+            if {Project, Issue, Comment} & set(models):
+                rebuild_counters(Project.objects.values_list("id", flat=True))
+    finally:
+        for spool in spools.values():
+            spool.close()
+    for alias in (settings.MEMBERSHIP_CACHE_ALIAS,
+                  settings.PROJECT_DETAIL_CACHE_ALIAS,
+                  settings.TOKEN_STATE_CACHE_ALIAS):
+        caches[alias].clear()
+    return loaded
@@ -0,0 +1,269 @@
+"""
+Per-request instrumentation: SQL queries, database time, serialization
+time and permission checks time.
+
+`instrumentation_middleware` opens the metrics of each request. A query
+wrapper installed on every database connection counts the queries and
+their time, and `InstrumentedViewMixin` names the endpoint after the view
+and its action and times the permission checks. Serialization is timed
+where the views build their representations (`ValuesListMixin`,
+`ConditionalGetMixin`, the async views); rendering is left to the total.
+The metrics live in a context variable, so that the queries that async
+views run in worker threads are counted too.
+
+Each response gets a `Server-Timing` header, and the metrics are
+aggregated per endpoint in the process (`get_request_stats`). Requests
+running more queries than the budget declared for their endpoint in the
+`QUERY_BUDGETS` setting are logged. Tests and benchmarks read the metrics
+of single requests with `capture_request_metrics`.
+
+Serialization time includes the queries run while serializing: a
+serializer causing N+1 queries shows both a high query count and a high
+serialization time.
+"""
+import logging
+from asyncio import iscoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_metrics", default=None)
+# list collecting the metrics of the finished requests, see
+# `capture_request_metrics`
+_captured = ContextVar("captured_request_metrics", default=None)
+
+_stats = {}
+_stats_lock = Lock()
+
+
+class RequestMetrics:
+    """
+    Metrics of one request, in milliseconds.
+    """
+
+    def __init__(self):
+        self.endpoint = None
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+        self.permissions_ms = 0.0
+        self.duration_ms = 0.0
+
+
+def get_current_metrics():
+    """
+    Returns the metrics of the current request, or None outside requests.
+    """
+    return _current.get()
+
+
+def set_endpoint(name):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.endpoint = name
+
+
+@contextmanager
+def timed(field):
+    """
+    Adds the time spent in the block to a field of the current metrics.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        setattr(metrics, field,
+                getattr(metrics, field) + (perf_counter() - start) * 1000)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper counting the queries of the current request
+    and their time.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_ms += (perf_counter() - start) * 1000
+
+
+def install_query_recorder(connection):
+    """
+    Installs `record_query` on a database connection, once.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def get_query_budget(endpoint):
+    return getattr(settings, "QUERY_BUDGETS", {}).get(endpoint)
+
+
+def get_server_timing(metrics):
+    """
+    Returns the value of the `Server-Timing` header of the metrics.
+    """
+    return (
+        f'db;dur={metrics.db_ms:.2f};desc="{metrics.queries} queries", '
+        f"serialize;dur={metrics.serialize_ms:.2f}, "
+        f"permissions;dur={metrics.permissions_ms:.2f}, "
+        f"total;dur={metrics.duration_ms:.2f}"
+    )
+
+
+def record_request(metrics):
+    """
+    Adds the metrics of a finished request to the stats of its endpoint,
+    and logs it when it went over its query budget.
+    """
+    budget = get_query_budget(metrics.endpoint)
+    over_budget = budget is not None and metrics.queries > budget
+    if over_budget:
+        logger.warning(
+            "%s ran %d SQL queries, over its budget of %d",
+            metrics.endpoint, metrics.queries, budget)
+    with _stats_lock:
+        stats = _stats.setdefault(metrics.endpoint, {
+            "requests": 0, "queries": 0, "queries_max": 0, "db_ms": 0.0,
+            "serialize_ms": 0.0, "permissions_ms": 0.0, "duration_ms": 0.0,
+            "duration_ms_max": 0.0, "over_budget": 0,
+        })
+        stats["requests"] += 1
+        stats["queries"] += metrics.queries
+        stats["queries_max"] = max(stats["queries_max"], metrics.queries)
+        stats["db_ms"] += metrics.db_ms
+        stats["serialize_ms"] += metrics.serialize_ms
+        stats["permissions_ms"] += metrics.permissions_ms
+        stats["duration_ms"] += metrics.duration_ms
+        stats["duration_ms_max"] = max(
+            stats["duration_ms_max"], metrics.duration_ms)
+        stats["over_budget"] += over_budget
+
+
+def get_request_stats():
+    """
+    Returns, for each endpoint, the number of requests, the mean and
+    maximal number of queries, the mean database, serialization,
+    permissions and total times, the maximal total time, the query budget
+    and the number of requests over it.
+    """
+    with _stats_lock:
+        stats = {endpoint: dict(values) for endpoint, values in _stats.items()}
+    return {
+        endpoint: {
+            "requests": values["requests"],
+            "queries_mean": round(values["queries"] / values["requests"], 2),
+            "queries_max": values["queries_max"],
+            "query_budget": get_query_budget(endpoint),
+            "over_budget": values["over_budget"],
+            "db_ms_mean": round(values["db_ms"] / values["requests"], 3),
+            "serialize_ms_mean": round(
+                values["serialize_ms"] / values["requests"], 3),
+            "permissions_ms_mean": round(
+                values["permissions_ms"] / values["requests"], 3),
+            "duration_ms_mean": round(
+                values["duration_ms"] / values["requests"], 3),
+            "duration_ms_max": round(values["duration_ms_max"], 3),
+        }
+        for endpoint, values in sorted(stats.items())
+    }
+
+
+def reset_request_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def start_request():
+    """
+    Opens the metrics of a request. Returns them with the token restoring
+    the previous context.
+    """
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics), perf_counter()
+
+
+def finish_request(request, response, metrics, token, start):
+    """
+    Closes the metrics of a request, records them and adds the
+    `Server-Timing` header to the response.
+    """
+    _current.reset(token)
+    metrics.duration_ms = (perf_counter() - start) * 1000
+    if metrics.endpoint is None:
+        match = request.resolver_match
+        metrics.endpoint = match.view_name if match else "unresolved"
+    record_request(metrics)
+    captured = _captured.get()
+    if captured is not None:
+        captured.append(metrics)
+    if getattr(settings, "SERVER_TIMING", True):
+        response["Server-Timing"] = get_server_timing(metrics)
+    return response
+
+
+@contextmanager
+def capture_request_metrics():
+    """
+    Collects in the returned list the metrics of the requests finished
+    within the block, for tests and benchmarks.
+    """
+    captured = []
+    token = _captured.set(captured)
+    try:
+        yield captured
+    finally:
+        _captured.reset(token)
+
+
+@sync_and_async_middleware
+def instrumentation_middleware(get_response):
+    """
+    Measures every request, under WSGI and ASGI.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            metrics, token, start = start_request()
+            response = await get_response(request)
+            return finish_request(request, response, metrics, token, start)
+    else:
+        def middleware(request):
+            metrics, token, start = start_request()
+            response = get_response(request)
+            return finish_request(request, response, metrics, token, start)
+    return middleware
+
+
+class InstrumentedViewMixin:
+    """
+    Names the metrics of the request after the view and its action, and
+    times the permission checks.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        set_endpoint(
+            f"{type(self).__name__}."
+            f"{getattr(self, 'action', None) or request.method.lower()}")
+        super().initial(request, *args, **kwargs)
+
+    def check_permissions(self, request):
+        with timed("permissions_ms"):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with timed("permissions_ms"):
+            super().check_object_permissions(request, obj)
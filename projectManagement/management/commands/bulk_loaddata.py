@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+from django.db import DatabaseError
+
+from projectManagement.fixtures import FixtureError, load_fixture
+
+
+class Command(BaseCommand):
+    """
+    Loads a large JSON fixture (as written by dumpdata) with a streaming
+    parser and batched inserts, in one transaction. Faster than loaddata
+    and with a bounded memory use, but the model signals are not sent.
+    """
+
+    help = ("Loads a JSON fixture (.json or .json.gz) with batched inserts, "
+            "in foreign key dependency order.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("fixture")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "-e", "--exclude", action="append", default=[],
+            help="An app_label or app_label.ModelName to exclude (use "
+                 "multiple --exclude to exclude multiple apps/models).")
+        parser.add_argument(
+            "-i", "--ignorenonexistent", action="store_true",
+            help="Ignores the fields of the fixture that are not in the "
+                 "models.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            loaded = load_fixture(
+                options["fixture"],
+                batch_size=options["batch_size"],
+                exclude=options["exclude"],
+                ignorenonexistent=options["ignorenonexistent"],
+            )
+        except OSError as exc:
+            raise CommandError(f"Cannot read the fixture: {exc}")
+        except (FixtureError, DeserializationError, DatabaseError) as exc:
+            raise CommandError(
+                f"Problem installing fixture {options['fixture']}: {exc}")
+        if options["verbosity"] >= 2:
+            for label, count in loaded.items():
+                self.stdout.write(f"  {label}: {count}")
+        if options["verbosity"] >= 1:
+            self.stdout.write(self.style.SUCCESS(
+                f"Installed {sum(loaded.values())} object(s) from 1 "
+                f"fixture(s) in {time.perf_counter() - start:.2f} s."))
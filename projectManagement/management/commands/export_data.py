@@ -0,0 +1,81 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from projectManagement.data_export import (
+    EXPORT_MODELS, FORMATS, ExportError, export_data
+)
+
+
+class Command(BaseCommand):
+    """
+    Exports the users, projects, contributors, issues and comments to one
+    file per model, reading them with server-side cursors and exporting
+    the models in parallel. See `projectManagement.data_export`.
+    """
+
+    help = ("Exports users, projects, contributors, issues and comments as "
+            "gzip-compressed NDJSON or Parquet files, for backups or "
+            "analytics.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument("--format", choices=FORMATS, default="ndjson")
+        parser.add_argument(
+            "--model", choices=list(EXPORT_MODELS), nargs="+", default=None,
+            help="Models to export (all of them by default).")
+        parser.add_argument(
+            "--since", default=None,
+            help="Only exports the rows changed since this ISO 8601 date, "
+                 "and the deletions (the 'until' date of the manifest of "
+                 "the previous export).")
+        parser.add_argument(
+            "--analytics", action="store_true",
+            help="Leaves out the users who do not share their data, and "
+                 "credentials and contact details.")
+        parser.add_argument(
+            "--workers", type=int, default=min(len(EXPORT_MODELS),
+                                                os.cpu_count() or 1),
+            help="Number of models exported in parallel.")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        since = options["since"]
+        if since is not None:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError(
+                    f"Invalid date {options['since']!r}: an ISO 8601 date "
+                    f"is expected.")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        start = time.perf_counter()
+        try:
+            manifest = export_data(
+                options["directory"],
+                names=options["model"],
+                fmt=options["format"],
+                since=since,
+                analytics=options["analytics"],
+                workers=options["workers"],
+                chunk_size=options["chunk_size"],
+            )
+        except (ExportError, OSError) as exc:
+            raise CommandError(str(exc))
+        if options["verbosity"] >= 2:
+            for name, exported in manifest["files"].items():
+                self.stdout.write(
+                    f"  {exported['file']}: {exported['rows']} rows")
+        if options["verbosity"] >= 1:
+            rows = sum(
+                exported["rows"] for exported in manifest["files"].values())
+            self.stdout.write(self.style.SUCCESS(
+                f"Exported {rows} rows to {options['directory']} in "
+                f"{time.perf_counter() - start:.2f} s (until "
+                f"{manifest['until']})."))
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from projectManagement.changes import prune_changes
+
+
+class Command(BaseCommand):
+    """
+    Deletes the old entries of the change log read by the delta sync feed.
+    Clients holding a token older than the remaining entries get a 410 and
+    must download their projects again. The newest entry is always kept.
+    """
+
+    help = "Deletes the entries of the change log older than --days days."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30)
+
+    def handle(self, *args, **options):
+        limit = timezone.now() - timedelta(days=options["days"])
+        deleted = prune_changes(limit)
+        self.stdout.write(self.style.SUCCESS(
+            f"{deleted} change log entries deleted."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from projectManagement.counters import rebuild_counters
+from projectManagement.models import Project
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the denormalized issue and comment counters of the projects
+    and issues, when they drifted from the rows (fixtures, bulk writes
+    made outside the API, raw SQL).
+    """
+
+    help = ("Recomputes the issue and comment counters of all projects, or "
+            "of the projects given with --project.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, nargs="+", default=None)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        project_ids = options["project"]
+        if project_ids is None:
+            project_ids = Project.objects.values_list("id", flat=True)
+        rebuilt = rebuild_counters(project_ids, options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Counters of {rebuilt} projects rebuilt."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from projectManagement.search import (
+    create_search_index, is_search_index_supported, rebuild_search_index
+)
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the full-text search index of issues and comments, for
+    instance after writing to the tables with the triggers of the index
+    dropped.
+    """
+
+    help = "Rebuilds the full-text search index of issues and comments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if not is_search_index_supported(connection):
+            raise CommandError(
+                "The search index requires an SQLite database.")
+        if not create_search_index(connection):
+            rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from authenticated.models import User
+from projectManagement.seeding import seed_data
+
+
+class Command(BaseCommand):
+    """
+    Fills the database with a synthetic dataset for load tests: users,
+    projects, contributors, issues and comments, skewed towards a few
+    projects and issues, inserted in bulk.
+    """
+
+    help = ("Seeds the database with synthetic users, projects, "
+            "contributors, issues and comments.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--projects", type=int, default=50)
+        parser.add_argument("--contributors-per-project", type=int,
+                            default=10)
+        parser.add_argument("--issues", type=int, default=5000)
+        parser.add_argument("--comments", type=int, default=20000)
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Seed of the generator: the same seed "
+                                 "gives the same dataset.")
+        parser.add_argument("--password", default=None,
+                            help="Password of the users (no usable "
+                                 "password by default).")
+        parser.add_argument("--prefix", default="user",
+                            help="Prefix of the usernames and project "
+                                 "titles, to seed the database again.")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1:
+            raise CommandError("At least one user is required.")
+        prefix = options["prefix"]
+        if User.objects.filter(username=f"{prefix}0").exists():
+            raise CommandError(
+                f"Users named {prefix}<n> already exist: seed an empty "
+                f"database or use another --prefix.")
+        created = seed_data(
+            users=options["users"],
+            projects=options["projects"],
+            contributors_per_project=options["contributors_per_project"],
+            issues=options["issues"],
+            comments=options["comments"],
+            batch_size=options["batch_size"],
+            seed_value=options["seed"],
+            password=options["password"],
+            prefix=prefix,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded " + ", ".join(
+                f"{count} {model}" for model, count in created.items())
+            + "."))
@@ -0,0 +1,240 @@
+from contextvars import ContextVar
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from authenticated.models import User
+from projectManagement.detail_cache import invalidate_project_detail
+from projectManagement.models import Change, Contributor, Project
+
+CACHE_KEY = "membership:{user_id}"
+
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+_stats_lock = Lock()
+
+# set while `remove_contributors` deletes a batch: the receivers of the
+# contributor deletions leave their work to it, done once for the batch
+_removing_contributors = ContextVar("removing_contributors", default=False)
+
+
+def _count(name, value=1):
+    with _stats_lock:
+        _stats[name] += value
+
+
+def get_membership_cache():
+    """
+    Returns the cache holding the project ids of each user, configured by
+    the `MEMBERSHIP_CACHE_ALIAS` setting.
+    """
+    return caches[settings.MEMBERSHIP_CACHE_ALIAS]
+
+
+def get_user_project_ids(user_id):
+    """
+    Returns the set of ids of the projects the user contributes to, from the
+    membership cache or from the database on a cache miss.
+    """
+    cache = get_membership_cache()
+    key = CACHE_KEY.format(user_id=user_id)
+    project_ids = cache.get(key)
+    if project_ids is not None:
+        _count("hits")
+        return project_ids
+
+    _count("misses")
+    project_ids = set(
+        Contributor.objects.filter(user_id=user_id).values_list(
+            "project_id", flat=True)
+    )
+    cache.set(key, project_ids, settings.MEMBERSHIP_CACHE_TIMEOUT)
+    return project_ids
+
+
+async def aget_user_project_ids(user_id):
+    """
+    Async version of `get_user_project_ids`.
+    """
+    cache = get_membership_cache()
+    key = CACHE_KEY.format(user_id=user_id)
+    project_ids = await cache.aget(key)
+    if project_ids is not None:
+        _count("hits")
+        return project_ids
+
+    _count("misses")
+    project_ids = {
+        project_id async for project_id in Contributor.objects.filter(
+            user_id=user_id).values_list("project_id", flat=True)
+    }
+    await cache.aset(key, project_ids, settings.MEMBERSHIP_CACHE_TIMEOUT)
+    return project_ids
+
+
+def invalidate_user_project_ids(*user_ids):
+    """
+    Removes the cached project ids of the given users.
+    """
+    get_membership_cache().delete_many(
+        [CACHE_KEY.format(user_id=user_id) for user_id in user_ids]
+    )
+    _count("invalidations", len(user_ids))
+
+
+def get_membership_cache_stats():
+    """
+    Returns the hit, miss and invalidation counters of the membership cache
+    for this process, with the resulting hit ratio.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else None
+    return stats
+
+
+def reset_membership_cache_stats():
+    """
+    Resets the counters of the membership cache.
+    """
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def get_member_project_ids(request):
+    """
+    Returns the set of ids of the projects the requesting user contributes
+    to. The set is resolved once and kept on the request, so that every
+    permission check and queryset of the same request is answered in memory.
+    """
+    project_ids = getattr(request, "_member_project_ids", None)
+    if project_ids is None:
+        project_ids = get_user_project_ids(request.user.id)
+        request._member_project_ids = project_ids
+    return project_ids
+
+
+async def aget_member_project_ids(request):
+    """
+    Async version of `get_member_project_ids`. Once resolved, the set is
+    also available to the sync function for the rest of the request.
+    """
+    project_ids = getattr(request, "_member_project_ids", None)
+    if project_ids is None:
+        project_ids = await aget_user_project_ids(request.user.id)
+        request._member_project_ids = project_ids
+    return project_ids
+
+
+def is_member(request, project_id):
+    """
+    Returns True if the requesting user contributes to the given project.
+    """
+    return project_id is not None and project_id in get_member_project_ids(
+        request)
+
+
+async def ais_member(request, project_id):
+    """
+    Async version of `is_member`.
+    """
+    return project_id is not None and project_id in (
+        await aget_member_project_ids(request))
+
+
+def add_contributors(project, user_ids):
+    """
+    Adds the given users as contributors of the project, resolving all the
+    users in one query and inserting all the rows with a single INSERT.
+    Returns the ids of the users added, skipped because they already
+    contribute, and not found.
+    """
+    # changes imports the serializers, which import this module
+    from projectManagement.changes import record_changes
+
+    user_ids = set(user_ids)
+    found = set(
+        User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+    existing = set(
+        project.contributors.filter(user_id__in=found).values_list(
+            "user_id", flat=True)
+    )
+    added = found - existing
+    if added:
+        with transaction.atomic():
+            Contributor.objects.bulk_create(
+                [Contributor(project=project, user_id=user_id)
+                 for user_id in added],
+                ignore_conflicts=True,
+            )
+            # bulk_create does not send post_save: the ids of the new rows
+            # are read back for the change log
+            record_changes([
+                Change(type="contributor", object_id=str(contributor_id),
+                       project_id=project.pk, user_id=user_id)
+                for contributor_id, user_id in project.contributors.filter(
+                    user_id__in=added).values_list("id", "user_id")
+            ])
+            Project.objects.filter(pk=project.pk).update(
+                date_updated=timezone.now())
+        invalidate_user_project_ids(*added)
+        invalidate_project_detail(project.pk)
+    return {
+        "added": sorted(added),
+        "skipped": sorted(existing),
+        "not_found": sorted(user_ids - found),
+    }
+
+
+def is_removing_contributors():
+    """
+    Returns True while `remove_contributors` deletes a batch of
+    contributors.
+    """
+    return _removing_contributors.get()
+
+
+def remove_contributors(project, user_ids):
+    """
+    Removes the given users from the contributors of the project, except
+    its author. The change log entries, the modification date of the
+    project and the caches are updated once for the batch, not by the
+    receivers of every deleted row. Returns the ids of the users removed,
+    skipped because they do not contribute or are the author, and not
+    found.
+    """
+    from projectManagement.changes import record_changes
+
+    user_ids = set(user_ids)
+    found = set(
+        User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+    rows = list(project.contributors.filter(user_id__in=found).exclude(
+        user_id=project.author_id).values_list("id", "user_id"))
+    removed = {user_id for _, user_id in rows}
+    if rows:
+        with transaction.atomic():
+            token = _removing_contributors.set(True)
+            try:
+                Contributor.objects.filter(
+                    pk__in=[contributor_id for contributor_id, _ in rows]
+                ).delete()
+            finally:
+                _removing_contributors.reset(token)
+            record_changes([
+                Change(type="contributor", object_id=str(contributor_id),
+                       project_id=project.pk, user_id=user_id, deleted=True)
+                for contributor_id, user_id in rows
+            ])
+            Project.objects.filter(pk=project.pk).update(
+                date_updated=timezone.now())
+        invalidate_user_project_ids(*removed)
+        invalidate_project_detail(project.pk)
+    return {
+        "removed": sorted(removed),
+        "skipped": sorted(found - removed),
+        "not_found": sorted(user_ids - found),
+    }
@@ -1,11 +1,28 @@
 import uuid
 
-from django.db import models
+from django.db import models, router, transaction
 
 from authenticated.models import User
 
 
-class Contributor(models.Model):
+class AtomicSaveModel(models.Model):
+    """
+    Model saved in a transaction with the writes of its post_save receivers
+    (counters, change log): they are committed with the row or not at all.
+    Deletions already send post_delete within their transaction.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(
+            type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class Contributor(AtomicSaveModel):
     """
     Template representing a link between a user and a project as a contributor.
     A user can only be a contributor once per project.
@@ -26,13 +43,22 @@ class Contributor(models.Model):
 
     class Meta:
         unique_together = ("project", "user")
+        indexes = [
+            # projects of a user (membership lookups)
+            models.Index(fields=["user", "project"],
+                         name="contributor_user_project_idx"),
+        ]
 
 
-class Project(models.Model):
+class Project(AtomicSaveModel):
     """
     Model representing a software project.
     A project has an author, type (backend, frontend, etc.), unique title and
     description.
+    `date_updated` also moves when its contributors change or when one of
+    its issues or comments is deleted.
+    The issue and comment counters are denormalized, see
+    `projectManagement.counters`.
     """
 
     TYPE_CHOICES = [
@@ -42,6 +68,7 @@ class Project(models.Model):
         ("Android", "Android"),
     ]
     date_created = models.DateTimeField(auto_now_add=True)
+    date_updated = models.DateTimeField(auto_now=True)
     title = models.CharField(max_length=255,
                              unique=True,
                              blank=False,
@@ -53,12 +80,16 @@ class Project(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="authored_projects"
     )
+    issues_todo_count = models.PositiveIntegerField(default=0)
+    issues_in_progress_count = models.PositiveIntegerField(default=0)
+    issues_finished_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.title
 
 
-class Issue(models.Model):
+class Issue(AtomicSaveModel):
     """
     Template representing an issue (bug, task or feature) associated with a
     project.
@@ -71,7 +102,9 @@ class Issue(models.Model):
     - a nature (Bug, Feature, Task),
     - an author (creator of the issue),
     - an assigned user (optional),
-    - a creation date.
+    - a creation date,
+    - a modification date, which also moves when one of its comments is
+      deleted.
 
     Constraint of uniqueness:
     - Issue title must be unique **within the same project**.
@@ -87,6 +120,7 @@ class Issue(models.Model):
 
     title = models.CharField(max_length=255, blank=False, null=False)
     date_created = models.DateTimeField(auto_now_add=True)
+    date_updated = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="issues_created"
     )
@@ -114,6 +148,8 @@ class Issue(models.Model):
         blank=False, null=False
     )
     nature = models.CharField(max_length=20, choices=NATURE_CHOICES)
+    # denormalized, see projectManagement.counters
+    comments_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         constraints = [
@@ -121,9 +157,36 @@ class Issue(models.Model):
                 fields=["title", "project"], name="unique_issue_title_per_project"
             )
         ]
+        indexes = [
+            # issues of a project ordered by date (cursor pagination)
+            models.Index(fields=["project", "date_created", "id"],
+                         name="issue_project_date_idx"),
+            # issues of a project filtered by status, priority, assignee
+            # or nature
+            models.Index(fields=["project", "status", "date_created"],
+                         name="issue_project_status_idx"),
+            models.Index(fields=["project", "priority", "date_created"],
+                         name="issue_project_priority_idx"),
+            models.Index(fields=["project", "assigned", "date_created"],
+                         name="issue_project_assigned_idx"),
+            models.Index(fields=["project", "nature", "date_created"],
+                         name="issue_project_nature_idx"),
+        ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the project and the status the issue was loaded with, so
+        that moving it to another project can also invalidate what is
+        cached for the previous one, and the counters can be moved.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_project_id = instance.__dict__.get("project_id")
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
 
-class Comment(models.Model):
+
+class Comment(AtomicSaveModel):
     """
     Template representing comment made on issue.
     Each comment is linked to a specific author and issue.
@@ -131,6 +194,7 @@ class Comment(models.Model):
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     date_created = models.DateTimeField(auto_now_add=True)
+    date_updated = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="authored_comments"
     )
@@ -141,3 +205,56 @@ class Comment(models.Model):
         related_name="issue_comments",
         blank=False, null=False
     )
+
+    class Meta:
+        indexes = [
+            # comments of an issue ordered by date (cursor pagination)
+            models.Index(fields=["issue", "date_created", "id"],
+                         name="comment_issue_date_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the issue the comment was loaded with, so that moving it
+        to another issue can move the comment counters.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_issue_id = instance.__dict__.get("issue_id")
+        return instance
+
+
+class Change(models.Model):
+    """
+    Entry of the change log read by the delta sync feed: a project, issue,
+    comment or contributor was created or updated, or deleted.
+
+    The project and the user are plain ids, not foreign keys, so that the
+    entries outlive the rows they describe. `user_id` is only set for
+    contributors, so that a user removed from a project still receives the
+    deletion of their contribution.
+    The id of the entry is the sync token.
+    """
+
+    TYPE_CHOICES = [
+        ("project", "project"),
+        ("issue", "issue"),
+        ("comment", "comment"),
+        ("contributor", "contributor"),
+    ]
+
+    type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    object_id = models.CharField(max_length=36)
+    project_id = models.BigIntegerField()
+    user_id = models.BigIntegerField(null=True)
+    deleted = models.BooleanField(default=False)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # changes of the projects of a user after a token
+            models.Index(fields=["project_id", "id"],
+                         name="change_project_idx"),
+            # contributions of a user after a token
+            models.Index(fields=["user_id", "id"], name="change_user_idx"),
+        ]
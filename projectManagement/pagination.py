@@ -0,0 +1,40 @@
+from asgiref.sync import sync_to_async
+from rest_framework import pagination
+from rest_framework.pagination import CursorPagination
+
+
+class AsyncPaginationMixin:
+    """
+    Lets a DRF pagination paginate from async views with
+    `apaginate_queryset`.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async version of `paginate_queryset`: DRF's pagination runs in a
+        worker thread, and returns the rows of the page already read.
+        """
+        return await sync_to_async(self.paginate_queryset)(
+            queryset, request, view)
+
+
+class PageNumberPagination(AsyncPaginationMixin,
+                           pagination.PageNumberPagination):
+    """
+    DRF's page number pagination, which can also paginate from async views.
+    """
+
+
+class DateCreatedCursorPagination(AsyncPaginationMixin, CursorPagination):
+    """
+    Keyset pagination ordered by creation date.
+    The primary key is used as a tie-breaker so that the ordering is total,
+    even for comments whose UUID primary key is not sequential.
+    Pages are located from the cursor position, so no COUNT query or OFFSET
+    scan is needed. The client can choose the page size with `page_size`,
+    up to `max_page_size`.
+    """
+
+    ordering = ("date_created", "id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
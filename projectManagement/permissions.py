@@ -1,5 +1,6 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from projectManagement.membership import ais_member, is_member
 from projectManagement.models import Issue, Project, Comment
 
 
@@ -15,32 +16,37 @@ class IsAuthor(BasePermission):
         """
         if request.method in SAFE_METHODS:
             return True
-        return obj.author == request.user
+        return obj.author_id == request.user.id
 
 
 class IsContributor(BasePermission):
     """
     Grants access to project contributors for reading and creating content.
+    Membership is resolved from the set of project ids loaded once per
+    request (see `projectManagement.membership`).
     """
 
     @staticmethod
-    def get_project_from_request(request, basename):
+    def get_project_id_from_request(request, basename):
         if basename == "comment":
-            issue_id = request.data.get("issue")
-            return Issue.objects.get(id=issue_id).project
+            issue_id = str(request.data.get("issue", ""))
+            if not issue_id.isdigit():
+                return None
+            return Issue.objects.filter(id=issue_id).values_list(
+                "project_id", flat=True).first()
         if basename == "issue":
-            project_id = request.data.get("project")
-            return Project.objects.get(id=project_id)
+            project_id = str(request.data.get("project", ""))
+            return int(project_id) if project_id.isdigit() else None
         return None  # for other cases like project itself
 
     @staticmethod
-    def get_project_from_object(obj):
+    def get_project_id_from_object(obj):
         if isinstance(obj, Project):
-            return obj
+            return obj.id
         if isinstance(obj, Issue):
-            return obj.project
+            return obj.project_id
         if isinstance(obj, Comment):
-            return obj.issue.project
+            return obj.issue.project_id
         return None
 
     def has_permission(self, request, view):
@@ -51,13 +57,22 @@ class IsContributor(BasePermission):
         if view.action == "list":
             return True
         if view.action == "create" and view.basename != "project":
-            project = self.get_project_from_request(request, view.basename)
-            return project and project.contributors.filter(user=request.user).exists()
+            project_id = self.get_project_id_from_request(
+                request, view.basename)
+            return is_member(request, project_id)
         return True
 
     def has_object_permission(self, request, view, obj):
         """
         - Read access allowed to contributors.
         """
-        project = self.get_project_from_object(obj)
-        return project and project.contributors.filter(user=request.user).exists()
+        project_id = self.get_project_id_from_object(obj)
+        return is_member(request, project_id)
+
+    async def ahas_object_permission(self, request, view, obj):
+        """
+        Async version of `has_object_permission`, for the async read views.
+        A comment must be loaded with its issue.
+        """
+        project_id = self.get_project_id_from_object(obj)
+        return await ais_member(request, project_id)
@@ -0,0 +1,84 @@
+"""
+JSON renderer backed by orjson, when it is installed.
+
+`FastJSONRenderer` produces the same bytes as DRF's `JSONRenderer`: the
+types orjson does not handle the same way (datetimes, dates, times,
+Decimals, lazy strings...) are passed to DRF's own JSON encoder. Without
+orjson, or for indented output, it is DRF's `JSONRenderer`.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Compact JSON renderer using orjson, falling back to DRF's
+    `JSONRenderer`.
+
+    Unlike the strict DRF renderer, NaN and infinite floats are rendered as
+    null instead of raising an error.
+    """
+
+    if orjson is not None:
+        options = (
+            orjson.OPT_NON_STR_KEYS
+            # DRF truncates datetimes to milliseconds and writes UTC as Z
+            | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+
+    def __init__(self):
+        self.default = self.encoder_class().default
+
+    def is_supported(self, accepted_media_type, renderer_context):
+        """
+        Returns True if orjson can render the response: it only writes
+        compact UTF-8 JSON.
+        """
+        return (
+            orjson is not None
+            and self.compact
+            and not self.ensure_ascii
+            and self.encoder_class is encoders.JSONEncoder
+            and self.get_indent(
+                accepted_media_type, renderer_context or {}) is None
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Renders `data` into JSON with orjson, or with DRF's renderer when
+        orjson is not installed or cannot render it (indented output, an
+        integer larger than 64 bits...).
+        """
+        if data is None:
+            return b""
+        if not self.is_supported(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # same escaping as DRF, so that the output is valid javascript
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029")
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders newline-delimited JSON. Streamed exports write their lines
+    themselves: this renderer lets clients ask for the format and renders
+    error responses as a single line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return FastJSONRenderer().render(data) + b"\n"
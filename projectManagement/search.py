@@ -0,0 +1,351 @@
+"""
+Full-text search over issues and comments.
+
+On SQLite, issues and comments are indexed in FTS5 virtual tables, kept in
+sync by triggers on every INSERT, UPDATE and DELETE, including bulk writes
+that bypass model signals. The tables are created after `migrate`.
+
+SQLite alters a table by copying it into a new table renamed afterwards,
+which the triggers referencing the issue and comment tables would prevent:
+they are dropped before `migrate` applies migrations and recreated after
+it, with the index rebuilt to catch up with the writes made meanwhile.
+
+Each indexed row also holds a token of its project (``p<id>``), so that a
+search only matches the rows of the projects of the user. Matches are
+ranked with BM25, except for very common words (see `run_search`).
+
+The primary key of comments is a UUID, while FTS5 rows are keyed on an
+integer: comments are indexed under the integer key of their UUID in the
+`COMMENT_KEYS` table, numbered in the order of creation. The implicit
+rowid of the comment table is not used, since a VACUUM or the copy of the
+table by a migration renumbers it.
+"""
+import re
+import uuid
+from contextlib import contextmanager
+
+from django.db import connection
+
+ISSUE_TABLE = "projectManagement_issue"
+COMMENT_TABLE = "projectManagement_comment"
+ISSUE_INDEX = "projectManagement_issue_fts"
+COMMENT_INDEX = "projectManagement_comment_fts"
+COMMENT_KEYS = "projectManagement_comment_fts_keys"
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+SNIPPET_TOKENS = 12
+
+MAX_RANKED_MATCHES = 500
+
+PROJECT_TOKEN = "'p' || {}"
+COMMENT_PROJECT_TOKEN = (
+    f"(SELECT {PROJECT_TOKEN.format('project_id')} FROM {ISSUE_TABLE} "
+    f"WHERE id = {{}}.issue_id)"
+)
+COMMENT_KEY = f"(SELECT id FROM {COMMENT_KEYS} WHERE comment_id = {{}}.id)"
+
+TABLE_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {ISSUE_INDEX} USING fts5(
+        title, description, project,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # the title weighs more than the description, the project not at all
+    f"""
+    INSERT INTO {ISSUE_INDEX}({ISSUE_INDEX}, rank)
+    VALUES ('rank', 'bm25(10.0, 1.0, 0.0)')
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {COMMENT_KEYS} (
+        id INTEGER PRIMARY KEY,
+        comment_id TEXT NOT NULL UNIQUE
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {COMMENT_INDEX} USING fts5(
+        description, project,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    INSERT INTO {COMMENT_INDEX}({COMMENT_INDEX}, rank)
+    VALUES ('rank', 'bm25(1.0, 0.0)')
+    """,
+]
+
+TRIGGERS = {
+    f"{ISSUE_INDEX}_insert": f"""
+    AFTER INSERT ON {ISSUE_TABLE} BEGIN
+        INSERT INTO {ISSUE_INDEX}(rowid, title, description, project)
+        VALUES (new.id, new.title, new.description,
+                {PROJECT_TOKEN.format("new.project_id")});
+    END
+    """,
+    f"{ISSUE_INDEX}_delete": f"""
+    AFTER DELETE ON {ISSUE_TABLE} BEGIN
+        DELETE FROM {ISSUE_INDEX} WHERE rowid = old.id;
+    END
+    """,
+    f"{ISSUE_INDEX}_update": f"""
+    AFTER UPDATE OF title, description, project_id ON {ISSUE_TABLE} BEGIN
+        UPDATE {ISSUE_INDEX}
+        SET title = new.title, description = new.description,
+            project = {PROJECT_TOKEN.format("new.project_id")}
+        WHERE rowid = new.id;
+    END
+    """,
+    f"{ISSUE_INDEX}_move": f"""
+    AFTER UPDATE OF project_id ON {ISSUE_TABLE}
+    WHEN old.project_id <> new.project_id BEGIN
+        UPDATE {COMMENT_INDEX}
+        SET project = {PROJECT_TOKEN.format("new.project_id")}
+        WHERE rowid IN (
+            SELECT keys.id FROM {COMMENT_KEYS} AS keys
+            JOIN {COMMENT_TABLE} AS comment ON comment.id = keys.comment_id
+            WHERE comment.issue_id = new.id
+        );
+    END
+    """,
+    f"{COMMENT_INDEX}_insert": f"""
+    AFTER INSERT ON {COMMENT_TABLE} BEGIN
+        INSERT INTO {COMMENT_KEYS}(comment_id) VALUES (new.id);
+        INSERT INTO {COMMENT_INDEX}(rowid, description, project)
+        VALUES ({COMMENT_KEY.format("new")}, new.description,
+                {COMMENT_PROJECT_TOKEN.format("new")});
+    END
+    """,
+    f"{COMMENT_INDEX}_delete": f"""
+    AFTER DELETE ON {COMMENT_TABLE} BEGIN
+        DELETE FROM {COMMENT_INDEX} WHERE rowid = {COMMENT_KEY.format("old")};
+        DELETE FROM {COMMENT_KEYS} WHERE comment_id = old.id;
+    END
+    """,
+    f"{COMMENT_INDEX}_update": f"""
+    AFTER UPDATE OF description, issue_id ON {COMMENT_TABLE} BEGIN
+        UPDATE {COMMENT_INDEX}
+        SET description = new.description,
+            project = {COMMENT_PROJECT_TOKEN.format("new")}
+        WHERE rowid = {COMMENT_KEY.format("new")};
+    END
+    """,
+}
+
+REBUILD_STATEMENTS = [
+    f"DELETE FROM {ISSUE_INDEX}",
+    f"""
+    INSERT INTO {ISSUE_INDEX}(rowid, title, description, project)
+    SELECT id, title, description, {PROJECT_TOKEN.format("project_id")}
+    FROM {ISSUE_TABLE}
+    """,
+    f"DELETE FROM {COMMENT_INDEX}",
+    f"DELETE FROM {COMMENT_KEYS}",
+    # keys in the order of creation, for the most recent matches first
+    f"""
+    INSERT INTO {COMMENT_KEYS}(comment_id)
+    SELECT id FROM {COMMENT_TABLE} ORDER BY date_created, id
+    """,
+    f"""
+    INSERT INTO {COMMENT_INDEX}(rowid, description, project)
+    SELECT keys.id, comment.description,
+           {PROJECT_TOKEN.format("issue.project_id")}
+    FROM {COMMENT_KEYS} AS keys
+    JOIN {COMMENT_TABLE} AS comment ON comment.id = keys.comment_id
+    JOIN {ISSUE_TABLE} AS issue ON issue.id = comment.issue_id
+    """,
+]
+
+
+def is_search_index_supported(using=connection):
+    """
+    Returns True if the database supports the FTS5 search index.
+    """
+    return using.vendor == "sqlite"
+
+
+def create_search_index(using=connection):
+    """
+    Creates the FTS5 tables and their triggers that do not exist, and
+    indexes the existing issues and comments if any was missing. Returns
+    True if the index was rebuilt.
+    """
+    if not is_search_index_supported(using):
+        return False
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s)"
+            % ", ".join(["%s"] * (len(TRIGGERS) + 3)),
+            [ISSUE_INDEX, COMMENT_INDEX, COMMENT_KEYS, *TRIGGERS],
+        )
+        existing = {name for name, in cursor.fetchall()}
+        if existing == {ISSUE_INDEX, COMMENT_INDEX, COMMENT_KEYS, *TRIGGERS}:
+            return False
+        if COMMENT_KEYS not in existing:
+            # comment index of a previous version, keyed on the rowid
+            drop_search_triggers(using)
+            cursor.execute(f"DROP TABLE IF EXISTS {COMMENT_INDEX}")
+        for statement in TABLE_STATEMENTS:
+            cursor.execute(statement)
+    create_search_triggers(using)
+    rebuild_search_index(using)
+    return True
+
+
+def create_search_triggers(using=connection):
+    """
+    Creates the triggers of the FTS5 tables that do not exist.
+    """
+    with using.cursor() as cursor:
+        for name, body in TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS "{name}" {body}')
+
+
+def drop_search_triggers(using=connection):
+    """
+    Drops the triggers of the FTS5 tables, and returns True if any existed.
+    """
+    if not is_search_index_supported(using):
+        return False
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND name IN (%s)" % ", ".join(["%s"] * len(TRIGGERS)),
+            list(TRIGGERS),
+        )
+        names = [name for name, in cursor.fetchall()]
+        for name in names:
+            cursor.execute(f'DROP TRIGGER "{name}"')
+    return bool(names)
+
+
+def rebuild_search_index(using=connection):
+    """
+    Rebuilds the FTS5 tables from the content of the issue and comment
+    tables.
+    """
+    with using.cursor() as cursor:
+        for statement in REBUILD_STATEMENTS:
+            cursor.execute(statement)
+
+
+@contextmanager
+def search_index_suspended(using=connection):
+    """
+    Drops the triggers of the FTS5 tables for the duration of the block,
+    then restores them and rebuilds the index once: faster than indexing
+    row by row for bulk loads. To be used inside a transaction, so that
+    the triggers are restored if the block fails.
+    """
+    suspended = drop_search_triggers(using)
+    yield
+    if suspended:
+        create_search_triggers(using)
+        rebuild_search_index(using)
+
+
+def to_match_expression(query, columns, project_ids):
+    """
+    Turns free text into an FTS5 expression matching every word in the
+    given columns, within the given projects. User input is only used as
+    quoted words, so the FTS5 query syntax is never interpreted from it.
+    """
+    words = re.findall(r"\w+", query)
+    if not words or not project_ids:
+        return None
+    terms = [f'"{word}"' for word in words]
+    projects = " OR ".join(f'"p{project_id}"' for project_id in project_ids)
+    return (f"{{{' '.join(columns)}}} : ({' '.join(terms)}) "
+            f"AND project : ({projects})")
+
+
+def has_many_matches(cursor, index, expression):
+    """
+    Returns True if the expression matches more than `MAX_RANKED_MATCHES`
+    rows. This only walks the rowids of the matches, without ranking them.
+    """
+    cursor.execute(
+        f"""
+        SELECT rowid FROM {index} WHERE {index} MATCH %s
+        LIMIT 1 OFFSET %s
+        """,
+        [expression, MAX_RANKED_MATCHES],
+    )
+    return cursor.fetchone() is not None
+
+
+def run_search(index, columns, joins, expression, project_ids, limit):
+    """
+    Runs a search on one of the FTS5 tables and returns the selected
+    columns followed by the snippet and the rank of each match.
+
+    BM25 ranking needs the frequency of every word in the whole index,
+    which is costly for very common words: when there are more than
+    `MAX_RANKED_MATCHES` matches, the most recent matches are returned
+    instead, with a null rank.
+    """
+    placeholders = ", ".join(["%s"] * len(project_ids))
+    with connection.cursor() as cursor:
+        if has_many_matches(cursor, index, expression):
+            rank, ordering = "NULL", f"{index}.rowid DESC"
+        else:
+            rank, ordering = f"{index}.rank", f"{index}.rank"
+        cursor.execute(
+            f"""
+            SELECT {columns},
+                   snippet({index}, -1, %s, %s, '…', %s), {rank}
+            FROM {index}
+            {joins}
+            WHERE {index} MATCH %s AND issue.project_id IN ({placeholders})
+            ORDER BY {ordering}
+            LIMIT %s
+            """,
+            [SNIPPET_START, SNIPPET_END, SNIPPET_TOKENS, expression,
+             *project_ids, limit],
+        )
+        return cursor.fetchall()
+
+
+def search_issues(query, project_ids, limit):
+    """
+    Returns the issues of the given projects matching the query, best
+    matches first.
+    """
+    expression = to_match_expression(
+        query, ["title", "description"], project_ids)
+    if not expression:
+        return []
+    rows = run_search(
+        ISSUE_INDEX,
+        "issue.id, issue.project_id, issue.title",
+        f"JOIN {ISSUE_TABLE} AS issue ON issue.id = {ISSUE_INDEX}.rowid",
+        expression, project_ids, limit,
+    )
+    return [
+        {"id": issue_id, "project": project_id, "title": title,
+         "snippet": snippet, "rank": rank}
+        for issue_id, project_id, title, snippet, rank in rows
+    ]
+
+
+def search_comments(query, project_ids, limit):
+    """
+    Returns the comments on issues of the given projects matching the
+    query, best matches first.
+    """
+    expression = to_match_expression(query, ["description"], project_ids)
+    if not expression:
+        return []
+    rows = run_search(
+        COMMENT_INDEX,
+        "comment.id, comment.issue_id, issue.project_id",
+        f"JOIN {COMMENT_KEYS} AS keys ON keys.id = {COMMENT_INDEX}.rowid "
+        f"JOIN {COMMENT_TABLE} AS comment ON comment.id = keys.comment_id "
+        f"JOIN {ISSUE_TABLE} AS issue ON issue.id = comment.issue_id",
+        expression, project_ids, limit,
+    )
+    return [
+        {"id": str(uuid.UUID(comment_id)), "issue": issue_id,
+         "project": project_id, "snippet": snippet, "rank": rank}
+        for comment_id, issue_id, project_id, snippet, rank in rows
+    ]
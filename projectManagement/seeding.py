@@ -0,0 +1,156 @@
+"""
+Synthetic dataset generator, for load tests and benchmarks.
+
+Users, projects, contributors, issues and comments are inserted with
+`bulk_create`, by batches. Issues and comments are skewed towards a few
+projects and issues, as they are in real trackers: the project of rank
+``r`` gets issues with a weight of ``1 / r``, the issue of rank ``r``
+gets comments with a weight of ``1 / sqrt(r)``, and titles and
+descriptions draw their words from a Zipf-like distribution, so that
+search and ordering see realistic data.
+
+The same `seed_value` always produces the same dataset.
+"""
+import random
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from authenticated.models import User
+from projectManagement.counters import rebuild_counters
+from projectManagement.models import Comment, Contributor, Issue, Project
+
+VOCABULARY = [
+    "bouton", "formulaire", "erreur", "connexion", "serveur", "page",
+    "affichage", "lenteur", "plantage", "utilisateur", "mot", "passe",
+    "api", "token", "requête", "réponse", "base", "données", "export",
+    "import", "fichier", "image", "mobile", "android", "ios", "navigateur",
+    "cache", "index", "tri", "filtre", "recherche", "notification", "email",
+    "paiement", "facture", "client", "projet", "tâche", "version", "mise",
+    "jour", "test", "déploiement", "migration", "sécurité", "droit", "rôle",
+    "menu", "lien", "calendrier",
+]
+
+
+def words(rng, count):
+    """
+    Returns `count` words drawn from the vocabulary and from a long tail of
+    rare words, with a Zipf-like distribution.
+    """
+    return " ".join(
+        VOCABULARY[index] if index < len(VOCABULARY) else f"mot{index}"
+        for index in (int(rng.paretovariate(1.1)) - 1 for _ in range(count))
+    )
+
+
+@transaction.atomic
+def seed_data(users=200, projects=50, contributors_per_project=10,
+              issues=5000, comments=20000, batch_size=2000, seed_value=0,
+              password=None, prefix="user"):
+    """
+    Inserts the synthetic dataset, in one transaction, and returns the
+    number of rows created per model. Users are named ``<prefix><index>``
+    and projects ``Projet <prefix><index>``; with `password`, the users can
+    log in with it (hashed once for all users), otherwise they have no
+    usable password.
+    """
+    rng = random.Random(seed_value)
+    password = make_password(password)
+    user_ids = [user.id for user in User.objects.bulk_create(
+        [User(username=f"{prefix}{index}",
+              birth_date=date(1990, 1, 1), password=password)
+         for index in range(users)],
+        batch_size=batch_size,
+    )]
+
+    created_projects = Project.objects.bulk_create(
+        [Project(title=f"Projet {prefix}{index}", description="Description",
+                 type="back-end", author_id=rng.choice(user_ids))
+         for index in range(projects)],
+        batch_size=batch_size,
+    )
+    members = {}
+    for project in created_projects:
+        others = rng.sample(user_ids, min(contributors_per_project, users))
+        members[project.id] = sorted({project.author_id, *others})
+    Contributor.objects.bulk_create(
+        (Contributor(project_id=project_id, user_id=user_id)
+         for project_id, project_members in members.items()
+         for user_id in project_members),
+        batch_size=batch_size,
+    )
+
+    project_ids = list(members)
+    project_weights = list(accumulate(
+        1 / (rank + 1) for rank in range(len(project_ids))))
+
+    def issue_rows():
+        for index in range(issues):
+            project_id = rng.choices(
+                project_ids, cum_weights=project_weights)[0]
+            yield Issue(
+                title=f"Issue {index} {words(rng, 3)}",
+                description=words(rng, 20),
+                author_id=rng.choice(members[project_id]),
+                assigned_id=rng.choice(members[project_id] + [None]),
+                project_id=project_id,
+                status=rng.choice(["To Do", "In Progress", "Finished"]),
+                priority=rng.choice(["Low", "Medium", "High"]),
+                nature=rng.choice(["Bug", "Feature", "Task"]),
+            )
+
+    issue_projects = [
+        (issue.id, issue.project_id)
+        for issue in Issue.objects.bulk_create(
+            issue_rows(), batch_size=batch_size)
+    ]
+    issue_weights = list(accumulate(
+        1 / (rank + 1) ** 0.5 for rank in range(len(issue_projects))))
+
+    def comment_rows():
+        for index in range(comments):
+            issue_id, project_id = rng.choices(
+                issue_projects, cum_weights=issue_weights)[0]
+            yield Comment(
+                description=words(rng, 12),
+                author_id=rng.choice(members[project_id]), issue_id=issue_id,
+            )
+
+    if issue_projects:
+        Comment.objects.bulk_create(comment_rows(), batch_size=batch_size)
+
+    # bulk inserts share almost the same timestamp: spread creation dates
+    # over a year so that date orderings are meaningful
+    spread_dates(Issue, project_ids, rng, batch_size=batch_size)
+    spread_dates(Comment, project_ids, rng, batch_size=batch_size)
+    # bulk_create bypasses the signals maintaining the counters
+    rebuild_counters(project_ids)
+    return {
+        "users": len(user_ids),
+        "projects": len(project_ids),
+        "contributors": sum(len(ids) for ids in members.values()),
+        "issues": len(issue_projects),
+        "comments": comments if issue_projects else 0,
+    }
+
+
+def spread_dates(model, project_ids, rng, start=None, days=365,
+                 batch_size=2000):
+    """
+    Sets random creation dates within `days` days from `start` to the
+    issues or comments of the projects, drawn from `rng` in primary key
+    order so that the seed also decides the dates.
+    """
+    start = start or datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+    project_lookup = (
+        "project_id" if model is Issue else "issue__project_id")
+    pks = model.objects.filter(
+        **{f"{project_lookup}__in": project_ids}
+    ).order_by("pk").values_list("pk", flat=True)
+    model.objects.bulk_update(
+        [model(pk=pk, date_created=start + timedelta(
+            seconds=rng.randrange(days * 24 * 3600))) for pk in pks],
+        ["date_created"], batch_size=batch_size,
+    )
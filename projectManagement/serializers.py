@@ -1,6 +1,9 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+
 from authenticated.serializers import UserListSerializer
 from authenticated.models import User
+from projectManagement.membership import add_contributors
 from projectManagement.models import Comment, Issue, Project, Contributor
 
 
@@ -38,7 +41,7 @@ class CommentSerializer(serializers.ModelSerializer):
         the current user as author.
         """
         request = self.context.get("request")
-        validated_data["author"] = request.user
+        validated_data["author_id"] = request.user.id
         comment = Comment.objects.create(**validated_data)
         return comment
 
@@ -66,8 +69,12 @@ class IssueDetailSerializer(serializers.ModelSerializer):
     Detailed serializer for an issue.
     Displays all relevant information, including author,
     the assigned user, comments, and associated project.
+    Only the most recent comments are inlined, `comments_next` links to the
+    complete list.
     """
 
+    comments_preview_size = 5
+
     author = serializers.StringRelatedField(read_only=True)
     assigned = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(), allow_null=True
@@ -76,6 +83,7 @@ class IssueDetailSerializer(serializers.ModelSerializer):
         queryset=Project.objects.all(), allow_null=False)
 
     comments = serializers.SerializerMethodField(read_only=True)
+    comments_next = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Issue
@@ -91,17 +99,54 @@ class IssueDetailSerializer(serializers.ModelSerializer):
             "assigned",
             "project",
             "comments",
+            "comments_next",
         ]
 
+    @classmethod
+    def recent_comments_queryset(cls):
+        """
+        Returns the queryset of the most recent comments, with their author,
+        fetching one extra row to know whether more comments exist.
+        """
+        return cls.comments_queryset()[:cls.comments_preview_size + 1]
+
     @staticmethod
-    def get_comments(instance):
+    def comments_queryset():
+        return Comment.objects.select_related("author").order_by(
+            "-date_created", "-id")
+
+    def get_recent_comments(self, instance):
+        """
+        Returns the comments prefetched in `recent_comments` by the view, or
+        loads them when the issue was not fetched through the view (creation
+        for instance).
         """
-        Retrieves and serializes comments associated with this issue.
+        if not hasattr(instance, "recent_comments"):
+            instance.recent_comments = list(
+                self.comments_queryset().filter(issue=instance)[
+                    :self.comments_preview_size + 1])
+        return instance.recent_comments
+
+    def get_comments(self, instance):
+        """
+        Retrieves and serializes the most recent comments of this issue.
         """
-        queryset = instance.issue_comments.all()
+        queryset = self.get_recent_comments(instance)
+        queryset = queryset[:self.comments_preview_size]
         serializer = CommentSerializer(queryset, many=True)
         return serializer.data
 
+    def get_comments_next(self, instance):
+        """
+        Returns the link to the full list of comments of this issue, or None
+        when every comment is already inlined.
+        """
+        recent_comments = self.get_recent_comments(instance)
+        if len(recent_comments) <= self.comments_preview_size:
+            return None
+        url = reverse("comment-list", request=self.context.get("request"))
+        return f"{url}?issue={instance.id}"
+
     def validate(self, data):
         """
         Validates that the assigned user is a contributor to the project.
@@ -123,11 +168,39 @@ class IssueDetailSerializer(serializers.ModelSerializer):
         user.
         """
         request = self.context.get("request")
-        validated_data["author"] = request.user
+        validated_data["author_id"] = request.user.id
         issue = Issue.objects.create(**validated_data)
         return issue
 
 
+class IssueBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Serializer validating one item of a batch of issues.
+    Related objects are given as plain ids and uniqueness is not checked
+    here: the rules involving other rows are checked for the whole batch
+    at once (see `projectManagement.bulk`).
+    """
+
+    id = serializers.IntegerField(min_value=1, required=False)
+    project = serializers.IntegerField(min_value=1)
+    assigned = serializers.IntegerField(
+        min_value=1, allow_null=True, required=False)
+
+    class Meta:
+        model = Issue
+        fields = [
+            "id",
+            "title",
+            "description",
+            "status",
+            "priority",
+            "nature",
+            "assigned",
+            "project",
+        ]
+        validators = []
+
+
 class ProjectListSerializer(serializers.ModelSerializer):
     """
     Serializer for the list of projects.
@@ -145,6 +218,22 @@ class ProjectListSerializer(serializers.ModelSerializer):
         ]
 
 
+class ProjectCountsListSerializer(ProjectListSerializer):
+    """
+    Serializer for the list of projects with their counters: number of
+    issues in each status and of comments, read from the denormalized
+    counters of the project.
+    """
+
+    class Meta(ProjectListSerializer.Meta):
+        fields = ProjectListSerializer.Meta.fields + [
+            "issues_todo_count",
+            "issues_in_progress_count",
+            "issues_finished_count",
+            "comments_count",
+        ]
+
+
 class ProjectDetailSerializer(serializers.ModelSerializer):
     """
     Detailed serializer for a project.
@@ -184,19 +273,125 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         """
         request = self.context.get("request")
         validated_data.pop("author", None)  # delete the author field from data
-        author = request.user
+        author_id = request.user.id
         contributor_ids = validated_data.pop("contributors_ids", [])
 
         # create project and re-define its author
-        project = Project.objects.create(author=author, **validated_data)
-
-        # Add author as contributor
-        Contributor.objects.get_or_create(project=project, user=author)
+        project = Project.objects.create(
+            author_id=author_id, **validated_data)
 
-        # Add the provided contributors (if they exist)
-        for user_id in set(contributor_ids):
-            user = User.objects.filter(id=user_id).first()
-            if user:
-                Contributor.objects.get_or_create(project=project, user=user)
+        # Add author and the provided contributors (if they exist)
+        add_contributors(project, [author_id, *contributor_ids])
 
         return project
+
+
+class ProjectExportSerializer(serializers.ModelSerializer):
+    """
+    Flat representation of a project in the project export, with the id of
+    its author.
+    """
+
+    class Meta:
+        model = Project
+        fields = [
+            "id",
+            "title",
+            "description",
+            "type",
+            "author",
+            "date_created",
+            "date_updated",
+        ]
+
+
+class IssueExportSerializer(serializers.ModelSerializer):
+    """
+    Flat representation of an issue in the project export, with the ids of
+    the related users.
+    """
+
+    class Meta:
+        model = Issue
+        fields = [
+            "id",
+            "project",
+            "title",
+            "description",
+            "status",
+            "priority",
+            "nature",
+            "author",
+            "assigned",
+            "date_created",
+            "date_updated",
+        ]
+
+
+class CommentExportSerializer(serializers.ModelSerializer):
+    """
+    Flat representation of a comment in the project export, with the id of
+    its author.
+    """
+
+    class Meta:
+        model = Comment
+        fields = [
+            "id",
+            "issue",
+            "description",
+            "author",
+            "date_created",
+            "date_updated",
+        ]
+
+
+class ContributorExportSerializer(serializers.ModelSerializer):
+    """
+    Flat representation of a contributor in the delta sync feed.
+    """
+
+    class Meta:
+        model = Contributor
+        fields = ["id", "project", "user"]
+
+
+class ContributorIdsSerializer(serializers.Serializer):
+    """
+    Validates the list of user ids given to add or remove contributors in
+    batch.
+    """
+
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """
+    Validates the query parameters of the full-text search.
+    """
+
+    q = serializers.CharField(max_length=255)
+    type = serializers.ChoiceField(
+        choices=["issue", "comment"], required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class ChangesQuerySerializer(serializers.Serializer):
+    """
+    Validates the query parameters of the delta sync feed.
+    """
+
+    since = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=500)
+
+
+class EventsQuerySerializer(serializers.Serializer):
+    """
+    Validates the query parameters of the event stream.
+    """
+
+    project = serializers.IntegerField(min_value=1, required=False)
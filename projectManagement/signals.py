@@ -0,0 +1,299 @@
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_delete, pre_migrate
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from authenticated.models import User
+from projectManagement.changes import (
+    changes_recorded, issue_changes, make_change, record_changes
+)
+from projectManagement.counters import Deltas
+from projectManagement.database import configure_connection
+from projectManagement.detail_cache import invalidate_project_detail
+from projectManagement.events import hub
+from projectManagement.instrumentation import install_query_recorder
+from projectManagement.membership import (
+    get_user_project_ids, invalidate_user_project_ids, is_removing_contributors
+)
+from projectManagement.models import Comment, Contributor, Issue, Project
+from projectManagement.search import (
+    create_search_index, drop_search_triggers
+)
+
+
+@receiver([post_save, post_delete], sender=Contributor)
+def invalidate_contributor_membership(sender, instance, **kwargs):
+    """
+    Drops the cached project ids of a user whose contributions changed.
+    """
+    if not is_removing_contributors():
+        invalidate_user_project_ids(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Project)
+def invalidate_project_detail_on_change(sender, instance, **kwargs):
+    """
+    Drops the cached detail of a project that changed.
+    """
+    invalidate_project_detail(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Contributor)
+def invalidate_project_detail_on_contributor_change(sender, instance,
+                                                    **kwargs):
+    """
+    Drops the cached detail of a project whose contributors changed.
+    """
+    if not is_removing_contributors():
+        invalidate_project_detail(instance.project_id)
+
+
+@receiver([post_save, post_delete], sender=Issue)
+def invalidate_project_detail_on_issue_change(sender, instance, **kwargs):
+    """
+    Drops the cached detail of the project of an issue that changed, and of
+    its previous project if the issue was moved.
+    """
+    invalidate_project_detail(
+        instance.project_id, getattr(instance, "_loaded_project_id", None))
+
+
+@receiver(post_save, sender=User)
+def refresh_rows_on_username_change(sender, instance, created,
+                                    update_fields=None, **kwargs):
+    """
+    Moves the modification date of the projects, issues and comments
+    showing the username of a renamed user, so that their validators
+    (ETag, Last-Modified) change, and drops the cached detail of its
+    projects.
+    """
+    if created or (update_fields is not None
+                   and "username" not in update_fields):
+        return
+    if getattr(instance, "_loaded_username", None) == instance.username:
+        return
+    instance._loaded_username = instance.username
+    project_ids = get_user_project_ids(instance.pk)
+    now = timezone.now()
+    Project.objects.filter(id__in=project_ids).update(date_updated=now)
+    Issue.objects.filter(author_id=instance.pk).update(date_updated=now)
+    Comment.objects.filter(author_id=instance.pk).update(date_updated=now)
+    invalidate_project_detail(*project_ids)
+
+
+@receiver(pre_migrate)
+def drop_search_triggers_before_migrate(sender, using, plan=None,
+                                        **kwargs):
+    """
+    Drops the triggers of the full-text search index before migrations are
+    applied: SQLite cannot copy and rename the issue and comment tables
+    while triggers refer to them.
+    """
+    if sender.name == "projectManagement" and plan:
+        drop_search_triggers(connections[using])
+
+
+@receiver(post_migrate)
+def create_search_index_after_migrate(sender, using, **kwargs):
+    """
+    Creates the full-text search index once the tables of the application
+    exist, and restores its triggers after migrations.
+    """
+    if sender.name == "projectManagement":
+        create_search_index(connections[using])
+
+
+def touch(model, pk):
+    """
+    Moves the modification date of a row without loading it.
+    """
+    model.objects.filter(pk=pk).update(date_updated=timezone.now())
+
+
+def is_cascade_from_parent(instance, origin):
+    """
+    Returns True if the instance is deleted because its project or issue is
+    being deleted, in which case there is no parent left to touch.
+    """
+    return isinstance(origin, (Project, Issue)) and origin is not instance
+
+
+@receiver(post_save, sender=Contributor)
+def touch_project_on_contributor_added(sender, instance, **kwargs):
+    """
+    Marks the project as modified when a contributor joins it.
+    """
+    touch(Project, instance.project_id)
+
+
+@receiver(post_delete, sender=Contributor)
+@receiver(post_delete, sender=Issue)
+def touch_project_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Marks the project as modified when a contributor or an issue is
+    removed from it, so that modification dates reflect deletions.
+    """
+    if not (is_cascade_from_parent(instance, origin)
+            or sender is Contributor and is_removing_contributors()):
+        touch(Project, instance.project_id)
+
+
+@receiver(post_delete, sender=Comment)
+def touch_issue_on_comment_delete(sender, instance, origin=None, **kwargs):
+    """
+    Marks the issue and its project as modified when a comment is deleted.
+    """
+    if not is_cascade_from_parent(instance, origin):
+        touch(Issue, instance.issue_id)
+        touch(Project, instance.issue.project_id)
+
+
+@receiver(post_save, sender=Issue)
+def count_issue_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Counts a new issue in its project, or moves it between projects or
+    statuses. Fixtures (raw saves) are counted by `rebuild_counters`.
+    """
+    if raw:
+        return
+    deltas = Deltas()
+    if created:
+        deltas.add_issue(instance.project_id, instance.status)
+    else:
+        deltas.move_issue(
+            instance,
+            getattr(instance, "_loaded_project_id", instance.project_id),
+            getattr(instance, "_loaded_status", instance.status),
+        )
+    deltas.apply()
+
+
+@receiver(post_delete, sender=Issue)
+def uncount_issue_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Removes a deleted issue and its comments from the counters of its
+    project.
+    """
+    if not is_cascade_from_parent(instance, origin):
+        deltas = Deltas()
+        deltas.add_issue(
+            instance.project_id,
+            getattr(instance, "_loaded_status", instance.status),
+            instance.comments_count, sign=-1,
+        )
+        deltas.apply()
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Counts a new comment in its issue and project, or moves it to another
+    issue.
+    """
+    previous = getattr(instance, "_loaded_issue_id", instance.issue_id)
+    if raw or not (created or previous != instance.issue_id):
+        return
+    deltas = Deltas()
+    deltas.add_comment(instance.issue_id, instance.issue.project_id)
+    if not created:
+        deltas.add_comment(
+            previous,
+            Issue.objects.values_list("project_id", flat=True).get(
+                pk=previous),
+            sign=-1,
+        )
+    deltas.apply()
+    instance._loaded_issue_id = instance.issue_id
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Removes a deleted comment from the counters of its issue and project.
+    """
+    if not is_cascade_from_parent(instance, origin):
+        deltas = Deltas()
+        deltas.add_comment(
+            instance.issue_id, instance.issue.project_id, sign=-1)
+        deltas.apply()
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Contributor)
+def record_change_on_save(sender, instance, raw=False, **kwargs):
+    """
+    Logs the creation or update of a row for the delta sync feed. Fixtures
+    (raw saves) are not logged.
+    """
+    if not raw:
+        record_changes([make_change(instance)])
+
+
+@receiver(post_save, sender=Issue)
+def record_issue_change_on_save(sender, instance, raw=False, **kwargs):
+    """
+    Logs the creation or update of an issue, and its removal from its
+    previous project if it was moved. Registered after the other issue
+    receivers, which also read the previous project and status.
+    """
+    if not raw:
+        record_changes(issue_changes([instance]))
+    instance._loaded_project_id = instance.project_id
+    instance._loaded_status = instance.status
+
+
+@receiver(pre_delete, sender=Project)
+def record_project_change_on_delete(sender, instance, **kwargs):
+    """
+    Logs the deletion of a project before its rows are deleted, within the
+    same transaction: its tombstone comes before those of its
+    contributors, while the event streams still follow the project.
+    """
+    record_changes([make_change(instance, deleted=True)])
+
+
+@receiver(post_delete, sender=Issue)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Contributor)
+def record_change_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Logs the deletion of a row for the delta sync feed. Issues and comments
+    deleted with their project or issue are covered by the tombstone of
+    the parent; contributors always get one, so that removed users learn
+    that they left the project (logged once for the batch by
+    `remove_contributors`).
+    """
+    if sender is Contributor and is_removing_contributors():
+        return
+    if sender is Contributor or not is_cascade_from_parent(instance, origin):
+        record_changes([make_change(instance, deleted=True)])
+
+
+@receiver(changes_recorded)
+def publish_changes(sender, changes, **kwargs):
+    """
+    Sends the committed entries of the change log to the open event
+    streams.
+    """
+    hub.publish(changes)
+
+
+@receiver(connection_created)
+def configure_database_connection(sender, connection, **kwargs):
+    """
+    Applies the SQLite pragmas of the settings to every new connection.
+    """
+    configure_connection(connection)
+
+
+@receiver(connection_created)
+def record_connection_queries(sender, connection, **kwargs):
+    """
+    Counts the queries of every new database connection in the metrics of
+    the current request.
+    """
+    install_query_recorder(connection)
@@ -1 +1,2168 @@
-# Create your tests here.
+import asyncio
+import gzip
+import importlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+import zoneinfo
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipIf, skipUnless
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections
+from django.db.models.signals import post_migrate, pre_migrate
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from authenticated.models import User
+from authenticated.tokens import AccessToken
+from projectManagement.data_export import pyarrow
+from projectManagement.database import get_sqlite_pragmas
+from projectManagement.detail_cache import (
+    get_project_detail_cache_stats,
+    invalidate_project_detail,
+    reset_project_detail_cache_stats,
+)
+from projectManagement.events import hub
+from projectManagement.fixtures import FixtureError, iter_json_array
+from projectManagement.instrumentation import (
+    capture_request_metrics, get_query_budget, reset_request_stats
+)
+from projectManagement.membership import (
+    get_membership_cache_stats, reset_membership_cache_stats
+)
+from projectManagement.models import (
+    Change, Comment, Contributor, Issue, Project
+)
+from projectManagement.renderers import FastJSONRenderer
+from projectManagement.search import COMMENT_TABLE
+from projectManagement.serializers import (
+    CommentSerializer,
+    IssueDetailSerializer,
+    IssueExportSerializer,
+    IssueListSerializer,
+    ProjectListSerializer,
+)
+from projectManagement.values_serializers import ValuesSerializer
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username, birth_date=date(1990, 1, 1)
+    )
+
+
+class SoftDeskAPITestCase(APITestCase):
+    """
+    Base test case starting every test with empty caches.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        reset_membership_cache_stats()
+        reset_project_detail_cache_stats()
+        reset_request_stats()
+        self.request_metrics = self.enterContext(capture_request_metrics())
+
+    def assertWithinQueryBudget(self, budget=None):
+        """
+        Fails if the last request ran more SQL queries than `budget`, or
+        than the `QUERY_BUDGETS` setting declares for its endpoint.
+        """
+        metrics = self.request_metrics[-1]
+        if budget is None:
+            budget = get_query_budget(metrics.endpoint)
+            if budget is None:
+                self.fail(f"No query budget declared for {metrics.endpoint}")
+        if metrics.queries > budget:
+            self.fail(
+                f"{metrics.endpoint} ran {metrics.queries} queries, over "
+                f"its budget of {budget}")
+
+
+class ProjectDetailQueryCountTest(SoftDeskAPITestCase):
+    """
+    Regression tests: the project detail must not run one query per
+    contributor or per issue.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+        self.client.force_authenticate(self.author)
+        self.url = f"/api/v1/projects/{self.project.id}/"
+
+    def add_contributors_and_issues(self, count):
+        for index in range(count):
+            user = create_user(f"user{Contributor.objects.count()}")
+            Contributor.objects.create(project=self.project, user=user)
+            Issue.objects.create(
+                title=f"Issue {Issue.objects.count()}",
+                description="Description", nature="Bug",
+                author=self.author, assigned=user, project=self.project,
+            )
+
+    def count_detail_queries(self):
+        self.client.get(self.url)  # warm up the membership cache
+        invalidate_project_detail(self.project.id)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data
+
+    def test_detail_query_count_does_not_grow_with_project_size(self):
+        self.add_contributors_and_issues(2)
+        small_count, small_data = self.count_detail_queries()
+
+        self.add_contributors_and_issues(20)
+        large_count, large_data = self.count_detail_queries()
+
+        self.assertEqual(len(small_data["contributors_info"]), 3)
+        self.assertEqual(len(large_data["contributors_info"]), 23)
+        self.assertEqual(len(large_data["issues"]), 22)
+        self.assertEqual(small_count, large_count)
+        self.assertLessEqual(large_count, 5)
+
+    def test_detail_payload(self):
+        self.add_contributors_and_issues(1)
+        _, data = self.count_detail_queries()
+
+        self.assertEqual(data["author"], "author")
+        self.assertEqual(
+            [contributor["user"]["username"]
+             for contributor in data["contributors_info"]],
+            ["author", "user1"],
+        )
+        self.assertEqual(data["issues"][0]["title"], "Issue 0")
+
+
+class IssueDetailCommentsTest(SoftDeskAPITestCase):
+    """
+    The issue detail inlines a bounded number of comments, loaded with their
+    author in a fixed number of queries.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=project, user=self.author)
+        self.issue = Issue.objects.create(
+            title="Issue", description="Description", nature="Bug",
+            author=self.author, project=project,
+        )
+        self.client.force_authenticate(self.author)
+        self.url = f"/api/v1/issues/{self.issue.id}/"
+
+    def add_comments(self, count):
+        for index in range(count):
+            user = create_user(f"user{User.objects.count()}")
+            Comment.objects.create(
+                description=f"Commentaire {Comment.objects.count()}",
+                author=user, issue=self.issue,
+            )
+
+    def get_detail(self):
+        self.client.get(self.url)  # warm up the membership cache
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data
+
+    def test_created_issue_has_no_comments(self):
+        response = self.client.post("/api/v1/issues/", {
+            "title": "Nouvelle issue", "description": "Description",
+            "nature": "Bug", "project": self.issue.project_id,
+            "assigned": self.author.id,
+        }, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["comments"], [])
+        self.assertIsNone(response.data["comments_next"])
+
+    def test_all_comments_inlined_when_few(self):
+        self.add_comments(2)
+        _, data = self.get_detail()
+
+        self.assertEqual(len(data["comments"]), 2)
+        self.assertIsNone(data["comments_next"])
+
+    def test_comments_are_bounded_and_query_count_constant(self):
+        self.add_comments(3)
+        small_count, _ = self.get_detail()
+
+        self.add_comments(30)
+        large_count, data = self.get_detail()
+
+        size = IssueDetailSerializer.comments_preview_size
+        self.assertEqual(len(data["comments"]), size)
+        self.assertEqual(data["comments"][0]["description"], "Commentaire 32")
+        self.assertTrue(
+            data["comments_next"].endswith(
+                f"/api/v1/comments/?issue={self.issue.id}")
+        )
+        self.assertEqual(small_count, large_count)
+
+        response = self.client.get(data["comments_next"] + "&page_size=50")
+        self.assertEqual(len(response.data["results"]), 33)
+
+
+class IsContributorTest(SoftDeskAPITestCase):
+    """
+    Contributor permission checks are answered from the membership set
+    loaded once per request.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.outsider = create_user("outsider")
+        project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=project, user=self.author)
+        self.issue = Issue.objects.create(
+            title="Issue", description="Description", nature="Bug",
+            author=self.author, project=project,
+        )
+        self.comment = Comment.objects.create(
+            description="Commentaire", author=self.author, issue=self.issue)
+
+    def test_contributor_creates_comment(self):
+        self.client.force_authenticate(self.author)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                "/api/v1/comments/",
+                {"description": "Nouveau", "issue": self.issue.id},
+            )
+        self.assertEqual(response.status_code, 201)
+        membership_queries = [
+            query for query in context.captured_queries
+            if "projectManagement_contributor" in query["sql"]
+        ]
+        self.assertEqual(len(membership_queries), 1)
+
+    def test_outsider_cannot_create_comment(self):
+        self.client.force_authenticate(self.outsider)
+        response = self.client.post(
+            "/api/v1/comments/",
+            {"description": "Nouveau", "issue": self.issue.id},
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_unknown_issue_is_forbidden(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.post(
+            "/api/v1/comments/", {"description": "Nouveau", "issue": 999})
+        self.assertEqual(response.status_code, 403)
+
+    def test_author_updates_comment(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f"/api/v1/comments/{self.comment.id}/",
+            {"description": "Modifié"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["description"], "Modifié")
+
+
+class MembershipCacheTest(SoftDeskAPITestCase):
+    """
+    The project ids of each user are cached across requests and invalidated
+    when their contributions change.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.user = create_user("user")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+
+    def list_projects(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get("/api/v1/projects/")
+        self.assertEqual(response.status_code, 200)
+        return [project["id"] for project in response.data["results"]]
+
+    def test_second_request_hits_the_cache(self):
+        self.list_projects(self.author)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.list_projects(self.author),
+                             [self.project.id])
+
+        stats = get_membership_cache_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+        self.assertFalse(any(
+            "projectManagement_contributor" in query["sql"]
+            for query in context.captured_queries
+        ))
+
+    def test_add_and_remove_contributor_invalidate_the_cache(self):
+        self.assertEqual(self.list_projects(self.user), [])
+
+        self.client.force_authenticate(self.author)
+        self.client.post(
+            f"/api/v1/projects/{self.project.id}/add_contributor/",
+            {"user_id": self.user.id},
+        )
+        self.assertEqual(self.list_projects(self.user), [self.project.id])
+
+        self.client.force_authenticate(self.author)
+        self.client.delete(
+            f"/api/v1/projects/{self.project.id}/del_contributor/",
+            {"user_id": self.user.id},
+        )
+        self.assertEqual(self.list_projects(self.user), [])
+
+
+class CursorPaginationTest(SoftDeskAPITestCase):
+    """
+    Issues and comments are paginated by creation date without counting.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=project, user=self.author)
+        self.issue = Issue.objects.create(
+            title="Issue", description="Description", nature="Bug",
+            author=self.author, project=project,
+        )
+        Comment.objects.bulk_create(
+            Comment(description=f"Commentaire {index}", author=self.author,
+                    issue=self.issue)
+            for index in range(12)
+        )
+        self.client.force_authenticate(self.author)
+
+    def test_pages_cover_every_comment_once(self):
+        expected = list(
+            Comment.objects.order_by("date_created", "id").values_list(
+                "description", flat=True)
+        )
+        url = "/api/v1/comments/?page_size=5"
+        descriptions = []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertNotIn("count", response.data)
+            self.assertFalse(any(
+                "COUNT(" in query["sql"] for query in context.captured_queries
+            ))
+            descriptions += [
+                comment["description"] for comment in response.data["results"]
+            ]
+            url = response.data["next"]
+
+        self.assertEqual(descriptions, expected)
+
+    def test_page_size_is_capped(self):
+        Issue.objects.bulk_create(
+            Issue(title=f"Issue {index}", description="Description",
+                  nature="Bug", author=self.author,
+                  project_id=self.issue.project_id)
+            for index in range(120)
+        )
+        response = self.client.get("/api/v1/issues/?page_size=1000")
+        self.assertEqual(len(response.data["results"]), 100)
+
+
+class IssueFilterTest(SoftDeskAPITestCase):
+    """
+    The list of issues is filtered and ordered from the query parameters.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.user = create_user("user")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+        Contributor.objects.create(project=self.project, user=self.user)
+        self.bug = Issue.objects.create(
+            title="Bug", description="Description", nature="Bug",
+            status="In Progress", priority="High", author=self.author,
+            assigned=self.user, project=self.project,
+        )
+        self.task = Issue.objects.create(
+            title="Task", description="Description", nature="Task",
+            author=self.user, project=self.project,
+        )
+        self.client.force_authenticate(self.author)
+
+    def list_titles(self, query):
+        response = self.client.get(f"/api/v1/issues/?{query}")
+        self.assertEqual(response.status_code, 200, response.data)
+        return [issue["title"] for issue in response.data["results"]]
+
+    def test_filters(self):
+        self.assertEqual(self.list_titles("status=In Progress"), ["Bug"])
+        self.assertEqual(self.list_titles("priority=Medium"), ["Task"])
+        self.assertEqual(self.list_titles("nature=Task"), ["Task"])
+        self.assertEqual(
+            self.list_titles(f"assigned={self.user.id}"), ["Bug"])
+        self.assertEqual(self.list_titles(f"author={self.user.id}"), ["Task"])
+        self.assertEqual(
+            self.list_titles(f"project={self.project.id}&nature=Bug"),
+            ["Bug"],
+        )
+        self.assertEqual(
+            self.list_titles("created_after=2000-01-01T00:00:00Z"),
+            ["Bug", "Task"],
+        )
+        self.assertEqual(
+            self.list_titles("created_before=2000-01-01T00:00:00Z"), [])
+
+    def test_ordering(self):
+        self.assertEqual(
+            self.list_titles("ordering=-date_created"), ["Task", "Bug"])
+
+    def test_invalid_parameters_are_rejected(self):
+        for query in ["status=Unknown", "ordering=title",
+                      "assigned=abc", "created_after=hier"]:
+            response = self.client.get(f"/api/v1/issues/?{query}")
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_filters_do_not_apply_to_detail(self):
+        response = self.client.get(
+            f"/api/v1/issues/{self.task.id}/?status=Finished")
+        self.assertEqual(response.status_code, 200)
+
+
+class SearchTest(SoftDeskAPITestCase):
+    """
+    Full-text search is limited to the projects of the user and kept in sync
+    with issues and comments.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.outsider = create_user("outsider")
+        project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=project, user=self.author)
+        other_project = Project.objects.create(
+            title="Autre", description="Description", type="back-end",
+            author=self.outsider,
+        )
+        Contributor.objects.create(project=other_project, user=self.outsider)
+        self.issue = Issue.objects.create(
+            title="Plantage du formulaire",
+            description="Le bouton d'envoi plante à la validation",
+            nature="Bug", author=self.author, project=project,
+        )
+        Issue.objects.create(
+            title="Formulaire secret", description="Ne doit pas apparaître",
+            nature="Bug", author=self.outsider, project=other_project,
+        )
+        self.comment = Comment.objects.create(
+            description="Le formulaire est corrigé", author=self.author,
+            issue=self.issue,
+        )
+        self.client.force_authenticate(self.author)
+
+    def search(self, query):
+        response = self.client.get("/api/v1/search/", {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_results_are_limited_to_the_user_projects(self):
+        data = self.search("formulaire")
+
+        self.assertEqual([issue["id"] for issue in data["issues"]],
+                         [self.issue.id])
+        self.assertIn("<mark>formulaire</mark>", data["issues"][0]["snippet"])
+        self.assertEqual([comment["id"] for comment in data["comments"]],
+                         [str(self.comment.id)])
+
+    def test_index_follows_updates_and_deletions(self):
+        self.issue.title = "Erreur de saisie"
+        self.issue.save()
+        self.comment.delete()
+
+        data = self.search("saisie")
+        self.assertEqual(len(data["issues"]), 1)
+        self.assertEqual(self.search("corrigé")["comments"], [])
+
+    def test_index_survives_a_table_copy_by_a_migration(self):
+        app_config = apps.get_app_config("projectManagement")
+        pre_migrate.send(app_config, app_config=app_config, using="default",
+                         plan=[("migration", False)])
+        # what SQLite migrations do to alter a table, renumbering rowids
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE "new__comment" AS '
+                f'SELECT * FROM "{COMMENT_TABLE}" ORDER BY id DESC')
+            cursor.execute(f'DROP TABLE "{COMMENT_TABLE}"')
+            cursor.execute(
+                f'ALTER TABLE "new__comment" RENAME TO "{COMMENT_TABLE}"')
+        post_migrate.send(app_config, app_config=app_config,
+                          using="default")
+
+        Comment.objects.create(
+            description="Le formulaire est relu", author=self.author,
+            issue=self.issue,
+        )
+        self.assertEqual(len(self.search("formulaire")["comments"]), 2)
+        self.comment.delete()
+        self.assertEqual(self.search("corrigé")["comments"], [])
+
+    def test_accents_are_ignored(self):
+        self.assertEqual(len(self.search("corrige")["comments"]), 1)
+        self.assertEqual(len(self.search("apparaitre")["issues"]), 0)
+        self.assertEqual(len(self.search("a la validation")["issues"]), 1)
+
+    def test_query_is_required(self):
+        response = self.client.get("/api/v1/search/")
+        self.assertEqual(response.status_code, 400)
+
+
+class IssueBulkTest(SoftDeskAPITestCase):
+    """
+    Batches of issues are validated with set-based queries and written in a
+    single transaction.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.user = create_user("user")
+        self.outsider = create_user("outsider")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+        Contributor.objects.create(project=self.project, user=self.user)
+        self.other_project = Project.objects.create(
+            title="Autre", description="Description", type="back-end",
+            author=self.outsider,
+        )
+        self.client.force_authenticate(self.author)
+
+    def issue_data(self, title, **kwargs):
+        return {"title": title, "description": "Description",
+                "nature": "Bug", "project": self.project.id, **kwargs}
+
+    def test_create_batch_with_constant_query_count(self):
+        items = [self.issue_data(f"Issue {index}", assigned=self.user.id)
+                 for index in range(50)]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                "/api/v1/issues/bulk/", items, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Issue.objects.filter(author=self.author).count(), 50)
+        self.assertEqual(
+            {item["status"] for item in response.data["results"]},
+            {"created"})
+        self.assertLessEqual(len(context.captured_queries), 8)
+
+    def test_per_item_errors(self):
+        Issue.objects.create(
+            title="Existante", description="Description", nature="Bug",
+            author=self.author, project=self.project,
+        )
+        items = [
+            self.issue_data("Valide"),
+            self.issue_data("Existante"),
+            self.issue_data("Assignée", assigned=self.outsider.id),
+            self.issue_data("Ailleurs", project=self.other_project.id),
+            self.issue_data("Valide"),
+            {"title": "Incomplète"},
+        ]
+        response = self.client.post(
+            "/api/v1/issues/bulk/", items, format="json")
+
+        self.assertEqual(response.status_code, 207)
+        results = response.data["results"]
+        self.assertEqual(results[0]["status"], "created")
+        self.assertIn("title", results[1]["errors"])
+        self.assertIn("assigned", results[2]["errors"])
+        self.assertIn("project", results[3]["errors"])
+        self.assertIn("title", results[4]["errors"])
+        self.assertIn("description", results[5]["errors"])
+        self.assertTrue(Issue.objects.filter(title="Valide").exists())
+
+    def test_atomic_mode_writes_nothing_on_error(self):
+        items = [self.issue_data("Valide"), {"title": "Incomplète"}]
+        response = self.client.post(
+            "/api/v1/issues/bulk/?atomic=true", items, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["results"][0]["status"], "skipped")
+        self.assertFalse(Issue.objects.exists())
+
+    def test_update_batch(self):
+        mine = Issue.objects.create(
+            title="Mienne", description="Description", nature="Bug",
+            author=self.author, project=self.project,
+        )
+        theirs = Issue.objects.create(
+            title="Autre", description="Description", nature="Bug",
+            author=self.user, project=self.project,
+        )
+        items = [
+            {"id": mine.id, "status": "Finished", "assigned": self.user.id},
+            {"id": theirs.id, "status": "Finished"},
+            {"status": "Finished"},
+        ]
+        response = self.client.patch(
+            "/api/v1/issues/bulk/", items, format="json")
+
+        self.assertEqual(response.status_code, 207)
+        results = response.data["results"]
+        self.assertEqual(results[0]["status"], "updated")
+        self.assertIn("id", results[1]["errors"])
+        self.assertIn("id", results[2]["errors"])
+        mine.refresh_from_db()
+        theirs.refresh_from_db()
+        self.assertEqual((mine.status, mine.assigned), ("Finished", self.user))
+        self.assertEqual(theirs.status, "To Do")
+
+    def test_update_batch_title_collisions(self):
+        first, second, third = (
+            Issue.objects.create(
+                title=title, description="Description", nature="Bug",
+                author=self.author, project=self.project,
+            )
+            for title in ("Une", "Deux", "Trois")
+        )
+        items = [
+            # swap: the second title is still held when the first is given
+            {"id": first.id, "title": "Deux"},
+            {"id": second.id, "title": "Une"},
+            # renamed to the title of an issue of the batch keeping it
+            {"id": third.id, "title": "Une", "status": "Finished"},
+            {"id": first.id, "status": "Finished"},
+        ]
+        response = self.client.patch(
+            "/api/v1/issues/bulk/", items, format="json")
+
+        self.assertEqual(response.status_code, 207)
+        results = response.data["results"]
+        self.assertIn("title", results[0]["errors"])
+        self.assertIn("title", results[1]["errors"])
+        self.assertIn("title", results[2]["errors"])
+        self.assertEqual(results[3]["status"], "updated")
+        self.assertEqual(
+            sorted(Issue.objects.values_list("title", flat=True)),
+            ["Deux", "Trois", "Une"])
+
+
+class ContributorBatchTest(SoftDeskAPITestCase):
+    """
+    Contributors are added and removed in batch with a constant number of
+    queries.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.users = [create_user(f"user{index}") for index in range(30)]
+        self.client.force_authenticate(self.author)
+
+    def create_project(self, contributors_ids, title="Projet"):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                "/api/v1/projects/",
+                {"title": title, "description": "Description",
+                 "type": "back-end", "contributors_ids": contributors_ids},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertWithinQueryBudget()
+        self.queries = len(context.captured_queries)
+        return Project.objects.get(id=response.data["id"])
+
+    def test_create_project_with_contributors(self):
+        project = self.create_project(
+            [user.id for user in self.users[:5]] + [999])
+        self.assertEqual(project.contributors.count(), 6)
+        small_count = self.queries
+
+        self.create_project([user.id for user in self.users], title="Grand")
+        self.assertEqual(self.queries, small_count)
+
+    def test_add_and_remove_contributors(self):
+        project = self.create_project([self.users[0].id])
+        url = f"/api/v1/projects/{project.id}/"
+        user_ids = [user.id for user in self.users]
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                url + "add_contributors/",
+                {"user_ids": user_ids + [999]}, format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["added"], user_ids[1:])
+        self.assertEqual(response.data["skipped"], [self.users[0].id])
+        self.assertEqual(response.data["not_found"], [999])
+        # constant: the rows and their change log entries are inserted in
+        # one transaction whatever the number of users
+        self.assertLessEqual(len(context.captured_queries), 9)
+        self.assertEqual(project.contributors.count(), 31)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete(
+                url + "del_contributors/",
+                {"user_ids": user_ids[:10] + [self.author.id]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["removed"], user_ids[:10])
+        self.assertEqual(response.data["skipped"], [self.author.id])
+        self.assertLessEqual(len(context.captured_queries), 9)
+        self.assertEqual(project.contributors.count(), 21)
+        self.assertEqual(
+            sorted(Change.objects.filter(
+                type="contributor", deleted=True
+            ).values_list("user_id", flat=True)),
+            user_ids[:10])
+
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(
+            self.client.get(f"/api/v1/projects/{project.id}/").status_code,
+            404)
+        self.client.force_authenticate(self.users[10])
+        self.assertEqual(
+            self.client.get(f"/api/v1/projects/{project.id}/").status_code,
+            200)
+
+    def test_only_author_manages_contributors(self):
+        project = self.create_project([self.users[0].id])
+        self.client.force_authenticate(self.users[0])
+        response = self.client.post(
+            f"/api/v1/projects/{project.id}/add_contributors/",
+            {"user_ids": [self.users[1].id]}, format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class ConditionalGetTest(SoftDeskAPITestCase):
+    """
+    Lists and details answer 304 Not Modified while nothing they render
+    has changed, and a new ETag after a change or a deletion.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+        self.issue = Issue.objects.create(
+            title="Issue", description="Description", nature="Bug",
+            author=self.author, project=self.project,
+        )
+        self.comment = Comment.objects.create(
+            description="Commentaire", author=self.author, issue=self.issue)
+        self.client.force_authenticate(self.author)
+
+    def get_etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Last-Modified", response)
+        return response["ETag"]
+
+    def assertNotModified(self, url, etag):
+        self.client.get(url)  # warm up the membership cache
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertLessEqual(len(context.captured_queries), 3)
+
+    def test_unchanged_resources_are_not_modified(self):
+        for url in [
+            "/api/v1/projects/",
+            f"/api/v1/projects/{self.project.id}/",
+            "/api/v1/issues/",
+            f"/api/v1/issues/{self.issue.id}/",
+            "/api/v1/comments/",
+            f"/api/v1/comments/{self.comment.id}/",
+        ]:
+            with self.subTest(url=url):
+                self.assertNotModified(url, self.get_etag(url))
+
+    def test_if_modified_since(self):
+        url = f"/api/v1/issues/{self.issue.id}/"
+        last_modified = self.client.get(url)["Last-Modified"]
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_after_an_update(self):
+        url = f"/api/v1/projects/{self.project.id}/"
+        etag = self.get_etag(url)
+        self.issue.title = "Nouveau titre"
+        self.issue.save()
+        self.assertNotEqual(self.get_etag(url), etag)
+
+    def test_etag_changes_after_a_deletion(self):
+        issue_url = f"/api/v1/issues/{self.issue.id}/"
+        issue_etag = self.get_etag(issue_url)
+        list_etag = self.get_etag("/api/v1/comments/")
+        self.comment.delete()
+        self.assertNotEqual(self.get_etag(issue_url), issue_etag)
+        self.assertNotEqual(self.get_etag("/api/v1/comments/"), list_etag)
+
+    def test_etag_changes_after_adding_contributors(self):
+        url = f"/api/v1/projects/{self.project.id}/"
+        etag = self.get_etag(url)
+        user = create_user("contributor")
+        self.client.post(
+            f"/api/v1/projects/{self.project.id}/add_contributors/",
+            {"user_ids": [user.id]}, format="json",
+        )
+        self.assertNotEqual(self.get_etag(url), etag)
+
+    def test_etag_changes_after_renaming_the_author(self):
+        urls = [
+            "/api/v1/projects/",
+            f"/api/v1/projects/{self.project.id}/",
+            f"/api/v1/issues/{self.issue.id}/",
+            "/api/v1/comments/",
+            f"/api/v1/comments/{self.comment.id}/",
+        ]
+        etags = [self.get_etag(url) for url in urls]
+        author = User.objects.get(pk=self.author.pk)
+        author.username = "renamed"
+        author.save()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(
+            self.client.get(f"/api/v1/issues/{self.issue.id}/").data[
+                "author"], "renamed")
+
+    def test_etag_depends_on_the_user(self):
+        url = f"/api/v1/projects/{self.project.id}/"
+        etag = self.get_etag(url)
+        other = create_user("other")
+        Contributor.objects.create(project=self.project, user=other)
+        self.client.force_authenticate(other)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ProjectDetailCacheTest(SoftDeskAPITestCase):
+    """
+    The project detail is serialized once for all contributors and rebuilt
+    after any change of the project, its contributors or its issues.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+        self.issue = Issue.objects.create(
+            title="Issue", description="Description", nature="Bug",
+            author=self.author, project=self.project,
+        )
+        self.client.force_authenticate(self.author)
+        self.url = f"/api/v1/projects/{self.project.id}/"
+
+    def get_detail(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_detail_is_shared_between_contributors(self):
+        other = create_user("other")
+        Contributor.objects.create(project=self.project, user=other)
+        data = self.get_detail()
+        self.client.force_authenticate(other)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.get_detail(), data)
+        # membership, project and validators: nothing is serialized
+        self.assertEqual(len(context.captured_queries), 3)
+        stats = get_project_detail_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+        self.assertIsNotNone(stats["rebuild_ms_mean"])
+
+    def test_permissions_are_checked_on_cache_hits(self):
+        self.get_detail()
+        self.client.force_authenticate(create_user("outsider"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_changes_rebuild_the_detail(self):
+        self.get_detail()
+        self.issue.title = "Renommée"
+        self.issue.save()
+        self.assertEqual(self.get_detail()["issues"][0]["title"], "Renommée")
+
+        user = create_user("contributor")
+        self.client.post(f"{self.url}add_contributors/",
+                         {"user_ids": [user.id]}, format="json")
+        self.assertEqual(len(self.get_detail()["contributors_info"]), 2)
+
+        self.client.patch(self.url, {"title": "Nouveau"}, format="json")
+        self.assertEqual(self.get_detail()["title"], "Nouveau")
+
+        self.issue.delete()
+        self.assertEqual(self.get_detail()["issues"], [])
+
+    def test_moving_an_issue_rebuilds_both_projects(self):
+        other = Project.objects.create(
+            title="Autre", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=other, user=self.author)
+        other_url = f"/api/v1/projects/{other.id}/"
+        self.get_detail()
+        self.client.get(other_url)
+        issue = Issue.objects.get(pk=self.issue.pk)
+        issue.project = other
+        issue.save()
+        self.assertEqual(self.get_detail()["issues"], [])
+        self.assertEqual(len(self.client.get(other_url).data["issues"]), 1)
+
+        self.client.patch("/api/v1/issues/bulk/", [
+            {"id": self.issue.id, "project": self.project.id},
+        ], format="json")
+        self.assertEqual(len(self.get_detail()["issues"]), 1)
+        self.assertEqual(self.client.get(other_url).data["issues"], [])
+
+    def test_stats_are_reserved_to_staff(self):
+        url = "/api/v1/cache-stats/"
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.author.is_staff = True
+        self.author.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("hit_ratio", response.data["project_detail"])
+
+
+class ValuesSerializerTest(SoftDeskAPITestCase):
+    """
+    The fast read path of the list actions returns exactly what the
+    serializers return.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        assignee = create_user("assignee")
+        for index in range(3):
+            project = Project.objects.create(
+                title=f"Projet {index}", description="Description",
+                type=["back-end", "iOS", "Android"][index],
+                author=self.author,
+            )
+            Contributor.objects.create(project=project, user=self.author)
+            for number in range(4):
+                Issue.objects.create(
+                    title=f"Issue {number}", description="Description",
+                    nature="Bug", status="In Progress", author=self.author,
+                    assigned=assignee if number % 2 else None,
+                    project=project,
+                )
+        self.client.force_authenticate(self.author)
+
+    def test_same_representation_as_the_serializers(self):
+        for serializer_class, queryset in [
+            (IssueListSerializer, Issue.objects.order_by("id")),
+            (ProjectListSerializer, Project.objects.order_by("id")),
+        ]:
+            with self.subTest(serializer=serializer_class.__name__):
+                fast = ValuesSerializer(serializer_class)
+                self.assertEqual(
+                    fast.to_representation(fast.values(queryset)),
+                    serializer_class(queryset, many=True).data,
+                )
+
+    @override_settings(TIME_ZONE="Europe/Paris")
+    def test_same_dates_in_another_time_zone(self):
+        fast = ValuesSerializer(IssueListSerializer)
+        queryset = Issue.objects.order_by("id")
+        self.assertEqual(
+            fast.to_representation(fast.values(queryset)),
+            IssueListSerializer(queryset, many=True).data,
+        )
+
+    def test_same_responses_as_the_serializers(self):
+        for url in [
+            "/api/v1/projects/",
+            "/api/v1/issues/?page_size=5",
+            "/api/v1/issues/?assigned_id=2&ordering=-date_created",
+        ]:
+            with self.subTest(url=url):
+                fast = self.client.get(url)
+                with override_settings(FAST_LIST_SERIALIZATION=False):
+                    slow = self.client.get(url)
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.data, slow.data)
+                self.assertEqual(fast.content, slow.content)
+
+    def test_nested_serializers_are_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(IssueDetailSerializer)
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(CommentSerializer)  # author by username
+
+
+class FastJSONRendererTest(SoftDeskAPITestCase):
+    """
+    The orjson renderer writes the same bytes as DRF's JSONRenderer.
+    """
+
+    def assertSameRendering(self, data, **kwargs):
+        self.assertEqual(
+            FastJSONRenderer().render(data, **kwargs),
+            JSONRenderer().render(data, **kwargs),
+        )
+
+    def test_same_bytes_as_drf(self):
+        moment = datetime(2025, 4, 8, 13, 45, 12, 345678)
+        self.assertSameRendering({
+            "utc": moment.replace(tzinfo=dt_timezone.utc),
+            "paris": timezone.make_aware(
+                moment, zoneinfo.ZoneInfo("Europe/Paris")),
+            "naive": moment.replace(microsecond=0),
+            "date": moment.date(),
+            "time": moment.time(),
+            "duration": timedelta(hours=1, milliseconds=5),
+            "decimal": Decimal("12.50"),
+            "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "lazy": gettext_lazy("Texte"),
+            "text": "Accentué   ligne",
+            1: [None, True, 1.5, (1, 2)],
+        })
+
+    def test_indented_and_empty_rendering(self):
+        self.assertSameRendering(
+            {"date": date(2025, 4, 8)},
+            accepted_media_type="application/json; indent=4",
+        )
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_unsupported_values_raise_like_drf(self):
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({"value": object()})
+
+    def test_api_responses_are_unchanged(self):
+        author = create_user("author")
+        project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=author,
+        )
+        Contributor.objects.create(project=project, user=author)
+        issue = Issue.objects.create(
+            title="Issue", description="Description", nature="Bug",
+            author=author, project=project,
+        )
+        comment = Comment.objects.create(
+            description="Commentaire", author=author, issue=issue)
+        self.client.force_authenticate(author)
+        response = self.client.get(f"/api/v1/comments/{comment.id}/")
+        self.assertEqual(
+            response.content, JSONRenderer().render(response.data))
+
+
+class ProjectExportTest(SoftDeskAPITestCase):
+    """
+    The export streams the project, its issues and its comments as NDJSON,
+    to contributors only.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+        other = Project.objects.create(
+            title="Autre", description="Description", type="back-end",
+            author=self.author,
+        )
+        for project in (self.project, other):
+            for index in range(3):
+                issue = Issue.objects.create(
+                    title=f"Issue {index}", description="Description",
+                    nature="Bug", author=self.author, project=project,
+                )
+                Comment.objects.bulk_create(
+                    Comment(description=f"Commentaire {number}",
+                            author=self.author, issue=issue)
+                    for number in range(index + 1)
+                )
+        self.url = f"/api/v1/projects/{self.project.id}/export/"
+        self.client.force_authenticate(self.author)
+
+    def export(self, chunk_size=None):
+        if chunk_size is None:
+            response = self.client.get(self.url)
+        else:
+            with patch("projectManagement.export.EXPORT_CHUNK_SIZE",
+                       chunk_size):
+                response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return [json.loads(line) for line in
+                b"".join(response.streaming_content).splitlines()]
+
+    def test_export_contains_the_whole_project(self):
+        lines = self.export()
+        self.assertEqual([line["type"] for line in lines],
+                         ["project"] + ["issue"] * 3 + ["comment"] * 6)
+        self.assertEqual(lines[0]["data"]["id"], self.project.id)
+        issue = Issue.objects.filter(project=self.project).first()
+        self.assertEqual(lines[1]["data"], dict(
+            IssueExportSerializer(issue).data))
+        comment_ids = {line["data"]["id"] for line in lines[4:]}
+        self.assertEqual(comment_ids, {
+            str(pk) for pk in Comment.objects.filter(
+                issue__project=self.project).values_list("id", flat=True)
+        })
+
+    def test_small_chunks_give_the_same_export(self):
+        self.assertEqual(self.export(chunk_size=2), self.export())
+
+    def test_asgi_streams_an_async_export(self):
+        async def read(response):
+            return b"".join([part async for part in response])
+
+        expected = self.export(chunk_size=2)
+        with patch("projectManagement.export.EXPORT_CHUNK_SIZE", 2):
+            response = async_to_sync(self.async_client.get)(
+                self.url,
+                headers={"Authorization":
+                         f"Bearer {AccessToken.for_user(self.author)}"},
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            content = async_to_sync(read)(response.streaming_content)
+        self.assertEqual(
+            [json.loads(line) for line in content.splitlines()], expected)
+
+    def test_export_is_reserved_to_contributors(self):
+        self.client.force_authenticate(create_user("outsider"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class ChangesFeedTest(SoftDeskAPITestCase):
+    """
+    The delta sync feed returns the rows changed after a token, with
+    tombstones for deletions, within the projects of the user.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+        self.issue = Issue.objects.create(
+            title="Issue", description="Description", nature="Bug",
+            author=self.author, project=self.project,
+        )
+        self.client.force_authenticate(self.author)
+        self.token = self.client.get("/api/v1/changes/").data["next"]
+
+    def get_changes(self, since=None, **params):
+        response = self.client.get("/api/v1/changes/", {
+            "since": self.token if since is None else since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def summary(self, feed):
+        return [(change["type"], change["id"], change["deleted"])
+                for change in feed["changes"]]
+
+    def test_changes_after_the_token(self):
+        self.assertEqual(self.get_changes()["changes"], [])
+        comment = Comment.objects.create(
+            description="Commentaire", author=self.author, issue=self.issue)
+        self.issue.status = "Finished"
+        self.issue.save()
+
+        feed = self.get_changes()
+        self.assertEqual(self.summary(feed), [
+            ("comment", str(comment.id), False),
+            ("issue", self.issue.id, False),
+        ])
+        self.assertEqual(feed["changes"][1]["data"]["status"], "Finished")
+        self.assertFalse(feed["has_more"])
+
+        comment_id = str(comment.id)
+        comment.delete()
+        feed = self.get_changes(since=feed["next"])
+        self.assertEqual(self.summary(feed), [
+            ("comment", comment_id, True),
+        ])
+        self.assertIsNone(feed["changes"][0]["data"])
+
+    def test_each_row_appears_once(self):
+        for status in ["In Progress", "Finished", "To Do"]:
+            self.issue.status = status
+            self.issue.save()
+        feed = self.get_changes()
+        self.assertEqual(self.summary(feed), [("issue", self.issue.id, False)])
+        self.assertEqual(feed["changes"][0]["data"]["status"], "To Do")
+
+    def test_pages_follow_the_tokens(self):
+        for index in range(5):
+            Issue.objects.create(
+                title=f"Issue {index}", description="Description",
+                nature="Bug", author=self.author, project=self.project,
+            )
+        feed = self.get_changes(limit=3)
+        self.assertTrue(feed["has_more"])
+        rest = self.get_changes(since=feed["next"], limit=3)
+        self.assertFalse(rest["has_more"])
+        self.assertEqual(len(feed["changes"]) + len(rest["changes"]), 5)
+
+    def test_changes_of_other_projects_are_hidden(self):
+        outsider = create_user("outsider")
+        other = Project.objects.create(
+            title="Autre", description="Description", type="back-end",
+            author=outsider,
+        )
+        Contributor.objects.create(project=other, user=outsider)
+        Issue.objects.create(
+            title="Issue", description="Description", nature="Bug",
+            author=outsider, project=other,
+        )
+        self.assertEqual(self.get_changes()["changes"], [])
+
+    def test_moved_issue_is_a_tombstone_for_the_previous_project(self):
+        other = Project.objects.create(
+            title="Autre", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=other, user=self.author)
+        member = create_user("member")
+        Contributor.objects.create(project=self.project, user=member)
+        self.token = self.client.get("/api/v1/changes/").data["next"]
+
+        self.client.patch("/api/v1/issues/bulk/", [
+            {"id": self.issue.id, "project": other.id},
+        ], format="json")
+        self.assertEqual(self.summary(self.get_changes()), [
+            ("issue", self.issue.id, False),
+        ])
+        self.client.force_authenticate(member)
+        self.assertEqual(self.summary(self.get_changes()), [
+            ("issue", self.issue.id, True),
+        ])
+
+    def test_removed_contributor_receives_its_tombstone(self):
+        member = create_user("member")
+        self.client.post(
+            f"/api/v1/projects/{self.project.id}/add_contributors/",
+            {"user_ids": [member.id]}, format="json",
+        )
+        contributor = Contributor.objects.get(user=member)
+        self.client.force_authenticate(member)
+        self.assertEqual(self.summary(self.get_changes()), [
+            ("contributor", contributor.id, False),
+        ])
+
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(
+            f"/api/v1/projects/{self.project.id}/del_contributors/",
+            {"user_ids": [member.id]}, format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(member)
+        self.assertEqual(self.summary(self.get_changes()), [
+            ("contributor", contributor.id, True),
+        ])
+
+    def test_pruned_tokens_are_gone(self):
+        self.issue.save()
+        Change.objects.all().delete()
+        self.issue.save()
+        response = self.client.get("/api/v1/changes/", {"since": 0})
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.data["code"], "sync_token_expired")
+
+    def test_pruning_everything_keeps_the_head_token(self):
+        stale = self.token
+        self.issue.save()
+        self.issue.save()
+        head = self.client.get("/api/v1/changes/").data["next"]
+        call_command("prune_changes", days=0, stdout=io.StringIO())
+
+        self.assertEqual(Change.objects.count(), 1)
+        self.assertEqual(
+            self.client.get("/api/v1/changes/").data["next"], head)
+        response = self.client.get("/api/v1/changes/", {"since": stale})
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(self.get_changes(since=head)["changes"], [])
+
+        self.issue.save()
+        self.assertEqual(self.summary(self.get_changes(since=head)),
+                         [("issue", self.issue.id, False)])
+
+    def test_emptied_log_expires_tokens(self):
+        Change.objects.all().delete()
+        response = self.client.get("/api/v1/changes/", {"since": self.token})
+        self.assertEqual(response.status_code, 410)
+
+
+class AsyncReadViewTest(SoftDeskAPITestCase):
+    """
+    The async read views return what the sync ViewSets return, with the
+    same authentication and permissions.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+        for index in range(7):
+            issue = Issue.objects.create(
+                title=f"Issue {index}", description="Description",
+                nature="Bug", author=self.author, project=self.project,
+            )
+        self.issue = issue
+        Comment.objects.bulk_create(
+            Comment(description=f"Commentaire {index}", author=self.author,
+                    issue=issue)
+            for index in range(7)
+        )
+        self.comment = issue.issue_comments.first()
+        self.client.force_authenticate(self.author)
+        self.headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(self.author)}"}
+
+    async def assertSameResponse(self, url, headers=None):
+        response = await self.async_client.get(
+            url.replace("/api/v1/", "/api/v1/async/"),
+            headers=self.headers if headers is None else headers,
+        )
+        expected = await sync_to_async(self.client.get)(url)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(
+            json.loads(response.content.replace(b"/async", b"")),
+            json.loads(expected.content),
+        )
+
+    async def test_same_responses_as_the_viewsets(self):
+        for url in [
+            "/api/v1/projects/",
+            "/api/v1/projects/?page=2",
+            f"/api/v1/projects/{self.project.id}/",
+            "/api/v1/issues/?page_size=3",
+            "/api/v1/issues/?status=Finished&ordering=-date_created",
+            f"/api/v1/issues/{self.issue.id}/",
+            f"/api/v1/comments/?issue={self.issue.id}&page_size=5",
+            f"/api/v1/comments/{self.comment.id}/",
+            "/api/v1/issues/9999/",
+            "/api/v1/comments/?issue=abc",
+        ]:
+            with self.subTest(url=url):
+                await self.assertSameResponse(url)
+
+    async def test_cursor_pages_follow_the_links(self):
+        url = "/api/v1/async/issues/?page_size=3"
+        titles = []
+        while url:
+            response = await self.async_client.get(url, headers=self.headers)
+            data = json.loads(response.content)
+            titles += [issue["title"] for issue in data["results"]]
+            url = data["next"]
+        self.assertEqual(titles, [f"Issue {index}" for index in range(7)])
+
+    async def test_authentication_and_permissions(self):
+        url = f"/api/v1/async/projects/{self.project.id}/"
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("WWW-Authenticate", response)
+        response = await self.async_client.get(
+            url, headers={"Authorization": "Bearer invalide"})
+        self.assertEqual(response.status_code, 401)
+
+        outsider = await sync_to_async(create_user)("outsider")
+        headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(outsider)}"}
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(
+            "/api/v1/async/issues/", headers=headers)
+        self.assertEqual(json.loads(response.content)["results"], [])
+
+
+class EventStreamTest(SoftDeskAPITestCase):
+    """
+    The event stream pushes the committed changes of the issues and
+    comments of the projects of the user.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.other = create_user("other")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        self.foreign_project = Project.objects.create(
+            title="Autre", description="Description", type="back-end",
+            author=self.other,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+        Contributor.objects.create(
+            project=self.foreign_project, user=self.other)
+
+    def headers(self, user):
+        return {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+    async def open_stream(self, user, **params):
+        response = await self.async_client.get(
+            "/api/v1/events/", params, headers=self.headers(user))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.addCleanup(async_to_sync(self.close_stream), response)
+        stream = response.streaming_content
+        name, _, data = await self.next_event(stream)
+        self.assertEqual(name, "ready")
+        return stream, data["token"]
+
+    async def close_stream(self, response):
+        # an ASGI server cancels the stream when the client disconnects
+        await response._iterator.aclose()
+
+    async def next_event(self, stream):
+        message = await asyncio.wait_for(anext(stream), 2)
+        fields = dict(
+            line.split(": ", 1) for line in message.decode().split("\n")
+            if line)
+        return (fields["event"], fields.get("id"),
+                json.loads(fields["data"]))
+
+    @sync_to_async
+    def write(self, func):
+        # the events are published once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            return func()
+
+    def create_issue(self, project, title="Issue"):
+        return Issue.objects.create(
+            title=title, description="Description", nature="Bug",
+            author=project.author, project=project,
+        )
+
+    async def test_changes_of_the_projects_of_the_user(self):
+        stream, token = await self.open_stream(self.author)
+        await self.write(lambda: self.create_issue(self.foreign_project))
+        issue = await self.write(lambda: self.create_issue(self.project))
+
+        name, event_id, event = await self.next_event(stream)
+        self.assertEqual(name, "issue")
+        self.assertGreater(event["token"], token)
+        self.assertEqual(int(event_id), event["token"])
+        self.assertEqual(
+            (event["id"], event["project"], event["deleted"]),
+            (issue.id, self.project.id, False))
+        self.assertEqual(event["data"]["title"], "Issue")
+
+        comment = await self.write(lambda: Comment.objects.create(
+            description="Commentaire", author=self.author, issue=issue))
+        name, _, event = await self.next_event(stream)
+        self.assertEqual((name, event["id"]), ("comment", str(comment.id)))
+
+        issue_id = issue.id
+        await self.write(issue.delete)
+        name, _, event = await self.next_event(stream)
+        self.assertEqual((name, event["id"], event["deleted"], event["data"]),
+                         ("issue", issue_id, True, None))
+
+    async def test_membership_is_followed(self):
+        stream, _ = await self.open_stream(self.other)
+        contributor = await self.write(lambda: Contributor.objects.create(
+            project=self.project, user=self.other))
+        name, _, event = await self.next_event(stream)
+        self.assertEqual((name, event["id"], event["deleted"]),
+                         ("contributor", contributor.id, False))
+
+        issue = await self.write(lambda: self.create_issue(self.project))
+        name, _, event = await self.next_event(stream)
+        self.assertEqual((name, event["id"]), ("issue", issue.id))
+
+        await self.write(contributor.delete)
+        name, _, event = await self.next_event(stream)
+        self.assertEqual((name, event["deleted"]), ("contributor", True))
+        await self.write(lambda: self.create_issue(self.project, "Autre"))
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(anext(stream), 0.2)
+
+    async def test_project_deletion_is_streamed(self):
+        stream, _ = await self.open_stream(self.author)
+        await self.write(lambda: self.create_issue(self.project))
+        name, _, event = await self.next_event(stream)
+        self.assertEqual(name, "issue")
+
+        project_id = self.project.id
+        await self.write(self.project.delete)
+        name, _, event = await self.next_event(stream)
+        self.assertEqual((name, event["id"], event["deleted"]),
+                         ("project", project_id, True))
+        name, _, event = await self.next_event(stream)
+        self.assertEqual((name, event["project"], event["deleted"]),
+                         ("contributor", project_id, True))
+
+    @override_settings(EVENT_STREAM_QUEUE_SIZE=2)
+    async def test_slow_subscriber_is_closed(self):
+        stream, token = await self.open_stream(self.author)
+        self.assertEqual(hub.subscriber_count, 1)
+        for index in range(3):
+            await self.write(
+                lambda: self.create_issue(self.project, f"Issue {index}"))
+        # let the loop run the queued deliveries
+        await asyncio.sleep(0)
+
+        name, _, event = await self.next_event(stream)
+        self.assertEqual((name, event), ("overflow", {"token": token}))
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+        self.assertEqual(hub.subscriber_count, 0)
+
+    async def test_authentication_membership_and_server(self):
+        response = await self.async_client.get("/api/v1/events/")
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(
+            "/api/v1/events/", {"project": self.foreign_project.id},
+            headers=self.headers(self.author))
+        self.assertEqual(response.status_code, 403)
+        response = await sync_to_async(self.client.get)(
+            "/api/v1/events/", headers=self.headers(self.author))
+        self.assertEqual(response.status_code, 501)
+
+        stream, _ = await self.open_stream(
+            self.other, project=self.foreign_project.id)
+        await self.write(lambda: Contributor.objects.create(
+            project=self.project, user=self.other))
+        await self.write(lambda: self.create_issue(self.project))
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(anext(stream), 0.2)
+
+
+class ProjectCountersTest(SoftDeskAPITestCase):
+    """
+    The issue and comment counters of projects and issues follow the
+    writes, are listed with `?counts=true`, and can be rebuilt.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        self.other_project = Project.objects.create(
+            title="Autre", description="Description", type="back-end",
+            author=self.author,
+        )
+        for project in (self.project, self.other_project):
+            Contributor.objects.create(project=project, user=self.author)
+        self.client.force_authenticate(self.author)
+
+    def counters(self, project):
+        response = self.client.get("/api/v1/projects/", {"counts": "true"})
+        self.assertEqual(response.status_code, 200)
+        item = next(item for item in response.data["results"]
+                    if item["id"] == project.id)
+        return [item["issues_todo_count"], item["issues_in_progress_count"],
+                item["issues_finished_count"], item["comments_count"]]
+
+    def create_issue(self, title, project=None):
+        response = self.client.post("/api/v1/issues/", {
+            "title": title, "description": "Description", "nature": "Bug",
+            "project": (project or self.project).id, "assigned": None,
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def test_counters_follow_the_writes(self):
+        issue_id = self.create_issue("Issue")
+        self.create_issue("Autre issue")
+        for index in range(2):
+            response = self.client.post("/api/v1/comments/", {
+                "description": f"Commentaire {index}", "issue": issue_id})
+            self.assertEqual(response.status_code, 201)
+        comment_id = response.data["id"]
+        self.assertEqual(self.counters(self.project), [2, 0, 0, 2])
+        self.assertEqual(
+            Issue.objects.get(pk=issue_id).comments_count, 2)
+
+        self.client.patch(f"/api/v1/issues/{issue_id}/",
+                          {"status": "In Progress"})
+        self.client.delete(f"/api/v1/comments/{comment_id}/")
+        self.assertEqual(self.counters(self.project), [1, 1, 0, 1])
+
+        self.client.patch(f"/api/v1/issues/{issue_id}/",
+                          {"project": self.other_project.id})
+        self.assertEqual(self.counters(self.project), [1, 0, 0, 0])
+        self.assertEqual(self.counters(self.other_project), [0, 1, 0, 1])
+
+        self.client.delete(f"/api/v1/issues/{issue_id}/")
+        self.assertEqual(self.counters(self.other_project), [0, 0, 0, 0])
+
+    def test_bulk_writes_move_the_counters(self):
+        response = self.client.post("/api/v1/issues/bulk/", [
+            {"title": f"Issue {index}", "description": "Description",
+             "nature": "Bug", "project": self.project.id}
+            for index in range(3)
+        ], format="json")
+        ids = [item["id"] for item in response.data["results"]]
+        self.client.patch("/api/v1/issues/bulk/", [
+            {"id": ids[0], "status": "Finished"},
+            {"id": ids[1], "project": self.other_project.id},
+        ], format="json")
+        self.assertEqual(self.counters(self.project), [1, 0, 1, 0])
+        self.assertEqual(self.counters(self.other_project), [1, 0, 0, 0])
+
+    def test_counters_are_optional(self):
+        response = self.client.get("/api/v1/projects/")
+        self.assertNotIn("comments_count", response.data["results"][0])
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            response = self.client.get(
+                "/api/v1/projects/", {"counts": "true"})
+        self.assertIn("comments_count", response.data["results"][0])
+
+    def test_rebuild_command(self):
+        issue_id = self.create_issue("Issue")
+        Comment.objects.bulk_create(
+            Comment(description="Commentaire", author=self.author,
+                    issue_id=issue_id)
+            for _ in range(3)
+        )
+        Project.objects.filter(pk=self.project.pk).update(
+            issues_finished_count=5)
+        self.assertEqual(self.counters(self.project), [1, 0, 5, 0])
+
+        call_command("rebuild_counters", stdout=io.StringIO())
+        self.assertEqual(self.counters(self.project), [1, 0, 0, 3])
+        self.assertEqual(Issue.objects.get(pk=issue_id).comments_count, 3)
+
+
+class AtomicWriteTest(APITransactionTestCase):
+    """
+    A write is committed with the counters and change log entries written
+    by its receivers, or not at all.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.author = create_user("author")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+        self.issue = Issue.objects.create(
+            title="Issue", description="Description", nature="Bug",
+            author=self.author, project=self.project,
+        )
+        self.client.force_authenticate(self.author)
+
+    def test_failed_counter_update_cancels_the_write(self):
+        with patch("projectManagement.signals.Deltas.apply",
+                   side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.post("/api/v1/issues/", {
+                    "title": "Nouvelle", "description": "Description",
+                    "nature": "Bug", "project": self.project.id,
+                    "assigned": None,
+                }, format="json")
+            with self.assertRaises(DatabaseError):
+                self.client.patch(f"/api/v1/issues/{self.issue.id}/",
+                                  {"status": "Finished"}, format="json")
+            with self.assertRaises(DatabaseError):
+                self.client.delete(f"/api/v1/issues/{self.issue.id}/")
+
+        self.issue.refresh_from_db()
+        self.assertEqual(self.issue.status, "To Do")
+        self.assertEqual(list(Issue.objects.all()), [self.issue])
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.issues_todo_count, 1)
+        self.assertEqual(self.project.issues_finished_count, 0)
+
+    def test_failed_change_log_entry_cancels_the_write(self):
+        with patch("projectManagement.signals.record_changes",
+                   side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.post("/api/v1/comments/", {
+                    "description": "Commentaire", "issue": self.issue.id,
+                }, format="json")
+            with self.assertRaises(DatabaseError):
+                self.client.patch(f"/api/v1/projects/{self.project.id}/",
+                                  {"title": "Renommé"}, format="json")
+            with self.assertRaises(DatabaseError):
+                self.client.delete(f"/api/v1/projects/{self.project.id}/")
+
+        self.assertFalse(Comment.objects.exists())
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.title, "Projet")
+        self.assertTrue(Issue.objects.filter(pk=self.issue.pk).exists())
+        self.assertEqual(
+            Change.objects.filter(deleted=True).count(), 0)
+
+
+class RequestInstrumentationTest(SoftDeskAPITestCase):
+    """
+    Every request is measured: the main endpoints stay within their query
+    budget whatever the size of the project, and the metrics are exposed
+    in the Server-Timing header and to staff users.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+        for index in range(10):
+            user = create_user(f"user{index}")
+            Contributor.objects.create(project=self.project, user=user)
+            self.issue = Issue.objects.create(
+                title=f"Issue {index}", description="Description",
+                nature="Bug", author=self.author, assigned=user,
+                project=self.project,
+            )
+            Comment.objects.create(
+                description="Commentaire", author=user, issue=self.issue)
+        self.client.force_authenticate(self.author)
+
+    def test_endpoints_within_their_query_budget(self):
+        comment = self.issue.issue_comments.first()
+        for url in [
+            "/api/v1/projects/",
+            f"/api/v1/projects/{self.project.id}/",
+            "/api/v1/issues/",
+            f"/api/v1/issues/{self.issue.id}/",
+            "/api/v1/comments/",
+            f"/api/v1/comments/{comment.pk}/",
+            "/api/v1/changes/?since=0",
+        ]:
+            for cache in caches.all():
+                cache.clear()
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertWithinQueryBudget()
+
+        response = self.client.post("/api/v1/issues/", {
+            "title": "Issue", "description": "Description", "nature": "Bug",
+            "project": self.project.id, "assigned": None,
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertWithinQueryBudget()
+
+    def test_budget_assertion_fails_over_budget(self):
+        response = self.client.get(f"/api/v1/projects/{self.project.id}/")
+        with self.assertRaises(AssertionError):
+            self.assertWithinQueryBudget(budget=0)
+
+    def test_server_timing_header(self):
+        response = self.client.get(f"/api/v1/issues/{self.issue.id}/")
+        metrics = self.request_metrics[-1]
+        self.assertEqual(metrics.endpoint, "IssueViewSet.retrieve")
+        self.assertGreater(metrics.queries, 0)
+        self.assertGreater(metrics.serialize_ms, 0)
+        self.assertIn(f'desc="{metrics.queries} queries"',
+                      response["Server-Timing"])
+        for name in ("db", "serialize", "permissions", "total"):
+            self.assertIn(f"{name};dur=", response["Server-Timing"])
+
+        with override_settings(SERVER_TIMING=False):
+            response = self.client.get(f"/api/v1/issues/{self.issue.id}/")
+        self.assertNotIn("Server-Timing", response)
+
+    def test_async_views_are_measured(self):
+        response = async_to_sync(self.async_client.get)(
+            f"/api/v1/async/issues/{self.issue.id}/",
+            headers={
+                "Authorization": f"Bearer {AccessToken.for_user(self.author)}"
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        metrics = self.request_metrics[-1]
+        self.assertEqual(metrics.endpoint, "AsyncIssueView.retrieve")
+        self.assertGreater(metrics.queries, 0)
+        self.assertWithinQueryBudget()
+
+    def test_request_stats_endpoint(self):
+        for _ in range(2):
+            self.client.get("/api/v1/issues/")
+        with override_settings(QUERY_BUDGETS={"IssueViewSet.list": 0}):
+            self.client.get("/api/v1/issues/")
+        self.assertEqual(
+            self.client.get("/api/v1/request-stats/").status_code, 403)
+
+        self.author.is_staff = True
+        self.author.save()
+        with override_settings(QUERY_BUDGETS={"IssueViewSet.list": 0}):
+            stats = self.client.get("/api/v1/request-stats/").data
+        issue_list = stats["IssueViewSet.list"]
+        self.assertEqual(issue_list["requests"], 3)
+        self.assertEqual(issue_list["over_budget"], 1)
+        self.assertEqual(issue_list["query_budget"], 0)
+        self.assertGreater(issue_list["queries_mean"], 0)
+        self.assertGreater(issue_list["duration_ms_mean"], 0)
+
+
+class SeedDataCommandTest(SoftDeskAPITestCase):
+    """
+    The seed_data command inserts the requested dataset, with consistent
+    counters, and refuses to seed the same users twice.
+    """
+
+    def seed(self, **options):
+        call_command("seed_data", users=20, projects=4,
+                     contributors_per_project=5, issues=60, comments=200,
+                     stdout=io.StringIO(), **options)
+
+    def test_seeds_the_dataset(self):
+        self.seed(password="motdepasse-1")
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Project.objects.count(), 4)
+        self.assertEqual(Issue.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 200)
+        for project in Project.objects.all():
+            self.assertTrue(project.contributors.filter(
+                user_id=project.author_id).exists())
+            self.assertEqual(
+                project.comments_count,
+                Comment.objects.filter(issue__project=project).count())
+        self.assertTrue(
+            User.objects.get(username="user0").check_password("motdepasse-1"))
+
+    def test_same_seed_same_dates(self):
+        self.seed()
+        dates = [
+            list(model.objects.order_by("id").values_list(
+                "date_created", flat=True))
+            for model in (Issue, Comment)]
+        Project.objects.all().delete()
+        User.objects.all().delete()
+        self.seed()
+        self.assertEqual(dates, [
+            list(model.objects.order_by("id").values_list(
+                "date_created", flat=True))
+            for model in (Issue, Comment)])
+        self.assertGreater(len(set(dates[0])), 1)
+
+    def test_refuses_to_seed_twice(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed(prefix="autre")
+        self.assertEqual(Project.objects.count(), 8)
+
+
+class BulkLoadDataCommandTest(SoftDeskAPITestCase):
+    """
+    bulk_loaddata restores a dumpdata fixture like loaddata does: same
+    rows and dates, updated rows on reload, consistent counters and search
+    index.
+    """
+
+    def setUp(self):
+        super().setUp()
+        call_command("seed_data", users=10, projects=3,
+                     contributors_per_project=4, issues=30, comments=90,
+                     stdout=io.StringIO())
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, "dump.json")
+        self.addCleanup(os.rmdir, directory)
+        self.addCleanup(os.remove, self.path)
+        call_command("dumpdata", "authenticated", "projectManagement",
+                     output=self.path, verbosity=0)
+        # the rows as loaddata restores them (dates to the millisecond)
+        call_command("loaddata", self.path, verbosity=0)
+        self.issues = list(Issue.objects.order_by("id").values())
+        self.comments = list(Comment.objects.order_by("id").values())
+        self.counters = list(Project.objects.order_by("id").values_list(
+            "issues_todo_count", "comments_count"))
+
+    def load(self, *args, **options):
+        call_command("bulk_loaddata", self.path, *args,
+                     stdout=io.StringIO(), **options)
+
+    def test_restores_the_dump(self):
+        Project.objects.all().delete()
+        User.objects.all().delete()
+        self.load(batch_size=7)
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(
+            list(Issue.objects.order_by("id").values()), self.issues)
+        self.assertEqual(
+            list(Comment.objects.order_by("id").values()), self.comments)
+        self.assertEqual(
+            list(Project.objects.order_by("id").values_list(
+                "issues_todo_count", "comments_count")),
+            self.counters)
+
+    def test_reload_updates_existing_rows(self):
+        Issue.objects.update(description="Modifiée")
+        self.load()
+        self.assertEqual(
+            list(Issue.objects.order_by("id").values()), self.issues)
+
+    def test_loaded_issues_are_searchable(self):
+        Project.objects.all().delete()
+        self.load()
+        issue = Issue.objects.order_by("id").first()
+        user = User.objects.get(pk=issue.author_id)
+        self.client.force_authenticate(user)
+        response = self.client.get(
+            "/api/v1/search/", {"q": issue.title.split()[0]})
+        self.assertIn(issue.id,
+                      [match["id"] for match in response.data["issues"]])
+
+    def test_exclude(self):
+        Project.objects.all().delete()
+        self.load(exclude=["projectManagement.comment"])
+        self.assertEqual(Issue.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 0)
+
+    def test_invalid_fixture(self):
+        with open(self.path, "w") as file:
+            file.write('[{"model": "projectManagement.issue"')
+        with self.assertRaises(CommandError):
+            self.load()
+
+    def test_iter_json_array_across_chunks(self):
+        text = '[ {"a": [1, "]"]}, 12345 , "x,y" ,{}]'
+        for chunk_size in range(1, len(text) + 1):
+            self.assertEqual(
+                list(iter_json_array(io.StringIO(text), chunk_size)),
+                [{"a": [1, "]"]}, 12345, "x,y", {}])
+        with self.assertRaises(FixtureError):
+            list(iter_json_array(io.StringIO('{"a": 1}')))
+
+
+class ExportDataCommandTest(SoftDeskAPITestCase):
+    """
+    export_data writes one compressed NDJSON file per model, only the rows
+    changed since a date with --since, and leaves out the users who do not
+    share their data with --analytics.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.private = create_user("private")
+        self.private.can_data_be_shared = False
+        self.private.save()
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type="back-end",
+            author=self.author,
+        )
+        Contributor.objects.create(project=self.project, user=self.author)
+        Contributor.objects.create(project=self.project, user=self.private)
+        self.issue = Issue.objects.create(
+            title="Issue", description="Description", nature="Bug",
+            author=self.private, assigned=self.author, project=self.project,
+        )
+        Comment.objects.create(
+            description="Commentaire", author=self.private, issue=self.issue)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def export(self, *args, **options):
+        call_command("export_data", self.directory, *args, workers=1,
+                     stdout=io.StringIO(), **options)
+        with open(os.path.join(self.directory, "manifest.json")) as file:
+            return json.load(file)
+
+    def read(self, name):
+        with gzip.open(os.path.join(self.directory, f"{name}.ndjson.gz"),
+                       "rt", encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+
+    def test_backup_exports_every_row(self):
+        manifest = self.export(chunk_size=1)
+        self.assertEqual(manifest["variant"], "backup")
+        self.assertEqual(
+            {name: exported["rows"]
+             for name, exported in manifest["files"].items()},
+            {"user": 2, "project": 1, "contributor": 2, "issue": 1,
+             "comment": 1})
+        (issue,) = self.read("issue")
+        self.assertEqual(issue["id"], self.issue.id)
+        self.assertEqual(issue["author_id"], self.private.id)
+        self.assertEqual(issue["project_id"], self.project.id)
+        users = self.read("user")
+        self.assertIn("password", users[0])
+
+    def test_analytics_leaves_out_users_not_sharing_their_data(self):
+        self.export(analytics=True)
+        users = self.read("user")
+        self.assertEqual([user["id"] for user in users], [self.author.id])
+        self.assertNotIn("password", users[0])
+        self.assertNotIn("email", users[0])
+        self.assertEqual(
+            [contributor["user_id"] for contributor in self.read(
+                "contributor")],
+            [self.author.id])
+        (issue,) = self.read("issue")
+        self.assertIsNone(issue["author_id"])
+        self.assertEqual(issue["assigned_id"], self.author.id)
+        self.assertIsNone(self.read("comment")[0]["author_id"])
+
+    def test_since_exports_the_changes_and_deletions(self):
+        until = self.export()["until"]
+        other = Issue.objects.create(
+            title="Autre", description="Description", nature="Bug",
+            author=self.author, project=self.project,
+        )
+        deleted_id = self.issue.id
+        self.issue.delete()
+        manifest = self.export(since=until)
+        self.assertEqual(manifest["since"], until)
+        self.assertEqual(
+            [issue["id"] for issue in self.read("issue")], [other.id])
+        self.assertEqual(self.read("comment"), [])
+        self.assertEqual(self.read("user"), [])
+        # deleting an issue updates its project
+        self.assertEqual(len(self.read("contributor")), 2)
+        self.assertEqual(
+            [(deletion["type"], deletion["object_id"])
+             for deletion in self.read("deletions")],
+            [("issue", str(deleted_id))])
+
+    def test_invalid_since(self):
+        with self.assertRaises(CommandError):
+            self.export(since="hier")
+
+    @skipUnless(pyarrow, "pyarrow is not installed")
+    def test_parquet(self):
+        import pyarrow.parquet
+
+        manifest = self.export(format="parquet")
+        self.assertEqual(manifest["files"]["comment"]["file"],
+                         "comment.parquet")
+        table = pyarrow.parquet.read_table(
+            os.path.join(self.directory, "issue.parquet"))
+        self.assertEqual(table.column("id").to_pylist(), [self.issue.id])
+        self.assertEqual(table.column("author_id").to_pylist(),
+                         [self.private.id])
+
+    @skipIf(pyarrow, "pyarrow is installed")
+    def test_parquet_requires_pyarrow(self):
+        with self.assertRaises(CommandError):
+            self.export(format="parquet")
+
+
+class SQLitePragmasTest(SoftDeskAPITestCase):
+    """
+    New SQLite connections run the pragmas of the SQLITE_PRAGMAS setting.
+    """
+
+    def open_connection(self):
+        """
+        Returns a new connection to a database file, closed at the end of
+        the test.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        database = connections["default"].__class__(
+            {**connection.settings_dict,
+             "NAME": os.path.join(directory, "db.sqlite3")})
+        self.addCleanup(database.close)
+        database.ensure_connection()
+        return database
+
+    def pragma(self, database, name):
+        return database.connection.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def test_new_connections_are_tuned(self):
+        database = self.open_connection()
+        self.assertEqual(self.pragma(database, "journal_mode"), "wal")
+        # NORMAL
+        self.assertEqual(self.pragma(database, "synchronous"), 1)
+        self.assertEqual(self.pragma(database, "cache_size"), -64000)
+        self.assertEqual(self.pragma(database, "busy_timeout"), 5000)
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_pragmas_can_be_disabled(self):
+        database = self.open_connection()
+        self.assertEqual(self.pragma(database, "journal_mode"), "delete")
+
+    def test_no_persistent_connections_under_asgi(self):
+        from SoftDeskSupport import settings as project_settings
+
+        self.addCleanup(importlib.reload, project_settings)
+        with patch.dict(os.environ):
+            os.environ.pop("SOFTDESK_ASGI", None)
+            importlib.reload(project_settings)
+            self.assertEqual(
+                project_settings.DATABASES["default"]["CONN_MAX_AGE"], 600)
+            os.environ["SOFTDESK_ASGI"] = "1"
+            importlib.reload(project_settings)
+            self.assertEqual(
+                project_settings.DATABASES["default"]["CONN_MAX_AGE"], 0)
+
+    def test_invalid_pragma(self):
+        for pragmas in ({"cache_size; DROP TABLE x": 1},
+                        {"cache_size": "1; DROP TABLE x"}):
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                with self.assertRaises(ImproperlyConfigured):
+                    get_sqlite_pragmas()
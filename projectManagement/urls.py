@@ -1,10 +1,67 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
+from projectManagement.async_views import (
+    AsyncCommentView, AsyncIssueView, AsyncProjectView, EventStreamView
+)
 from projectManagement.views import (
-    IssueViewSet, CommentViewSet, ProjectViewSet
+    CacheStatsView,
+    ChangesView,
+    CommentViewSet,
+    IssueViewSet,
+    ProjectViewSet,
+    RequestStatsView,
+    SearchView,
 )
 
 router = DefaultRouter()
 router.register("projects", ProjectViewSet, basename="project")
 router.register("issues", IssueViewSet, basename="issue")
 router.register("comments", CommentViewSet, basename="comment")
+
+urlpatterns = [
+    path("search/",
+         SearchView.as_view(),
+         name="search"
+         ),
+    path("changes/",
+         ChangesView.as_view(),
+         name="changes"
+         ),
+    path("async/projects/",
+         AsyncProjectView.as_view(),
+         name="async-project-list"
+         ),
+    path("async/projects/<int:pk>/",
+         AsyncProjectView.as_view(),
+         name="async-project-detail"
+         ),
+    path("async/issues/",
+         AsyncIssueView.as_view(),
+         name="async-issue-list"
+         ),
+    path("async/issues/<int:pk>/",
+         AsyncIssueView.as_view(),
+         name="async-issue-detail"
+         ),
+    path("async/comments/",
+         AsyncCommentView.as_view(),
+         name="async-comment-list"
+         ),
+    path("async/comments/<uuid:pk>/",
+         AsyncCommentView.as_view(),
+         name="async-comment-detail"
+         ),
+    path("events/",
+         EventStreamView.as_view(),
+         name="events"
+         ),
+    path("cache-stats/",
+         CacheStatsView.as_view(),
+         name="cache_stats"
+         ),
+    path("request-stats/",
+         RequestStatsView.as_view(),
+         name="request_stats"
+         ),
+]
@@ -0,0 +1,138 @@
+"""
+Fast read path for the list actions.
+
+A `ValuesSerializer` produces the same representation as a
+`ModelSerializer`, from rows fetched with `QuerySet.values()` instead of
+model instances: no model is instantiated and the DRF fields are only
+called for the columns whose representation differs from the database
+value (dates, UUIDs, decimals...).
+
+Only flat serializers are supported: every field must map to a column of
+the model, and relations must be represented by their primary key.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from projectManagement.instrumentation import timed
+
+# fields whose representation is the value read from the database
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+)
+
+
+def is_fast_list_enabled():
+    """
+    Returns True if the list actions use the fast read path, as configured
+    by the `FAST_LIST_SERIALIZATION` setting.
+    """
+    return getattr(settings, "FAST_LIST_SERIALIZATION", True)
+
+
+class ValuesSerializer:
+    """
+    Builds the representation of `serializer_class` from `.values()` rows.
+    """
+
+    def __init__(self, serializer_class, extra_columns=()):
+        """
+        Resolves, once, the column and the converter of every readable
+        field. `extra_columns` are also fetched, for instance the ordering
+        fields needed by cursor pagination, but are not represented.
+        """
+        self.serializer_class = serializer_class
+        self.fields = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if (isinstance(field, (serializers.BaseSerializer,
+                                   serializers.SerializerMethodField,
+                                   serializers.ManyRelatedField))
+                    or (isinstance(field, serializers.RelatedField)
+                        and not isinstance(
+                            field, serializers.PrimaryKeyRelatedField))
+                    or "." in field.source or field.source == "*"):
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.{name} cannot be read "
+                    f"from a single column."
+                )
+            self.fields.append((name, field.source, self.get_converter(field)))
+        self.columns = list(dict.fromkeys(
+            [source for _, source, _ in self.fields] + list(extra_columns)))
+
+    @staticmethod
+    def get_converter(field):
+        """
+        Returns the function turning a database value into the
+        representation of the field, or None when they are the same.
+        """
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            # .values() already returns the primary key
+            if field.pk_field is None:
+                return None
+            return field.pk_field.to_representation
+        if isinstance(field, serializers.ChoiceField):
+            if all(isinstance(key, str) for key in field.choices):
+                return None
+            return field.to_representation
+        if isinstance(field, IDENTITY_FIELDS):
+            return None
+        return field.to_representation
+
+    def values(self, queryset):
+        """
+        Returns the queryset of the rows to represent.
+        """
+        return queryset.values(*self.columns)
+
+    def to_representation(self, rows):
+        """
+        Returns the representation of every row, identical to the output of
+        the serializer for the matching instances.
+        """
+        fields = self.fields
+        return [
+            {
+                name: (row[source] if converter is None
+                       or row[source] is None
+                       else converter(row[source]))
+                for name, source, converter in fields
+            }
+            for row in rows
+        ]
+
+
+class ValuesListMixin:
+    """
+    Serves the list action of a ViewSet from `.values()` rows, with the
+    `values_serializer` of the ViewSet, when `FAST_LIST_SERIALIZATION` is
+    enabled. Filtering, ordering and pagination are unchanged.
+    """
+
+    values_serializer = None
+
+    def get_values_serializer(self):
+        """
+        Returns the values serializer of the list, matching the serializer
+        class of the request.
+        """
+        return self.values_serializer
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = self.get_values_serializer()
+        if values_serializer is None or not is_fast_list_enabled():
+            return super().list(request, *args, **kwargs)
+        rows = values_serializer.values(
+            self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            with timed("serialize_ms"):
+                data = values_serializer.to_representation(page)
+            return self.get_paginated_response(data)
+        with timed("serialize_ms"):
+            return Response(values_serializer.to_representation(rows))
@@ -1,21 +1,60 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Max, Prefetch
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.exceptions import MethodNotAllowed
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import MethodNotAllowed, ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
 from authenticated.models import User
+from projectManagement.bulk import (
+    MAX_BATCH_SIZE, bulk_create_issues, bulk_update_issues
+)
+from projectManagement.changes import (
+    SyncTokenExpired, get_changes, get_latest_token
+)
+from projectManagement.conditional import ConditionalGetMixin, latest
+from projectManagement.detail_cache import (
+    get_project_detail, get_project_detail_cache_stats
+)
+from projectManagement.export import (
+    EXPORT_CONTENT_TYPE, aiter_project_export, iter_project_export
+)
+from projectManagement.filters import IssueFilterBackend, IssueOrderingFilter
+from projectManagement.instrumentation import (
+    InstrumentedViewMixin, get_request_stats
+)
+from projectManagement.membership import (
+    add_contributors,
+    get_member_project_ids,
+    get_membership_cache_stats,
+    remove_contributors,
+)
 from projectManagement.models import Project, Issue, Contributor, Comment
+from projectManagement.pagination import DateCreatedCursorPagination
 from projectManagement.permissions import IsContributor, IsAuthor
+from projectManagement.renderers import FastJSONRenderer, NDJSONRenderer
+from projectManagement.search import (
+    is_search_index_supported, search_comments, search_issues
+)
 from projectManagement.serializers import (
     ProjectListSerializer,
+    ProjectCountsListSerializer,
     CommentSerializer,
     ContributorSerializer,
     ProjectDetailSerializer,
     IssueListSerializer,
     IssueDetailSerializer,
+    SearchQuerySerializer,
+    ContributorIdsSerializer,
+    ChangesQuerySerializer,
+)
+from projectManagement.values_serializers import (
+    ValuesListMixin, ValuesSerializer
 )
 
 
@@ -37,30 +76,98 @@ class MultipleSerializerMixin:
         return super().get_serializer_class()
 
 
-class ProjectViewSet(MultipleSerializerMixin, ModelViewSet):
+class ProjectViewSet(InstrumentedViewMixin, ConditionalGetMixin,
+                     ValuesListMixin, MultipleSerializerMixin, ModelViewSet):
     """
     ViewSet to manage projects. Allows:
     - list the projects whose user is a contributor,
     - create a project (automatically assigned to the author),
-    - add or remove a contributor (if the user is the author).
+    - add or remove a contributor (if the user is the author),
+    - export a project with its issues and comments (if the user is a
+      contributor).
     """
 
     serializer_class = ProjectListSerializer
     detail_serializer_class = ProjectDetailSerializer
+    values_serializer = ValuesSerializer(ProjectListSerializer)
+    counts_values_serializer = ValuesSerializer(ProjectCountsListSerializer)
     permission_classes = [IsAuthenticated, IsAuthor, IsContributor]
 
+    def wants_counts(self):
+        """
+        Returns True if the list was requested with `?counts=true`.
+        """
+        return self.action == "list" and self.request.query_params.get(
+            "counts") in ("1", "true")
+
+    def get_serializer_class(self):
+        if self.wants_counts():
+            return ProjectCountsListSerializer
+        return super().get_serializer_class()
+
+    def get_values_serializer(self):
+        if self.wants_counts():
+            return self.counts_values_serializer
+        return super().get_values_serializer()
+
     def get_queryset(self):
         """
         Returns the list of projects where the user is a contributor.
+        Detail actions also load the author, the contributors with their user
+        and the issues up front, so that serializing a project costs the same
+        number of queries whatever its size.
         """
-        return Project.objects.filter(contributors__user=self.request.user)
+        queryset = Project.objects.filter(
+            id__in=get_member_project_ids(self.request))
+        if self.action in ["retrieve", "update", "partial_update"]:
+            queryset = self.with_detail_relations(queryset)
+        return queryset
+
+    @staticmethod
+    def with_detail_relations(queryset):
+        """
+        Returns the queryset loading what the project detail renders.
+        """
+        return queryset.select_related("author").prefetch_related(
+            Prefetch(
+                "contributors",
+                queryset=Contributor.objects.select_related(
+                    "user").order_by("id"),
+            ),
+            Prefetch("issues", queryset=Issue.objects.order_by("id")),
+        )
 
     def perform_create(self, serializer):
         """
-        When creating a project, the author is automatically defined as the
-        current user.
+        Creates the project, then reads it back with its relations, so that
+        the response costs the same number of queries whatever the number
+        of contributors.
+        """
+        serializer.save()
+        serializer.instance = self.with_detail_relations(
+            Project.objects.all()).get(pk=serializer.instance.pk)
+
+    def get_object_validators(self, instance):
+        """
+        A project is rendered with its issues: their modification dates and
+        their number are part of the validators.
         """
-        serializer.save(author=self.request.user)
+        issues = instance.issues.order_by().aggregate(
+            last=Max("date_updated"), count=Count("pk"))
+        last_modified = latest(instance.date_updated, issues["last"])
+        return last_modified, [instance.pk, issues["count"], last_modified]
+
+    def get_retrieve_data(self, instance, queryset):
+        """
+        The detail of a project is the same for all its contributors: it is
+        served from the project detail cache, permissions having already
+        been checked.
+        """
+        return get_project_detail(
+            instance.pk,
+            lambda: super(ProjectViewSet, self).get_retrieve_data(
+                instance, queryset),
+        )
 
     def update(self, request, *args, **kwargs):
         """
@@ -70,6 +177,26 @@ class ProjectViewSet(MultipleSerializerMixin, ModelViewSet):
             raise MethodNotAllowed("PUT")
         return super().update(request, *args, **kwargs)
 
+    @action(detail=True, methods=["get"], url_path="export",
+            renderer_classes=[FastJSONRenderer, NDJSONRenderer])
+    def export(self, request, pk=None):
+        """
+        Streams the project, its issues and its comments as newline-delimited
+        JSON, read from the database chunk by chunk. Only contributors can
+        export a project. Under ASGI, the export is an async iterator, which
+        the server streams instead of reading it whole.
+        """
+        project = self.get_object()
+        if isinstance(request._request, ASGIRequest):
+            content = aiter_project_export(project.pk)
+        else:
+            content = iter_project_export(project.pk)
+        response = StreamingHttpResponse(
+            content, content_type=EXPORT_CONTENT_TYPE)
+        response["Content-Disposition"] = (
+            f'attachment; filename="project-{project.pk}.ndjson"')
+        return response
+
     @action(detail=True, methods=["post"], url_path="add_contributor")
     def add_contributor(self, request, pk=None):
         """
@@ -78,7 +205,7 @@ class ProjectViewSet(MultipleSerializerMixin, ModelViewSet):
 
         project = get_object_or_404(Project, pk=pk)
 
-        if project.author != request.user:
+        if project.author_id != request.user.id:
             return Response(
                 {
                     "error": "Seul l'auteur peut ajouter un contributeur.",
@@ -125,7 +252,7 @@ class ProjectViewSet(MultipleSerializerMixin, ModelViewSet):
         """
         project = get_object_or_404(Project, pk=pk)
 
-        if project.author != request.user:
+        if project.author_id != request.user.id:
             return Response(
                 {
                     "error": "Seul l'auteur peut retirer un contributeur.",
@@ -146,7 +273,7 @@ class ProjectViewSet(MultipleSerializerMixin, ModelViewSet):
 
         user = get_object_or_404(User, pk=user_id)
 
-        if user == request.user:
+        if user.pk == request.user.id:
             return Response(
                 {
                     "error": "l'auteur ne peut être retirer des contributeurs",
@@ -174,8 +301,62 @@ class ProjectViewSet(MultipleSerializerMixin, ModelViewSet):
             status=status.HTTP_201_CREATED,
         )
 
+    @action(detail=True, methods=["post"], url_path="add_contributors")
+    def add_contributors(self, request, pk=None):
+        """
+        Adds a list of contributors to a project if the user is the author.
+        Returns the users added, skipped (already contributors) and not
+        found.
+        """
+        project = get_object_or_404(Project, pk=pk)
+
+        if project.author_id != request.user.id:
+            return Response(
+                {
+                    "error": "Seul l'auteur peut ajouter des contributeurs.",
+                    "code": "author_only",
+                },
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        serializer = ContributorIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = add_contributors(
+            project, serializer.validated_data["user_ids"])
+
+        return Response(
+            result,
+            status=(status.HTTP_201_CREATED if result["added"]
+                    else status.HTTP_200_OK),
+        )
+
+    @action(detail=True, methods=["delete"], url_path="del_contributors")
+    def remove_contributors(self, request, pk=None):
+        """
+        Removes a list of contributors from a project if the user is the
+        author. The author is never removed. Returns the users removed,
+        skipped (not contributors or author) and not found.
+        """
+        project = get_object_or_404(Project, pk=pk)
+
+        if project.author_id != request.user.id:
+            return Response(
+                {
+                    "error": "Seul l'auteur peut retirer des contributeurs.",
+                    "code": "author_only",
+                },
+                status=status.HTTP_403_FORBIDDEN,
+            )
 
-class ContributorViewSet(ModelViewSet):
+        serializer = ContributorIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = remove_contributors(
+            project, serializer.validated_data["user_ids"])
+
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class ContributorViewSet(InstrumentedViewMixin, ModelViewSet):
     """
     ViewSet to view user contributions.
     The user sees only his own contributions.
@@ -188,11 +369,12 @@ class ContributorViewSet(ModelViewSet):
         """
         Filters contributions to those of the current user.
         """
-        queryset = self.queryset.filter(user=self.request.user)
+        queryset = self.queryset.filter(user_id=self.request.user.id)
         return queryset
 
 
-class IssueViewSet(MultipleSerializerMixin, ModelViewSet):
+class IssueViewSet(InstrumentedViewMixin, ConditionalGetMixin,
+                   ValuesListMixin, MultipleSerializerMixin, ModelViewSet):
     """
     ViewSet to manage issues associated with project outcomes.
     Only contributors can view issues.
@@ -201,15 +383,42 @@ class IssueViewSet(MultipleSerializerMixin, ModelViewSet):
 
     serializer_class = IssueListSerializer
     detail_serializer_class = IssueDetailSerializer
+    values_serializer = ValuesSerializer(
+        IssueListSerializer,
+        extra_columns=DateCreatedCursorPagination.ordering,
+    )
     permission_classes = [IsAuthenticated, IsAuthor, IsContributor]
+    pagination_class = DateCreatedCursorPagination
+    filter_backends = [IssueFilterBackend, IssueOrderingFilter]
 
     def get_queryset(self):
         """
         Returns issues related to projects where the user is a contributor.
+        Detail actions also load the author and the most recent comments
+        with their author.
         """
-        queryset = Issue.objects.filter(project__contributors__user=self.request.user)
+        queryset = Issue.objects.filter(
+            project_id__in=get_member_project_ids(self.request))
+        if self.action in ["retrieve", "update", "partial_update"]:
+            queryset = queryset.select_related("author").prefetch_related(
+                Prefetch(
+                    "issue_comments",
+                    queryset=IssueDetailSerializer.recent_comments_queryset(),
+                    to_attr="recent_comments",
+                )
+            )
         return queryset
 
+    def get_object_validators(self, instance):
+        """
+        An issue is rendered with its most recent comments: their
+        modification dates and their number are part of the validators.
+        """
+        comments = instance.issue_comments.order_by().aggregate(
+            last=Max("date_updated"), count=Count("pk"))
+        last_modified = latest(instance.date_updated, comments["last"])
+        return last_modified, [instance.pk, comments["count"], last_modified]
+
     def update(self, request, *args, **kwargs):
         """
         Do not use PUT. Use PATCH for updates.
@@ -218,8 +427,50 @@ class IssueViewSet(MultipleSerializerMixin, ModelViewSet):
             raise MethodNotAllowed("PUT")
         return super().update(request, *args, **kwargs)
 
+    @action(detail=False, methods=["post", "patch"], url_path="bulk")
+    def bulk(self, request):
+        """
+        Creates (POST) or partially updates (PATCH) a list of issues in a
+        single transaction. Each item gets its own result; with
+        `?atomic=true`, nothing is written if any item is invalid.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {
+                    "error": "Une liste d'issues est attendue.",
+                    "code": "list_required",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > MAX_BATCH_SIZE:
+            return Response(
+                {
+                    "error": f"Un lot ne peut dépasser {MAX_BATCH_SIZE} issues.",  # noqa: E501
+                    "code": "batch_too_large",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-class CommentViewSet(ModelViewSet):
+        atomic = request.query_params.get("atomic") in ("1", "true")
+        if request.method == "POST":
+            result = bulk_create_issues(request, items, atomic)
+            success_status = status.HTTP_201_CREATED
+        else:
+            result = bulk_update_issues(request, items, atomic)
+            success_status = status.HTTP_200_OK
+
+        if not result.has_errors:
+            response_status = success_status
+        elif atomic:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+        return Response({"results": result.items}, status=response_status)
+
+
+class CommentViewSet(InstrumentedViewMixin, ConditionalGetMixin,
+                     ModelViewSet):
     """
     ViewSet to manage comments associated with project outcomes.
     Only contributors can view comments.
@@ -228,14 +479,23 @@ class CommentViewSet(ModelViewSet):
 
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated, IsAuthor, IsContributor]
+    pagination_class = DateCreatedCursorPagination
 
     def get_queryset(self):
         """
-        Returns comments related to projects where the user is a contributor.
+        Returns comments related to projects where the user is a contributor,
+        optionally restricted to one issue with the `issue` query parameter.
         """
         queryset = Comment.objects.filter(
-            issue__project__contributors__user=self.request.user
-        )
+            issue__project_id__in=get_member_project_ids(self.request)
+        ).select_related("author", "issue")
+        issue_id = self.request.query_params.get("issue")
+        if issue_id is not None:
+            if not issue_id.isdigit():
+                raise ValidationError(
+                    {"issue": "L'identifiant de l'issue doit être un entier."}
+                )
+            queryset = queryset.filter(issue_id=issue_id)
         return queryset
 
     def update(self, request, *args, **kwargs):
@@ -245,3 +505,107 @@ class CommentViewSet(ModelViewSet):
         if request.method == "PUT":
             raise MethodNotAllowed("PUT")
         return super().update(request, *args, **kwargs)
+
+
+class SearchView(InstrumentedViewMixin, APIView):
+    """
+    Full-text search over the issues and comments of the projects where the
+    user is a contributor. Results are ranked, best matches first, and come
+    with a snippet of the matching text.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if not is_search_index_supported():
+            return Response(
+                {
+                    "error": "La recherche n'est pas disponible.",
+                    "code": "search_unavailable",
+                },
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        serializer = SearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data["q"]
+        search_type = serializer.validated_data.get("type")
+        limit = serializer.validated_data["limit"]
+        project_ids = sorted(get_member_project_ids(request))
+
+        results = {}
+        if search_type in (None, "issue"):
+            results["issues"] = search_issues(query, project_ids, limit)
+        if search_type in (None, "comment"):
+            results["comments"] = search_comments(query, project_ids, limit)
+        return Response(results)
+
+
+class ChangesView(InstrumentedViewMixin, APIView):
+    """
+    Delta sync feed: the projects, issues, comments and contributors
+    created, updated or deleted after a token, within the projects where
+    the user is a contributor. Without a token, returns the current token,
+    to use after a full download.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = ChangesQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        since = serializer.validated_data.get("since")
+        if since is None:
+            return Response({
+                "changes": [], "next": get_latest_token(), "has_more": False,
+            })
+        try:
+            feed = get_changes(
+                request.user.id,
+                sorted(get_member_project_ids(request)),
+                since,
+                serializer.validated_data["limit"],
+            )
+        except SyncTokenExpired:
+            return Response(
+                {
+                    "error": "Ce jeton est trop ancien, les projets doivent être téléchargés à nouveau.",  # noqa: E501
+                    "code": "sync_token_expired",
+                },
+                status=status.HTTP_410_GONE,
+            )
+        return Response(feed)
+
+
+class CacheStatsView(InstrumentedViewMixin, APIView):
+    """
+    Reports the counters of the caches of this process: hit ratios of the
+    membership and project detail caches and time spent rebuilding project
+    details. Reserved to staff users.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Returns the counters of each cache.
+        """
+        return Response({
+            "membership": get_membership_cache_stats(),
+            "project_detail": get_project_detail_cache_stats(),
+        })
+
+
+class RequestStatsView(InstrumentedViewMixin, APIView):
+    """
+    Reports the request metrics of this process, per endpoint: queries,
+    database, serialization, permissions and total times, and requests
+    over their query budget. Reserved to staff users.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Returns the metrics of each endpoint.
+        """
+        return Response(get_request_stats())